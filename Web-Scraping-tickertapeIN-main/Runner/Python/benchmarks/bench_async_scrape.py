@@ -0,0 +1,50 @@
+# Serial vs async scrape against the local stand-in server.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_async_scrape --count 200 --latency 0.05 --concurrency 16
+
+import argparse
+import time
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.scraper_engine.etf import TickerETFs
+
+from .stand_in_server import StandInServer
+
+
+def run(scraper, companies_list: list) -> tuple:
+    start_time = time.perf_counter()
+    data = scraper.scrape(companies_list)
+    return data, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency, error_rate=args.error_rate) as server:
+        for scraper_class, page_type in [(TickerStocks, "stocks"), (TickerETFs, "etfs")]:
+            companies_list = [c for c in server.company_list if c["type"] == page_type][:args.count]
+
+            serial = scraper_class(base_url=server.base_url)
+            serial_data, serial_time = run(serial, companies_list)
+            concurrent = scraper_class(concurrency=args.concurrency, base_url=server.base_url)
+            async_data, async_time = run(concurrent, companies_list)
+
+            # same records, same order, same failures ({} for 500 pages)
+            assert serial_data == async_data, "async results differ from serial results"
+            expected_urls = [serial.get_url(c["subdirectory"]) for c in companies_list]
+            assert [d["url"] for d in async_data if d] == [u for u, d in zip(expected_urls, async_data) if d]
+
+            failed = sum(1 for d in async_data if d == {})
+            print(page_type, ":", len(companies_list), "pages,", failed, "failed pages,",
+                  "serial %.2fs" % serial_time, "| async x%d %.2fs" % (args.concurrency, async_time),
+                  "| speedup %.1fx" % (serial_time / async_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# json vs ndjson vs parquet snapshots: file size, full load time, and the time to
+# get a typed (price, P/E) screen out of each, which for json means the
+# .replace().astype() chains of the filter_and_sort notebook.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_columnar --count 5000
+
+import argparse
+import json
+import os
+import random
+import time
+
+import pandas as pd
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import DataLoader
+from tickertapein.utils import DataSaver
+
+from .bench_streaming import scratch_tree
+from .stand_in_server import load_fixture
+
+SECTORS = ["Information Technology", "Financials", "Energy", "Materials", "Industrials", "Health Care", "Utilities"]
+CAPS = ["Smallcap", "Midcap", "Largecap", "Unknown"]
+CHECKS = ["positive", "neutral", "negative"]
+
+
+def records(count: int) -> list:
+    # parsed fixture page with randomized values, in the scraped string form
+    base = TickerStocks.parse_page(load_fixture("stock.html").decode(), "https://www.tickertape.in/stocks/tcs")
+    rng = random.Random(7)
+    data = []
+    for i in range(count):
+        record = json.loads(json.dumps(base))
+        price = "{:,.2f}".format(rng.uniform(5, 30000)) if rng.random() > 0.02 else "—"
+        record["url"] = base["url"] + "-" + str(i)
+        record["name"] = base["name"] + " " + str(i)
+        record["ticker"] = "T" + str(i)
+        record["price"] = record["overview"]["currentPrice"] = price
+        record["sector"] = record["overview"]["sectorType"] = rng.choice(SECTORS)
+        record["marketcap"] = record["overview"]["capType"] = rng.choice(CAPS)
+        record["overview"]["percentageChange"] = "%+.2f" % rng.uniform(-50, 50)
+        record["overview"]["absoluteChange"] = "%.2f%%" % rng.uniform(0, 10)
+        record["keyMetrics"]["peRatio"] = "%.2f" % rng.uniform(1, 120)
+        record["keyMetrics"]["dividendYield"] = "%.2f%%" % rng.uniform(0, 8)
+        record["forecasts"]["buyRecommendation"] = "%d%%" % rng.randint(0, 100) if rng.random() > 0.3 else None
+        for key in record["investmentChecklist"]:
+            record["investmentChecklist"][key] = rng.choice(CHECKS)
+        data.append(record)
+    return data
+
+
+def timed(function) -> tuple:
+    start_time = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start_time
+
+
+def notebook_screen(data: list) -> pd.DataFrame:
+    # what the notebook does to get numbers out of a json snapshot
+    df = pd.json_normalize(data)[["name", "price", "keyMetrics.peRatio"]]
+    df["price"] = df["price"].replace(r"[\—,]", "", regex=True).replace("", "nan").astype(float)
+    df["keyMetrics.peRatio"] = df["keyMetrics.peRatio"].replace(r"[\—,]", "", regex=True).replace("", "nan").astype(float)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    scratch_tree()
+    data = records(args.count)
+    loader = DataLoader()
+    columns = ["name", "price", "keyMetrics.peRatio"]
+    screens = {}
+
+    for file_format in [DataSaver.FILE_FORMAT_JSON, DataSaver.FILE_FORMAT_NDJSON, DataSaver.FILE_FORMAT_PARQUET]:
+        saver = DataSaver(file_format=file_format)
+        _, save_time = timed(lambda: saver.save(data, saver.SCRAPE_TYPE_STOCK))
+        file_name = loader.get_history(loader.SCRAPE_TYPE_STOCK)["file_name"]
+        size = os.path.getsize(os.path.join("tickertapein", "data", "Stocks", file_name))
+
+        load_time = min(timed(lambda: loader.load(loader.SCRAPE_TYPE_STOCK))[1] for _ in range(args.repeat))
+        if file_format == DataSaver.FILE_FORMAT_PARQUET:
+            screen = lambda: loader.load_table(loader.SCRAPE_TYPE_STOCK, columns=columns).to_pandas()
+        else:
+            screen = lambda: notebook_screen(loader.load(loader.SCRAPE_TYPE_STOCK))
+        screens[file_format], _ = timed(screen)
+        screen_time = min(timed(screen)[1] for _ in range(args.repeat))
+
+        print("%-7s %8.0f KB | save %6.3fs | load all %6.3fs | price+P/E screen %6.3fs" %
+              (file_format, size / 1024, save_time, load_time, screen_time))
+        time.sleep(1)  # snapshot names have one second resolution
+
+    # the typed parquet columns hold the same numbers the notebook parses out of the strings
+    pd.testing.assert_frame_equal(screens[DataSaver.FILE_FORMAT_JSON], screens[DataSaver.FILE_FORMAT_PARQUET])
+    table = loader.load_table(loader.SCRAPE_TYPE_STOCK)
+    print("parquet column types:", {name: str(table.schema.field(name).type) for name in
+                                    ["price", "sector", "marketcap", "investmentChecklist.entryPoint", "keyMetrics.dividendYield", "profile"]})
+
+
+if __name__ == "__main__":
+    main()
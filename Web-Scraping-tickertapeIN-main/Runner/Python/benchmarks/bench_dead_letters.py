@@ -0,0 +1,74 @@
+# Dead-letter retry pass against the local stand-in server: a scrape where a
+# share of the pages fail, then the failures clear up (after `--outage` more
+# seconds, so the first retries fail too and back off). The retry pass only
+# fetches the queued pages and patches them into the snapshot, which must end
+# up with the same records as a clean scrape; compared with rerunning it all.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_dead_letters --count 500 --error-rate 0.05
+
+import argparse
+import os
+import threading
+import time
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import DataLoader, DataSaver, DeadLetterQueue
+
+from .bench_streaming import scratch_tree
+from .stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--outage", type=float, default=1.5, help="seconds the failing pages keep failing after the scrape")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    scratch_tree()
+    try:
+        with StandInServer(latency=args.latency, error_rate=args.error_rate) as server:
+            stocks_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+            failing = [c for c in stocks_list if server.is_failing("/stocks/" + c["subdirectory"])]
+            saver = DataSaver()
+            loader = DataLoader()
+            dead_letters = DeadLetterQueue(backoff=0.5)
+            stock = TickerStocks(concurrency=args.concurrency, base_url=server.base_url, dead_letters=dead_letters)
+
+            start_time = time.perf_counter()
+            with saver.open_writer(saver.SCRAPE_TYPE_STOCK) as writer:
+                stock.scrape(stocks_list, sink=writer.write)
+            scrape_seconds = time.perf_counter() - start_time
+            queued = dead_letters.entries(TickerStocks.TYPE)
+            assert len(queued) == len(failing) and {entry["error"] for entry in queued} == {"HTTPError"}
+
+            # the outage ends a little later
+            threading.Timer(args.outage, setattr, (server, "error_rate", 0.0)).start()
+            requests_before = server.request_count
+            start_time = time.perf_counter()
+            recovered = stock.retry_failed(saver, saver.SCRAPE_TYPE_STOCK)
+            retry_seconds = time.perf_counter() - start_time
+            retry_requests = server.request_count - requests_before
+
+            assert len(recovered) == len(failing)
+            assert dead_letters.entries(TickerStocks.TYPE) == []
+            patched = list(loader.iter_records(loader.SCRAPE_TYPE_STOCK))
+            expected = [record for record in TickerStocks(concurrency=args.concurrency, base_url=server.base_url).scrape(stocks_list)]
+            assert sorted(record["url"] for record in patched) == sorted(record["url"] for record in expected)
+            assert {record["url"]: record for record in patched} == {record["url"]: record for record in expected}
+
+            print()
+            print("%d pages, %d failed and were queued" % (len(stocks_list), len(failing)))
+            print("full scrape:  %6.2fs  %5d requests" % (scrape_seconds, len(stocks_list)))
+            print("retry pass:   %6.2fs  %5d requests  (%d recovered, outage %.1fs)" % (retry_seconds, retry_requests, len(recovered), args.outage))
+            dead_letters.close()
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
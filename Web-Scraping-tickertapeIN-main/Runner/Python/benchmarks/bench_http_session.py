@@ -0,0 +1,59 @@
+# Bare requests.get per page vs the pooled HttpSession against the local
+# stand-in server: connections opened, bytes on the wire and wall time.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_http_session --count 200
+
+import argparse
+import time
+
+import requests
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import HttpSession
+
+from .stand_in_server import StandInServer
+
+
+def bare_get(urls: list) -> dict:
+    # the legacy per-page call: a new connection for every request
+    header = {"User-Agent": HttpSession.USER_AGENT}
+    received = 0
+    for url in urls:
+        response = requests.get(url, headers=header)
+        received += response.raw.tell()
+    return {"requests": len(urls), "connectionsOpened": len(urls), "bytesReceived": received}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency) as server:
+        stocks_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+        urls = [server.base_url + "/stocks/" + c["subdirectory"] for c in stocks_list]
+
+        start_time = time.perf_counter()
+        bare = bare_get(urls)
+        bare["seconds"] = round(time.perf_counter() - start_time, 3)
+        print("bare requests.get :", bare)
+
+        session = HttpSession(pool_size=args.concurrency)
+        start_time = time.perf_counter()
+        for url in urls:
+            session.get(url)
+        pooled = session.stats()
+        pooled["seconds"] = round(time.perf_counter() - start_time, 3)
+        print("pooled session    :", pooled)
+
+        # the same session shared by a concurrent scraper
+        session = HttpSession(pool_size=args.concurrency)
+        TickerStocks(concurrency=args.concurrency, base_url=server.base_url, session=session).scrape(stocks_list)
+        print("concurrent scrape :", session.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Serial vs concurrent names list scrape against the local stand-in server, and
+# the stock scrape started on scrape_iter()'s pages as they come in, as main.py does.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_names_scrape --latency 0.2 --concurrency 8
+
+import argparse
+import time
+
+from tickertapein.scraper_engine.list import TickerNames
+from tickertapein.scraper_engine.stock import TickerStocks
+
+from .stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stocks-per-page", type=int, default=2)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency) as server:
+        serial = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url, concurrency=1)
+        start_time = time.perf_counter()
+        serial_data = serial.scrape()
+        serial_time = time.perf_counter() - start_time
+
+        concurrent = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url,
+                                 concurrency=args.concurrency)
+        start_time = time.perf_counter()
+        concurrent_data = concurrent.scrape()
+        concurrent_time = time.perf_counter() - start_time
+
+        # same names in the same page order
+        assert serial_data == concurrent_data, "concurrent names list differs from the serial one"
+
+        # list first, then the stock pages, against main.py's path: the stock scrape taking
+        # the companies of each list page as it comes in
+        stock = TickerStocks(base_url=server.base_url, concurrency=args.concurrency)
+        start_time = time.perf_counter()
+        pages = list(concurrent.scrape_iter())
+        sequential_records = stock.scrape([company for names in pages for company in names[:args.stocks_per_page]])
+        sequential_time = time.perf_counter() - start_time
+
+        first_page_time = None
+
+        def discover():
+            nonlocal first_page_time
+            for names in concurrent.scrape_iter():
+                if first_page_time is None:
+                    first_page_time = time.perf_counter() - start_time
+                yield from names[:args.stocks_per_page]
+
+        start_time = time.perf_counter()
+        streamed_records = stock.scrape(discover())
+        streamed_time = time.perf_counter() - start_time
+        assert streamed_records == sequential_records
+
+        # the same through the pipeline engine (fetch threads, parse processes)
+        pipeline = TickerStocks(base_url=server.base_url, concurrency=args.concurrency, parse_workers=1)
+        assert pipeline.scrape(discover()) == sequential_records
+
+    print("%d names | serial %.2fs | concurrent x%d %.2fs | speedup %.1fx" %
+          (len(serial_data), serial_time, args.concurrency, concurrent_time, serial_time / concurrent_time))
+    print("list then stocks %.2fs | stocks scraped while the list comes in %.2fs (first page after %.2fs)" %
+          (sequential_time, streamed_time, first_page_time))
+
+
+if __name__ == "__main__":
+    main()
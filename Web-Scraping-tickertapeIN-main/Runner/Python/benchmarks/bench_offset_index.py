@@ -0,0 +1,66 @@
+# Single-ticker lookups through the sidecar offset index against loading the
+# whole snapshot, for json and ndjson snapshots of growing size.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_offset_index --sizes 1000 10000 50000
+
+import argparse
+import json
+import random
+import time
+
+from tickertapein.utils import DataLoader
+from tickertapein.utils import DataSaver
+
+from .bench_columnar import records
+from .bench_streaming import scratch_tree
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    scratch_tree()
+    rng = random.Random(5)
+    for count in args.sizes:
+        data = records(count)
+        for file_format in [DataSaver.FILE_FORMAT_JSON, DataSaver.FILE_FORMAT_NDJSON]:
+            saver = DataSaver(file_format=file_format)
+            saver.save(data + [{}], saver.SCRAPE_TYPE_STOCK)
+
+            # the json written record by record is byte for byte what json.dump wrote before
+            if file_format == DataSaver.FILE_FORMAT_JSON:
+                file_name = DataLoader().get_history(saver.SCRAPE_TYPE_STOCK)["file_name"]
+                with open("tickertapein/data/Stocks/" + file_name) as readfile:
+                    assert readfile.read() == json.dumps(data + [{}])
+
+            loader = DataLoader()
+            start_time = time.perf_counter()
+            loader.load(loader.SCRAPE_TYPE_STOCK)
+            full_time = time.perf_counter() - start_time
+
+            # first lookup opens and maps the files, the rest reuse them
+            picks = [rng.randrange(count) for _ in range(args.lookups)]
+            start_time = time.perf_counter()
+            first = loader.load_record(loader.SCRAPE_TYPE_STOCK, data[picks[0]]["ticker"])
+            first_time = time.perf_counter() - start_time
+            assert first == data[picks[0]]
+
+            start_time = time.perf_counter()
+            for i in picks:
+                # by ticker, or by subdirectory in any case
+                key = data[i]["ticker"] if i % 2 else data[i]["url"].rsplit("/", 1)[-1].upper()
+                assert loader.load_record(loader.SCRAPE_TYPE_STOCK, key) == data[i]
+            lookup_time = (time.perf_counter() - start_time) / args.lookups
+            assert loader.load_record(loader.SCRAPE_TYPE_STOCK, "NOSUCHTICKER") is None
+            loader.close()
+
+            print("%6d records %-6s | full load %8.1f ms | first lookup %.3f ms | lookup %.3f ms" %
+                  (count, file_format, full_time * 1000, first_time * 1000, lookup_time * 1000))
+            time.sleep(1)  # snapshot names have one second resolution
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+# Per-page parse time of the legacy BeautifulSoup get_details vs the compiled
+# lxml extractor, on the saved fixture pages. Also checks both produce the
+# same output dicts on the fixtures and a few edited variants of them.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_parse --iterations 200
+
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.scraper_engine.etf import TickerETFs
+
+from .stand_in_server import load_fixture
+
+
+# reference copies of the BeautifulSoup get_details bodies the extractor replaced
+def legacy_stock_details(html: str, url: str) -> dict:
+    soup = BeautifulSoup(html, 'lxml')
+
+    data = {}
+
+    ##### [1] Basics #####
+    # company name
+    html_block = soup.find("h3", class_="security-name")
+    data["name"] = html_block.text if html_block is not None else None
+
+    # ticker name
+    html_block = soup.find("span", class_="ticker")
+    data["ticker"] = html_block.text if html_block is not None else None
+
+    # url
+    data["url"] = url
+
+    # type
+    data["type"] = "stocks"
+
+    # current price
+    html_block = soup.find("span", class_="current-price")
+    data["price"] = html_block.text if html_block is not None else None
+
+    # marketcap, sector and risk
+    html_block = soup.find("div", class_="stock-labels")
+    html_block = html_block.find_all("span", class_="stock-label-title")
+    data["sector"] = html_block[0].text if html_block[0] is not None else None
+    data["marketcap"] = html_block[1].text if html_block[1] is not None else None
+    data["risk"] = html_block[2].text if html_block[2] is not None else None
+
+    # profile
+    html_block = soup.find("div", class_="peers-card")
+    value_h = html_block.h2.text if html_block.h2 is not None else ""
+    value_p = html_block.p.text if html_block.p is not None else ""
+    data["profile"] = value_h + ": " + value_p if (value_h + value_p) != "" else None
+
+    ##### [2] Overview #####
+    overview = {}
+
+    # current price
+    html_block = soup.find("span", class_="current-price")
+    overview["currentPrice"] = html_block.text if html_block is not None else None
+
+    # change absolute-value
+    html_block = soup.find("span", class_="absolute-value")
+    overview["absoluteChange"] = html_block.text if html_block is not None else None
+
+    # change percentage-value
+    html_block = soup.find("span", class_="percentage-value")
+    overview["percentageChange"] = str(html_block.text).replace("(", "").replace(")", "").strip() if html_block is not None else None
+
+    # marketcap, sector and risk
+    html_block = soup.find("div", class_="stock-labels")
+    title = html_block.find_all("span", class_="stock-label-title")
+    desc = html_block.find_all("span", class_="stock-label-desc")
+
+    overview["sectorType"] = title[0].text if title[0] is not None else None
+    overview["sectorDesc"] = desc[0].text if desc[0] is not None else None
+
+    overview["capType"] = title[1].text if title[1] is not None else None
+    overview["capDesc"] = desc[1].text if desc[1] is not None else None
+
+    overview["riskType"] = title[2].text if title[2] is not None else None
+    overview["riskDesc"] = desc[2].text if desc[2] is not None else None
+
+    # put overview into data
+    data["overview"] = overview
+
+    ##### [3] Investment Checklist #####
+    investment_checklist = {}
+
+    # checklist carousel-item get all keys and values
+    html_block = soup.find("div", class_="carousel-item")
+    for item in html_block.children:
+        key = item.find("span", class_="tooltip-holder").contents[0]
+        key = key.title().replace(" ", "")
+        key = key[0].lower() + key[1:]
+        key = "redFlagSafe" if "redflag" in key.lower() else key
+        value = item.find("i")['class'][3].split("-")[1]
+        investment_checklist[key] = value
+
+    # put investmentChecklist into data
+    data["investmentChecklist"] = investment_checklist
+
+    ##### [4] Key Metrics #####
+    keyMetrics = {}
+
+    # PERatio, PBRatio, DividendYield, SectorPE, SectorPB, SectorDividendYield
+    html_block = soup.find("div", class_="ratios-card")
+    keys = html_block.select("span.ellipsis.desktop--only")
+    values = html_block.find_all("div", class_="value")
+    for i in range(len(keys)):
+        key = keys[i].text
+        key = key.title().replace(" ", "")
+        key = key[0].lower() + key[1:]
+        value = values[i].text
+        value = None if str(value) == "—" else str(value)
+        keyMetrics[key] = value
+
+    # put keyMetrics into data
+    data["keyMetrics"] = keyMetrics
+
+    ##### [5] Forecast & Ratings #####
+    forecasts = {}
+
+    # Forecast
+    html_block = soup.find("div", class_="forecast-radial")
+    value = html_block.div.span.contents[0] if str(html_block.div.span.contents[0]) != "—" else ""
+    symbol = html_block.div.span.span.text if html_block.div.span.span is not None else ""
+    forecasts["buyRecommendation"] = value + symbol if (value + symbol) != "" else None
+    forecasts["forecast"] = html_block.h4.text if html_block.h4 is not None else None
+
+    # put keyMetrics into data
+    data["forecasts"] = forecasts
+
+    # return the scraped data
+    return data
+
+
+def legacy_etf_details(html: str, url: str) -> dict:
+    soup = BeautifulSoup(html, 'lxml')
+
+    data = {}
+
+    ##### [1] Basics #####
+    # etf name
+    html_block = soup.find("h3", class_="security-name")
+    data["name"] = html_block.text if html_block is not None else None
+
+    # ticker name
+    html_block = soup.find("span", class_="ticker")
+    data["ticker"] = html_block.text if html_block is not None else None
+
+    # url
+    data["url"] = url
+
+    # type
+    data["type"] = "etfs"
+
+    # tracking
+    html_block = soup.find("p", class_="mb12")
+    data["tracking"] = html_block.text if html_block is not None else None
+
+    # current price
+    html_block = soup.find("span", class_="current-price")
+    data["price"] = html_block.text if html_block is not None else None
+
+    # category, sector and liquidity
+    html_block = soup.find("div", class_="stock-labels")
+    html_block = html_block.find_all("span", class_="stock-label-title")
+    data["sector"] = html_block[0].text if html_block[0] is not None else None
+    data["category"] = html_block[1].text if html_block[1] is not None else None
+    data["liquidity"] = html_block[2].text if html_block[2] is not None else None
+
+    # profile
+    html_block = soup.find("div", class_="amc-profile")
+    value_h = html_block.h2.text if html_block.h2 is not None else ""
+    value_p = html_block.p.text if html_block.p is not None else ""
+    data["profile"] = value_h + ": " + value_p if (value_h + value_p) != "" else None
+
+    ##### [2] Overview #####
+    overview = {}
+
+    # current price
+    html_block = soup.find("span", class_="current-price")
+    overview["currentPrice"] = html_block.text if html_block is not None else None
+
+    # change absolute-value
+    html_block = soup.find("span", class_="absolute-value")
+    overview["absoluteChange"] = html_block.text if html_block is not None else None
+
+    # change percentage-value
+    html_block = soup.find("span", class_="percentage-value")
+    overview["percentageChange"] = str(html_block.text).replace("(", "").replace(")", "").strip() if html_block is not None else None
+
+    # tracking
+    html_block = soup.find("p", class_="mb12")
+    data["tracking"] = html_block.text if html_block is not None else None
+
+    # marketcap, sector and risk
+    html_block = soup.find("div", class_="stock-labels")
+    title = html_block.find_all("span", class_="stock-label-title")
+    desc = html_block.find_all("span", class_="stock-label-desc")
+
+    overview["sectorType"] = title[0].text if title[0] is not None else None
+    overview["sectorDesc"] = desc[0].text if desc[0] is not None else None
+
+    overview["capType"] = title[1].text if title[1] is not None else None
+    overview["capDesc"] = desc[1].text if desc[1] is not None else None
+
+    overview["riskType"] = title[2].text if title[2] is not None else None
+    overview["riskDesc"] = desc[2].text if desc[2] is not None else None
+
+    # put overview into data
+    data["overview"] = overview
+
+    ##### [3] Investment Checklist #####
+    investment_checklist = {}
+
+    # checklist carousel-item get all keys and values
+    html_block = soup.find("div", class_="inv-chk-root")
+    html_block = html_block.find_all("div", class_="commentary-item-root")
+    for item in html_block:
+        key = item.find("span", class_="tooltip-holder").contents[0]
+        key = key.title().replace(" ", "")
+        key = key[0].lower() + key[1:]
+        key = "redFlagSafe" if "redflag" in key.lower() else key
+        value = item.find("i")['class'][3].split("-")[1]
+        investment_checklist[key] = value
+
+    # put investmentChecklist into data
+    data["investmentChecklist"] = investment_checklist
+
+    ##### [4] Key Metrics #####
+    keyMetrics = {}
+
+    # Realtime NAV, AUM, Expense Ratio, Category Exp Ratio, Tracking Error, Category Tracking Err
+    html_block = soup.find("div", class_="ratios-card")
+    keys = html_block.select("span.ellipsis.desktop--only")
+    values = html_block.find_all("div", class_="value")
+    for i in range(len(keys)):
+        key = keys[i].text
+        key = key.title().replace(" ", "")
+        key = key[0].lower() + key[1:]
+        value = values[i].text
+        value = None if str(value) == "—" else str(value)
+        keyMetrics[key] = value
+
+    # put keyMetrics into data
+    data["keyMetrics"] = keyMetrics
+
+    # return the scraped data
+    return data
+
+
+def outcome(fn, *args):
+    try:
+        return fn(*args)
+    except Exception:
+        return "error"
+
+
+def variants(html: str) -> dict:
+    return {
+        "fixture": html,
+        "no forecast value": html.replace(">49<span", ">—<span"),
+        "no ratio values": html.replace(">34.23<", ">—<").replace(">0.05%<", ">—<"),
+        "no stock labels": html.replace("stock-labels", "stock-labelz"),
+        "no profile heading": html.replace("<h2 class=\"jsx-1226812453 typography-h3\">Company Profile</h2>", "").replace("<h2 class=\"jsx-1226812453 typography-h3\">AMC profile</h2>", ""),
+        "error page": "<html><body><h1>Internal Server Error</h1></body></html>"
+    }
+
+
+def time_per_page(fn, html: str, url: str, iterations: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        fn(html, url)
+    return (time.perf_counter() - start_time) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    for scraper_class, fixture, legacy in [(TickerStocks, "stock.html", legacy_stock_details), (TickerETFs, "etf.html", legacy_etf_details)]:
+        html = load_fixture(fixture).decode("utf-8")
+        url = scraper_class().get_url("fixture")
+
+        def compiled(html, url):
+            return scraper_class.EXTRACTOR.extract(html, url=url, type=scraper_class.TYPE)
+
+        for name, page in variants(html).items():
+            assert outcome(legacy, page, url) == outcome(compiled, page, url), scraper_class.TYPE + ": output differs on " + name
+
+        legacy_ms = time_per_page(legacy, html, url, args.iterations)
+        compiled_ms = time_per_page(compiled, html, url, args.iterations)
+        print(scraper_class.TYPE, ": bs4 %.3f ms/page | compiled lxml %.3f ms/page | %.1fx faster" % (legacy_ms, compiled_ms, legacy_ms / compiled_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Threaded fetch+parse vs the fetch/parse pipeline (threads download, a
+# process pool parses) against the local stand-in server.
+#
+# The gain depends on the number of cores: with one core the pipeline only
+# adds inter-process overhead, with N cores parsing runs N-wide outside the GIL.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_pipeline --count 1000 --latency 0.01
+
+import argparse
+import os
+import time
+
+from tickertapein.scraper_engine.stock import TickerStocks
+
+from .stand_in_server import StandInServer
+
+
+def run(scraper, companies_list: list) -> tuple:
+    start_time = time.perf_counter()
+    data = scraper.scrape(companies_list)
+    return data, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency, error_rate=0.01) as server:
+        stocks_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+
+        threaded = TickerStocks(concurrency=args.concurrency, base_url=server.base_url)
+        threaded_data, threaded_time = run(threaded, stocks_list)
+
+        pipeline = TickerStocks(concurrency=args.concurrency, parse_workers=args.parse_workers, base_url=server.base_url)
+        pipeline_data, pipeline_time = run(pipeline, stocks_list)
+
+        assert threaded_data == pipeline_data, "pipeline results differ from threaded results"
+
+        print("cpu cores:", os.cpu_count())
+        print("threaded x%d            : %.1f pages/sec" % (args.concurrency, len(stocks_list) / threaded_time))
+        print("pipeline x%d + %d procs : %.1f pages/sec" % (args.concurrency, args.parse_workers, len(stocks_list) / pipeline_time))
+        print("speedup: %.2fx" % (threaded_time / pipeline_time))
+
+
+if __name__ == "__main__":
+    main()
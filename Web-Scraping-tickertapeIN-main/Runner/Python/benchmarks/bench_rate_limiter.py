@@ -0,0 +1,64 @@
+# Scrapes against a stand-in server that only takes `--server-rate` requests per
+# second: no limiter, a fixed 0.5 s delay (the old time.sleep pacing), and the
+# adaptive per-host limiter started too fast, with plain 429s and with 503 +
+# Retry-After.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_rate_limiter --count 150 --server-rate 20 --concurrency 8
+
+import argparse
+import os
+import sys
+import time
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import HttpSession
+
+from .stand_in_server import StandInServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+from marketdata.rate_limiter import RateLimiter
+
+
+def run(server, companies_list: list, concurrency: int, limiter=None) -> tuple:
+    server.throttled_count = 0
+    scraper = TickerStocks(concurrency=concurrency, base_url=server.base_url,
+                           session=HttpSession(pool_size=max(concurrency, 16), limiter=limiter))
+    start_time = time.perf_counter()
+    data = scraper.scrape(companies_list)
+    elapsed = time.perf_counter() - start_time
+    complete = sum(1 for record in data if record.get("name"))
+    return complete, elapsed, server.throttled_count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=150)
+    parser.add_argument("--server-rate", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    rows = []
+    for status, retry_after in [(429, None), (503, 1)]:
+        with StandInServer(throttle_rate=args.server_rate, throttle_burst=5, throttle_status=status, retry_after=retry_after) as server:
+            companies_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+            runs = [
+                ("no limiter", None),
+                ("fixed 0.5s", RateLimiter(rate=2.0, burst=1, min_rate=2.0, recovery=0)),
+                ("adaptive", RateLimiter(rate=args.server_rate * 3, burst=10, backoff=0.25)),
+            ]
+            for label, limiter in runs:
+                complete, elapsed, throttled = run(server, companies_list, args.concurrency, limiter)
+                final_rate = limiter.stats()["127.0.0.1"]["rate"] if limiter is not None else None
+                rows.append((status, label, complete, elapsed, throttled, final_rate))
+
+    print()
+    print("server takes %.0f req/s, %d pages, concurrency %d" % (args.server_rate, args.count, args.concurrency))
+    for status, label, complete, elapsed, throttled, final_rate in rows:
+        print("  %d %-10s | %3d/%d pages ok | %6.2fs | %5.1f pages/s | %4d throttled responses | rate now %s" %
+              (status, label, complete, args.count, elapsed, complete / elapsed, throttled,
+               "-" if final_rate is None else "%.1f" % final_rate))
+
+
+if __name__ == "__main__":
+    main()
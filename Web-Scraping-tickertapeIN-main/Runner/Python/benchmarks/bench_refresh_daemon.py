@@ -0,0 +1,143 @@
+# Refresh daemon against the local stand-in server with tier intervals in seconds:
+# how often each tier ran, how long readers waited on get() while tiers were
+# refreshing (stale while revalidate), against a one-shot full scrape. A tier that
+# keeps failing must wait out its backoff instead of running again on every tick, and
+# with a response cache in the session a refresh must still pick up changed pages.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_refresh_daemon --count 300 --duration 20 --latency 0.02
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+
+from tickertapein.daemon import RefreshDaemon, Tier
+from tickertapein.daemon.refresh_daemon import select_top, select_large_caps
+from tickertapein.scraper_engine.list import TickerNames
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.scraper_engine.etf import TickerETFs
+from tickertapein.utils import DataLoader, DataSaver, HttpSession, ResponseCache, SnapshotCatalog, SnapshotStore
+
+from .bench_streaming import scratch_tree
+from .stand_in_server import StandInServer, load_company_list
+
+
+def check_error_backoff(saver, loader, catalog, names, stock, etf, seconds=4.0):
+    """Tick as fast as run_forever's floor allows a tier that always fails, returns when it ran"""
+    def failing(daemon):
+        raise RuntimeError("site down")
+
+    daemon = RefreshDaemon(saver, loader, catalog, names, stock, etf, tiers=[Tier("failing", 60, failing)],
+                           workers=1, error_backoff=0.5, max_error_backoff=2.0)
+    runs = []
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        if daemon.tick():
+            runs.append(time.perf_counter() - start_time)
+        time.sleep(0.02)
+    daemon.stop()
+    return runs
+
+
+def check_cached_refresh(server, saver, loader, catalog, max_age):
+    """Refresh the top tier through a session whose cache (6h ttl) already has every page, after the
+    stock pages changed on the site; returns the prices the top companies are served with"""
+    session = HttpSession(pool_size=16, cache=ResponseCache(dir_path=tempfile.mkdtemp()))
+    names = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url, session=session)
+    stock = TickerStocks(concurrency=8, base_url=server.base_url, session=session)
+    etf = TickerETFs(concurrency=8, base_url=server.base_url, session=session)
+    daemon = RefreshDaemon(saver, loader, catalog, names, stock, etf, tiers=[], max_age=max_age)
+
+    top = daemon.top_names.scrape()
+    stock.scrape(names.filter_by_type(top, names.TYPE_STOCK))
+    original = server.pages["stocks"]
+    server.pages["stocks"] = original.replace(b"3,561.20", b"3,600.00")
+    try:
+        daemon.refresh(Tier("cached-top", 60, select_top))
+    finally:
+        server.pages["stocks"] = original
+    daemon.stop()
+    keys = {company["subdirectory"] for company in names.filter_by_type(top, names.TYPE_STOCK)}
+    return {record["price"] for record in daemon.served_records(DataSaver.SCRAPE_TYPE_STOCK) if daemon.record_key(record) in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    scratch_tree()
+    companies = load_company_list()[:args.count]
+    with StandInServer(latency=args.latency, company_list=companies) as server:
+        session = HttpSession(pool_size=16)
+        names = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url, session=session)
+        stock = TickerStocks(concurrency=args.concurrency, base_url=server.base_url, session=session)
+        etf = TickerETFs(concurrency=args.concurrency, base_url=server.base_url, session=session)
+        catalog = SnapshotCatalog()
+        history = SnapshotStore()
+        loader = DataLoader(catalog=catalog, history=history)
+        saver = DataSaver(catalog=catalog, history=history)
+
+        # one-shot: the reader waits for the whole scrape; its snapshots are what the daemon serves first
+        start_time = time.perf_counter()
+        full_list = names.scrape()
+        saver.save(full_list, saver.SCRAPE_TYPE_LIST)
+        with saver.open_writer(saver.SCRAPE_TYPE_STOCK) as writer:
+            stock.scrape(names.filter_by_type(full_list, names.TYPE_STOCK), sink=writer.write)
+        with saver.open_writer(saver.SCRAPE_TYPE_ETF) as writer:
+            etf.scrape(names.filter_by_type(full_list, names.TYPE_ETF), sink=writer.write)
+        one_shot = time.perf_counter() - start_time
+        time.sleep(1)  # snapshot names have one second resolution
+
+        tiers = [Tier("top", 2, select_top), Tier("largecap", 6, select_large_caps), Tier("full", 12, full=True)]
+        daemon = RefreshDaemon(saver, loader, catalog, names, stock, etf, tiers=tiers, workers=2)
+        thread = threading.Thread(target=daemon.run_forever, kwargs={"poll": 0.5}, daemon=True)
+        thread.start()
+
+        # readers poll the stock records the whole time
+        waits = []
+        sizes = set()
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            start_time = time.perf_counter()
+            records = daemon.get(DataSaver.SCRAPE_TYPE_STOCK)
+            waits.append(time.perf_counter() - start_time)
+            sizes.add(len(records))
+            time.sleep(0.01)
+        daemon.stop()
+        thread.join()
+
+        # the cache alone would hand the refresh the old pages for hours; the daemon revalidates them
+        stale_prices = check_cached_refresh(server, saver, loader, catalog, max_age=None)
+        fresh_prices = check_cached_refresh(server, saver, loader, catalog, max_age=0)
+        assert stale_prices == {"3,561.20"}, stale_prices
+        assert fresh_prices == {"3,600.00"}, fresh_prices
+
+        failing_runs = check_error_backoff(saver, loader, catalog, names, stock, etf)
+        # retried after 0.5s, 1s, 2s (capped): four runs in four seconds instead of one per tick
+        gaps = [later - earlier for earlier, later in zip(failing_runs, failing_runs[1:])]
+        assert len(failing_runs) == 4, failing_runs
+        assert all(gap >= backoff for gap, backoff in zip(gaps, [0.5, 1.0, 2.0])), gaps
+
+        runs = {tier.name: len(catalog.db.execute("SELECT 1 FROM refreshes WHERE tier = ? AND status = 'ok'", (tier.name,)).fetchall())
+                for tier in tiers}
+        snapshots = len(catalog.between(DataSaver.SCRAPE_TYPE_STOCK))
+
+    waits.sort()
+    print()
+    print("%d companies | one-shot full scrape %.2fs" % (args.count, one_shot))
+    print("daemon %.0fs: tier runs %s | %d stock snapshots | served sizes %s" %
+          (args.duration, runs, snapshots, sorted(sizes)))
+    print("cached session: top tier served prices %s without revalidating, %s with" % (sorted(stale_prices), sorted(fresh_prices)))
+    print("failing tier ran at %s s (backoff 0.5s doubling, capped at 2s)" % ", ".join("%.2f" % at for at in failing_runs))
+    print("get() over %d reads: median %.3f ms | p99 %.3f ms | max %.1f ms" %
+          (len(waits), statistics.median(waits) * 1000, waits[int(len(waits) * 0.99)] * 1000, waits[-1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
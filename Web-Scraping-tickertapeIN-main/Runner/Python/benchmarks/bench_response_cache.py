@@ -0,0 +1,64 @@
+# Response cache against the local stand-in server: a cold run, a run within
+# the TTL, a run after the TTL (304 revalidation, parse skipped) and a run
+# after the pages changed. Every cached run must return the same records as
+# an uncached scrape of the same pages.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_response_cache --count 300
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from tickertapein.scraper_engine.list import TickerNames
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import HttpSession, ResponseCache
+
+from .stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        with StandInServer(latency=args.latency) as server:
+            stocks_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+            expected = TickerStocks(concurrency=args.concurrency, base_url=server.base_url).scrape(stocks_list)
+
+            cache = ResponseCache(dir_path=cache_dir, ttl=3600)
+
+            def run(label: str):
+                session = HttpSession(cache=cache)
+                stock = TickerStocks(concurrency=args.concurrency, base_url=server.base_url, session=session)
+                names = TickerNames(page_list=["a", "b"], include_type=TickerNames.TYPE_STOCK, base_url=server.base_url, session=session)
+                requests_before = server.request_count
+                start_time = time.perf_counter()
+                data = stock.scrape(stocks_list)
+                names.scrape()
+                seconds = time.perf_counter() - start_time
+                print("%-22s %.2fs, %4d requests to the server, cache %s" % (label + ":", seconds, server.request_count - requests_before, cache.stats()))
+                return data
+
+            assert run("cold") == expected
+            assert run("within ttl") == expected
+
+            cache.ttl = 0
+            assert run("revalidated (304)") == expected
+
+            # the pages change: full downloads again and fresh parses
+            server.pages["stocks"] = server.pages["stocks"].replace(b"3,561.20", b"3,602.75")
+            expected = TickerStocks(concurrency=args.concurrency, base_url=server.base_url).scrape(stocks_list)
+            assert run("pages changed") == expected
+            cache.close()
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Per-stage scrape metrics against the local stand-in server: the same scrape
+# with and without ScrapeMetrics (the records must match and the overhead stay
+# small), then the stage report, the slowest urls and the Prometheus text file.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_scrape_metrics --count 300 --error-rate 0.05
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from tickertapein.scraper_engine.list import TickerNames
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import HttpSession, ScrapeMetrics
+
+from .stand_in_server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    args = parser.parse_args()
+
+    metrics_dir = tempfile.mkdtemp()
+    try:
+        with StandInServer(latency=args.latency, error_rate=args.error_rate) as server:
+            stocks_list = [c for c in server.company_list if c["type"] == "stocks"][:args.count]
+
+            def run(metrics: ScrapeMetrics = None) -> tuple:
+                session = HttpSession(metrics=metrics)
+                names = TickerNames(page_list=["a", "b", "c"], include_type=TickerNames.TYPE_ALL, base_url=server.base_url, session=session)
+                stock = TickerStocks(concurrency=args.concurrency, parse_workers=args.parse_workers, base_url=server.base_url, session=session)
+                start_time = time.perf_counter()
+                names.scrape()
+                data = stock.scrape(stocks_list)
+                return data, time.perf_counter() - start_time
+
+            # warm up, then alternate to even out drift
+            run()
+            plain, instrumented = [], []
+            for _ in range(3):
+                expected, seconds = run()
+                plain.append(seconds)
+                metrics = ScrapeMetrics(dir_path=metrics_dir)
+                data, seconds = run(metrics)
+                instrumented.append(seconds)
+                assert data == expected
+
+            report = metrics.report()
+            stages = report["stages"]
+            failing = sum(1 for company in stocks_list if server.is_failing("/stocks/" + company["subdirectory"]))
+            assert stages["download"]["count"] == len(stocks_list) + 3
+            assert stages["download"]["errors"].get("HTTP 500", 0) == failing
+            assert stages["parse"]["count"] == len(stocks_list) - failing + 3
+            assert stages["connect"]["count"] >= 1
+
+            print()
+            print("without metrics: %.3fs   with metrics: %.3fs   overhead %+.1f%%" % (
+                min(plain), min(instrumented), (min(instrumented) / min(plain) - 1) * 100))
+            print(metrics.summary())
+            print("slowest downloads:", json.dumps(stages["download"]["slowest"][:3]))
+
+            json_path, prom_path = metrics.save()
+            with open(prom_path, "r") as readfile:
+                lines = readfile.read().splitlines()
+            samples = [line for line in lines if not line.startswith("#")]
+            assert all(len(line.rsplit(" ", 1)) == 2 and float(line.rsplit(" ", 1)[1]) >= 0 for line in samples)
+            print("prometheus file: %d samples, e.g." % len(samples))
+            for line in [line for line in samples if "download" in line][-4:]:
+                print("  " + line)
+    finally:
+        shutil.rmtree(metrics_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Time-travel loads through the snapshot catalog against scanning the data
+# directory, over a long series of saved runs.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_snapshot_catalog --runs 500
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from tickertapein.utils import DataLoader
+from tickertapein.utils import DataSaver
+from tickertapein.utils import SnapshotCatalog
+from tickertapein.utils import SnapshotStore
+
+from .bench_streaming import scratch_tree
+
+
+# what answering "as of" takes without the catalog: list the folder, parse the
+# timestamps out of the file names and pick the newest one not after `as_of`
+def scan_as_of(dir_path: str, as_of: datetime) -> str:
+    best = None
+    for name in os.listdir(dir_path):
+        if name == "track.json":
+            continue
+        saved = datetime.strptime(name.split("_", 1)[1].rsplit(".", 1)[0], "%Y_%m_%d_%H_%M_%S")
+        if saved <= as_of and (best is None or saved > best[0]):
+            best = (saved, name)
+    return best[1] if best else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    scratch_tree()
+    catalog = SnapshotCatalog()
+    saver = DataSaver(catalog=catalog)
+    loader = DataLoader(catalog=catalog)
+    dir_path, _, _ = saver.get_paths(saver.SCRAPE_TYPE_STOCK)
+
+    # a run every 30 minutes, back-dated so no real waiting is needed
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    times = [start + timedelta(minutes=30 * i) for i in range(args.runs)]
+    for i, saved in enumerate(times):
+        file_name = "stock_" + saved.strftime("%Y_%m_%d_%H_%M_%S") + ".json"
+        with open(os.path.join(dir_path, file_name), "w") as outfile:
+            json.dump([{"ticker": "T", "run": i}], outfile)
+        catalog.register(saver.SCRAPE_TYPE_STOCK, os.path.join(dir_path, file_name), 1, saved_at=saved)
+
+    rng = random.Random(3)
+    queries = [start + timedelta(minutes=rng.uniform(0, 30 * args.runs)) for _ in range(args.queries)]
+
+    start_time = time.perf_counter()
+    scanned = [scan_as_of(dir_path, when) for when in queries]
+    scan_time = (time.perf_counter() - start_time) / args.queries
+
+    start_time = time.perf_counter()
+    found = [catalog.as_of(saver.SCRAPE_TYPE_STOCK, when)["file_name"] for when in queries]
+    catalog_time = (time.perf_counter() - start_time) / args.queries
+    assert found == scanned
+
+    # loads return the run that was current at the time
+    for when in queries[:20]:
+        expected = max(i for i, saved in enumerate(times) if saved <= when)
+        assert loader.load(saver.SCRAPE_TYPE_STOCK, as_of=when)[0]["run"] == expected
+
+    start_time = time.perf_counter()
+    day = catalog.between(saver.SCRAPE_TYPE_STOCK, start + timedelta(days=3), start + timedelta(days=4))
+    range_time = time.perf_counter() - start_time
+    assert len(day) == 49  # both ends included
+
+    print("%d snapshots | as_of: directory scan %.3f ms, catalog %.3f ms | one day range %.3f ms (%d snapshots)" %
+          (args.runs, scan_time * 1000, catalog_time * 1000, range_time * 1000, len(day)))
+
+    # with a snapshot history the old files are gone, but still load through the catalog
+    history = SnapshotStore()
+    saver = DataSaver(catalog=catalog, history=history)
+    loader = DataLoader(catalog=catalog, history=history)
+    saver.clear(saver.SCRAPE_TYPE_ETF)
+    for i in range(3):
+        saver.save([{"ticker": "NIFTYBEES", "price": str(100 + i)}], saver.SCRAPE_TYPE_ETF)
+        time.sleep(1)  # snapshot names have one second resolution
+    entries = loader.snapshots(saver.SCRAPE_TYPE_ETF)
+    assert [entry["on_disk"] for entry in entries] == [0, 0, 1]
+    assert [loader.load_entry(entry)[0]["price"] for entry in entries] == ["100", "101", "102"]
+    print("history-backed snapshots load through the catalog after their files are removed")
+
+
+if __name__ == "__main__":
+    main()
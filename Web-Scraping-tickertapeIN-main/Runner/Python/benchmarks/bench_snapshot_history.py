@@ -0,0 +1,81 @@
+# Storage of a series of runs in the delta-encoded snapshot history against
+# full timestamped json copies, and the time to rebuild versions.
+#
+# A run series: every run re-prices most stocks (price, change, P/E move), a
+# few checklist values flip, and a handful of listings come and go.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_snapshot_history --count 5000 --runs 48
+
+import argparse
+import random
+import tempfile
+import time
+
+from tickertapein.utils import SnapshotStore
+
+from .bench_columnar import records, CHECKS
+
+
+def next_run(data: list, rng: random.Random, run: int) -> list:
+    data = [dict(record, overview=dict(record["overview"]), keyMetrics=dict(record["keyMetrics"]),
+                 investmentChecklist=dict(record["investmentChecklist"])) for record in data]
+    for record in data:
+        if rng.random() < 0.7:
+            price = "{:,.2f}".format(rng.uniform(5, 30000))
+            record["price"] = record["overview"]["currentPrice"] = price
+            record["overview"]["percentageChange"] = "%+.2f" % rng.uniform(-50, 50)
+            record["overview"]["absoluteChange"] = "%.2f%%" % rng.uniform(0, 10)
+            record["keyMetrics"]["peRatio"] = "%.2f" % rng.uniform(1, 120)
+        if rng.random() < 0.02:
+            key = rng.choice(list(record["investmentChecklist"]))
+            record["investmentChecklist"][key] = rng.choice(CHECKS)
+
+    # delistings and new listings, plus the odd failed page
+    for _ in range(rng.randint(0, 3)):
+        data.pop(rng.randrange(len(data)))
+    for i in range(rng.randint(0, 3)):
+        record = dict(data[0], ticker="NEW" + str(run) + "_" + str(i), url=data[0]["url"] + "-new-" + str(run) + "-" + str(i))
+        data.insert(rng.randrange(len(data)), record)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=48)
+    parser.add_argument("--compact-every", type=int, default=24)
+    parser.add_argument("--compact-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+
+    store = SnapshotStore(dir_path=tempfile.mkdtemp(), compact_every=args.compact_every, compact_ratio=args.compact_ratio)
+    rng = random.Random(11)
+    data = records(args.count)
+    series = []
+
+    save_time = 0
+    for run in range(args.runs):
+        if run > 0:
+            data = next_run(data, rng, run)
+        series.append(data)
+        start_time = time.perf_counter()
+        store.save(data + [{}], "stock")
+        save_time += time.perf_counter() - start_time
+
+    # every version rebuilds exactly, in order, without the failed page
+    rebuild_times = []
+    for entry, expected in zip(store.versions("stock"), series):
+        start_time = time.perf_counter()
+        assert store.load("stock", entry["version"]) == expected, entry
+        rebuild_times.append(time.perf_counter() - start_time)
+
+    stats = store.stats("stock")
+    print("%d runs of %d records, %d bases" % (stats["versions"], args.count, stats["bases"]))
+    print("full json copies %8.1f MB" % (stats["fullBytes"] / 2 ** 20))
+    print("snapshot history %8.1f MB (%.1f%% saved)" % (stats["bytes"] / 2 ** 20, stats["savedRatio"] * 100))
+    print("save %.0f ms/run | rebuild base %.0f ms, worst version %.0f ms" %
+          (save_time / args.runs * 1000, rebuild_times[0] * 1000, max(rebuild_times) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Whole-list json vs streamed ndjson snapshots: peak memory while saving and
+# loading, plus a check that streamed scrapes write the same records in the
+# same order as the returned lists in every scrape mode.
+#
+# run from Runner/Python:
+#   python -m benchmarks.bench_streaming --count 20000
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.utils import DataLoader
+from tickertapein.utils import DataSaver
+
+from .stand_in_server import StandInServer, load_fixture
+
+
+# the saver and loader work relative to the cwd, keep everything in a scratch tree
+def scratch_tree() -> str:
+    root = tempfile.mkdtemp()
+    for folder in ["Lists", "Stocks", "ETFs"]:
+        os.makedirs(os.path.join(root, "tickertapein", "data", folder))
+        with open(os.path.join(root, "tickertapein", "data", folder, "track.json"), "w") as outfile:
+            json.dump({}, outfile)
+    os.chdir(root)
+    return root
+
+
+def measure(function) -> tuple:
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def records(count: int):
+    # a parsed page, varied per record
+    base = TickerStocks.parse_page(load_fixture("stock.html").decode(), "https://www.tickertape.in/stocks/tcs")
+    for i in range(count):
+        record = json.loads(json.dumps(base))
+        record["url"] = base["url"] + "-" + str(i)
+        yield record
+
+
+def bench_memory(count: int):
+    saver = DataSaver(file_format=DataSaver.FILE_FORMAT_JSON)
+    loader = DataLoader()
+
+    def save_json():
+        saver.save(list(records(count)), saver.SCRAPE_TYPE_STOCK)
+
+    def save_ndjson():
+        with saver.open_writer(saver.SCRAPE_TYPE_STOCK) as writer:
+            for record in records(count):
+                writer.write(record)
+
+    def load_json():
+        return sum(1 for _ in loader.load(loader.SCRAPE_TYPE_STOCK))
+
+    def iter_ndjson():
+        return sum(1 for _ in loader.iter_records(loader.SCRAPE_TYPE_STOCK))
+
+    for label, save, load in [("json", save_json, load_json), ("ndjson", save_ndjson, iter_ndjson)]:
+        _, save_time, save_peak = measure(save)
+        loaded, load_time, load_peak = measure(load)
+        assert loaded == count
+        print("%-6s save %.2fs peak %8.0f KB | load %.2fs peak %8.0f KB" %
+              (label, save_time, save_peak / 1024, load_time, load_peak / 1024))
+
+
+def check_modes(count: int):
+    saver = DataSaver()
+    loader = DataLoader()
+    with StandInServer(error_rate=0.05) as server:
+        companies_list = [c for c in server.company_list if c["type"] == "stocks"][:count]
+        expected = TickerStocks(base_url=server.base_url).scrape(companies_list)
+        for options in [{}, {"concurrency": 8}, {"concurrency": 4, "parse_workers": 1}]:
+            scraper = TickerStocks(base_url=server.base_url, **options)
+            with saver.open_writer(saver.SCRAPE_TYPE_STOCK) as writer:
+                returned = scraper.scrape(companies_list, sink=writer.write)
+            assert returned == []
+            assert list(loader.iter_records(loader.SCRAPE_TYPE_STOCK)) == expected, options
+            assert loader.load(loader.SCRAPE_TYPE_STOCK) == expected
+            assert loader.get_history(loader.SCRAPE_TYPE_STOCK)["count"] == len(expected)
+            time.sleep(1)  # snapshot names have one second resolution
+    print("streamed snapshots match the returned lists in serial, async and pipeline mode")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=100)
+    args = parser.parse_args()
+
+    scratch_tree()
+    bench_memory(args.count)
+    check_modes(args.pages)
+
+
+if __name__ == "__main__":
+    main()
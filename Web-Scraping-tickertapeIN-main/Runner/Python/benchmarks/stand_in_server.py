@@ -0,0 +1,184 @@
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+COMPANY_LIST_PATH = os.path.join(BENCHMARKS_DIR, "..", "..", "..", "Scraped Data", "full-company-list.json")
+
+A_Z = list("abcdefghijklmnopqrstuvwxyz")
+TOP_COUNT = 50
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as readfile:
+        return readfile.read()
+
+
+def load_company_list() -> list:
+    with open(COMPANY_LIST_PATH, "r") as readfile:
+        return json.load(readfile)
+
+
+# render a tickertape "/stocks?filter=<page>" list page from a company list
+# (the "top" page lists the first TOP_COUNT companies)
+def render_list_page(company_list: list, page: str) -> bytes:
+    items = []
+    for i, company in enumerate(company_list):
+        first = company["name"][:1].lower()
+        if page == "top":
+            in_page = i < TOP_COUNT
+        else:
+            in_page = first == page if page in A_Z else (page == "others" and first not in A_Z)
+        if in_page:
+            items.append('<li class="jsx-1419887389 list-item"><a href="/' + company["type"] + '/' + company["subdirectory"] + '">' + company["name"] + '</a></li>')
+    body = '<!DOCTYPE html><html lang="en-US"><head><meta charSet="utf-8"/></head><body><div id="__next"><ul class="jsx-1419887389 stock-list">' + "".join(items) + '</ul></div></body></html>'
+    return body.encode("utf-8")
+
+
+class StandInServer:
+    """Local stand-in for www.tickertape.in serving fixture pages.
+
+    Stock and ETF pages are served from `fixtures/` for any subdirectory,
+    list pages are rendered from the recorded company list. `latency` adds
+    an artificial delay to every response and `error_rate` deterministically
+    fails that fraction of company pages with a 500. Bodies are gzipped for
+    clients that ask for it unless `compress` is off, and pages carry
+    ETag/Last-Modified validators answered with 304 unless `validators` is off.
+    With `throttle_rate` the server only takes that many requests per second
+    (bursts up to `throttle_burst`) and answers the rest with `throttle_status`
+    (429 or 503), carrying a Retry-After of `retry_after` seconds when set.
+    Assign to `pages` to change what later requests get.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, company_list: list = None, compress: bool = True,
+                 validators: bool = True, throttle_rate: float = 0.0, throttle_burst: int = 1, throttle_status: int = 429,
+                 retry_after: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = throttle_burst
+        self.throttle_status = throttle_status
+        self.retry_after = retry_after
+        self.throttle_tokens = float(throttle_burst)
+        self.throttle_updated = time.monotonic()
+        self.throttled_count = 0
+        self.compress = compress
+        self.validators = validators
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.company_list = company_list if company_list is not None else load_company_list()
+        self.pages = {"stocks": load_fixture("stock.html"), "etfs": load_fixture("etf.html")}
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return "http://" + host + ":" + str(port)
+
+    def is_failing(self, path: str) -> bool:
+        return (zlib.crc32(path.encode("utf-8")) % 1000) < self.error_rate * 1000
+
+    # server side token bucket: False when this request is over the allowed rate
+    def admit(self) -> bool:
+        if self.throttle_rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.throttle_tokens = min(self.throttle_burst, self.throttle_tokens + (now - self.throttle_updated) * self.throttle_rate)
+            self.throttle_updated = now
+            if self.throttle_tokens >= 1:
+                self.throttle_tokens -= 1
+                return True
+            self.throttled_count += 1
+            return False
+
+    def respond(self, path: str, query: dict) -> tuple:
+        parts = path.strip("/").split("/")
+        if parts == ["stocks"] and "filter" in query:
+            return 200, render_list_page(self.company_list, query["filter"][0])
+        if len(parts) == 2 and parts[0] in self.pages:
+            if self.is_failing(path):
+                return 500, b"<html><body><h1>Internal Server Error</h1></body></html>"
+            return 200, self.pages[parts[0]]
+        return 404, b"<html><body><h1>Not Found</h1></body></html>"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # keep-alive responses must not sit in the delayed-ACK window
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with server.lock:
+                    server.request_count += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                if not server.admit():
+                    body = b"<html><body><h1>Too Many Requests</h1></body></html>"
+                    self.send_response(server.throttle_status)
+                    if server.retry_after is not None:
+                        self.send_header("Retry-After", str(server.retry_after))
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                url = urlsplit(self.path)
+                status, body = server.respond(url.path, parse_qs(url.query))
+
+                # validators: a page that did not change is answered with 304 Not Modified
+                etag = '"' + format(zlib.crc32(body), "08x") + '"'
+                if status == 200 and server.validators and self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                if status == 200 and server.validators:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", server.last_modified)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=6)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
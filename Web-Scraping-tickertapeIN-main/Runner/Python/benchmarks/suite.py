@@ -0,0 +1,260 @@
+# Offline benchmark suite: parse, names list, stock pages, persistence and the
+# end-to-end Runner flow, against fixture pages served by the local stand-in
+# server with configurable latency and error injection. Every case runs in its
+# own process so its peak RSS is its own. Results are written as JSON and can
+# be compared against an earlier run.
+#
+# run from Runner/Python:
+#   python -m benchmarks.suite --out bench.json
+#   python -m benchmarks.suite --latency 0.05 --error-rate 0.05 --compare bench.json
+#   python -m benchmarks.suite --cases parse.stock stocks.serial stocks.concurrent --repeat 5
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from tickertapein.scraper_engine.list import TickerNames
+from tickertapein.scraper_engine.stock import TickerStocks
+from tickertapein.scraper_engine.etf import TickerETFs
+from tickertapein.utils import DataLoader, DataSaver, HttpSession
+
+from .bench_columnar import records
+from .bench_streaming import scratch_tree
+from .stand_in_server import StandInServer, load_company_list, load_fixture
+
+# metrics where a lower value is better, the rest are better higher
+LOWER_IS_BETTER = {"seconds", "parseMsPerPage", "peakRssKb", "errors"}
+
+
+def peak_rss_kb() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def quietly(function):
+    # the scrapers print progress dots, keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function()
+
+
+def timed(function) -> tuple:
+    start_time = time.perf_counter()
+    result = quietly(function)
+    return result, time.perf_counter() - start_time
+
+
+def page_metrics(data: list, seconds: float) -> dict:
+    ok = sum(1 for record in data if record)
+    return {"pages": len(data), "errors": len(data) - ok, "seconds": round(seconds, 4),
+            "pagesPerSec": round(len(data) / seconds, 2) if seconds else None}
+
+
+def case_parse(args, scraper_class, fixture: str) -> dict:
+    html = load_fixture(fixture).decode()
+    url = "https://www.tickertape.in/" + scraper_class.TYPE + "/fixture"
+    scraper_class.parse_page(html, url)
+    start_time = time.perf_counter()
+    for _ in range(args.iterations):
+        scraper_class.parse_page(html, url)
+    seconds = time.perf_counter() - start_time
+    return {"pages": args.iterations, "seconds": round(seconds, 4), "parseMsPerPage": round(seconds / args.iterations * 1000, 4),
+            "pagesPerSec": round(args.iterations / seconds, 2)}
+
+
+def case_names(args, server, concurrency: int) -> dict:
+    names = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url, concurrency=concurrency)
+    data, seconds = timed(names.scrape)
+    return {"pages": len(TickerNames.PAGE_LIST_ALL), "names": len(data), "seconds": round(seconds, 4),
+            "pagesPerSec": round(len(TickerNames.PAGE_LIST_ALL) / seconds, 2)}
+
+
+def case_stocks(args, server, concurrency: int = 1, parse_workers: int = 0) -> dict:
+    companies = [company for company in server.company_list if company["type"] == "stocks"][:args.count]
+    scraper = TickerStocks(concurrency=concurrency, parse_workers=parse_workers, base_url=server.base_url)
+    data, seconds = timed(lambda: scraper.scrape(companies))
+    return page_metrics(data, seconds)
+
+
+def case_persist(args, file_format: str) -> dict:
+    scratch_tree()
+    data = list(records(args.records))
+    saver = DataSaver(file_format=file_format)
+    loader = DataLoader()
+    _, save_seconds = timed(lambda: saver.save(data, saver.SCRAPE_TYPE_STOCK))
+    loaded, load_seconds = timed(lambda: sum(1 for _ in loader.iter_records(loader.SCRAPE_TYPE_STOCK)))
+    assert loaded == len(data)
+    return {"records": len(data), "seconds": round(save_seconds + load_seconds, 4), "saveSeconds": round(save_seconds, 4),
+            "loadSeconds": round(load_seconds, 4), "recordsPerSec": round(len(data) / (save_seconds + load_seconds), 2)}
+
+
+def case_runner(args, server, concurrency: int) -> dict:
+    # what main.py does: names list, stock and etf pages, snapshots streamed to disk
+    scratch_tree()
+    session = HttpSession(pool_size=max(concurrency, 16))
+    names = TickerNames(TickerNames.PAGE_LIST_ALL, TickerNames.TYPE_ALL, base_url=server.base_url, session=session,
+                        concurrency=concurrency)
+    stock = TickerStocks(concurrency=concurrency, base_url=server.base_url, session=session)
+    etf = TickerETFs(concurrency=concurrency, base_url=server.base_url, session=session)
+    saver = DataSaver()
+
+    def run():
+        full_list = names.scrape()
+        saver.save(full_list, saver.SCRAPE_TYPE_LIST)
+        counts = []
+        for scraper, scrape_type, page_type in [(stock, saver.SCRAPE_TYPE_STOCK, names.TYPE_STOCK), (etf, saver.SCRAPE_TYPE_ETF, names.TYPE_ETF)]:
+            written = []
+            with saver.open_writer(scrape_type) as writer:
+                scraper.scrape(names.filter_by_type(full_list, page_type), sink=lambda record: (written.append(bool(record)), writer.write(record)))
+            counts.extend(written)
+        return counts
+
+    counts, seconds = timed(run)
+    pages = len(counts) + len(TickerNames.PAGE_LIST_ALL)
+    return {"pages": pages, "errors": counts.count(False), "seconds": round(seconds, 4), "pagesPerSec": round(pages / seconds, 2)}
+
+
+def stand_in(args) -> StandInServer:
+    # the runner cases scrape every company of the (trimmed) list
+    company_list = load_company_list()[:args.count]
+    return StandInServer(latency=args.latency, error_rate=args.error_rate, company_list=company_list)
+
+
+CASES = {
+    "parse.stock": lambda args: case_parse(args, TickerStocks, "stock.html"),
+    "parse.etf": lambda args: case_parse(args, TickerETFs, "etf.html"),
+    "names.serial": lambda args: with_server(args, lambda server: case_names(args, server, 1)),
+    "names.concurrent": lambda args: with_server(args, lambda server: case_names(args, server, args.concurrency)),
+    "stocks.serial": lambda args: with_server(args, lambda server: case_stocks(args, server)),
+    "stocks.concurrent": lambda args: with_server(args, lambda server: case_stocks(args, server, concurrency=args.concurrency)),
+    "stocks.pipeline": lambda args: with_server(args, lambda server: case_stocks(args, server, concurrency=args.concurrency,
+                                                                                parse_workers=args.parse_workers)),
+    "persist.json": lambda args: case_persist(args, DataSaver.FILE_FORMAT_JSON),
+    "persist.ndjson": lambda args: case_persist(args, DataSaver.FILE_FORMAT_NDJSON),
+    "persist.parquet": lambda args: case_persist(args, DataSaver.FILE_FORMAT_PARQUET),
+    "runner.serial": lambda args: with_server(args, lambda server: case_runner(args, server, 1)),
+    "runner.concurrent": lambda args: with_server(args, lambda server: case_runner(args, server, args.concurrency)),
+}
+
+
+def with_server(args, function) -> dict:
+    with stand_in(args) as server:
+        result = function(server)
+        result["requests"] = server.request_count
+    return result
+
+
+# run one case in this process and print its metrics as json
+def run_case(args):
+    cwd = os.getcwd()
+    try:
+        result = CASES[args.case](args)
+    finally:
+        os.chdir(cwd)
+    result["peakRssKb"] = peak_rss_kb()
+    print(json.dumps(result))
+
+
+# run every case in a child process of its own, so each peak RSS is that case's alone;
+# of `repeat` runs the one with the median time is kept
+def run_suite(args) -> dict:
+    options = ["--count", str(args.count), "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+               "--concurrency", str(args.concurrency), "--parse-workers", str(args.parse_workers),
+               "--iterations", str(args.iterations), "--records", str(args.records)]
+    results = {}
+    for case in args.cases:
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            completed = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--case", case] + options,
+                                       capture_output=True, text=True)
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "exit " + str(completed.returncode)
+                runs = [{"failed": error}]
+                break
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        runs.sort(key=lambda run: run.get("seconds", 0))
+        results[case] = runs[len(runs) // 2]
+        print("%-18s %s" % (case, json.dumps(results[case])), flush=True)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# relative change of every metric against a baseline run, flagged when it got worse by more than `threshold`
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print()
+    print("against baseline " + str(baseline["meta"].get("commit")) + " (" + baseline["meta"]["datetime"] + "):")
+    for case, metrics in results.items():
+        before = baseline["results"].get(case)
+        if before is None or "failed" in metrics or "failed" in before:
+            continue
+        for metric in ["seconds", "pagesPerSec", "parseMsPerPage", "recordsPerSec", "peakRssKb", "errors"]:
+            if metric not in metrics or not before.get(metric):
+                continue
+            change = (metrics[metric] - before[metric]) / before[metric]
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            if worse:
+                regressions.append((case, metric, before[metric], metrics[metric]))
+            print("  %-18s %-15s %12s -> %-12s %+7.1f%%%s" % (case, metric, before[metric], metrics[metric], change * 100,
+                                                               "  REGRESSION" if worse else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--case", choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--count", type=int, default=200, help="companies in the stand-in list / stock pages per case")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--iterations", type=int, default=200, help="parse iterations per fixture")
+    parser.add_argument("--records", type=int, default=5000, help="records per persistence case")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the median one is reported")
+    parser.add_argument("--out", help="write the results as json")
+    parser.add_argument("--compare", help="baseline json of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    if args.case is not None:
+        run_case(args)
+        return
+
+    report = {
+        "meta": {
+            "datetime": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "options": {key: value for key, value in vars(args).items() if key not in ("case", "out", "compare", "cases")}
+        },
+        "results": run_suite(args)
+    }
+    if args.out:
+        with open(args.out, "w") as outfile:
+            json.dump(report, outfile, indent=1)
+        print("results written to " + args.out)
+    if args.compare:
+        with open(args.compare, "r") as readfile:
+            regressions = compare(report["results"], json.load(readfile), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,101 @@
+import os
+import sys
+
 from tickertapein.scraper_engine.list import TickerNames
 from tickertapein.scraper_engine.stock import TickerStocks
 from tickertapein.scraper_engine.etf import TickerETFs
+from tickertapein.daemon import RefreshDaemon
 from tickertapein.utils import DataLoader
 from tickertapein.utils import DataSaver
+from tickertapein.utils import HttpSession
+from tickertapein.utils import ResponseCache
+from tickertapein.utils import CheckpointJournal
+from tickertapein.utils import SnapshotStore
+from tickertapein.utils import SnapshotCatalog
+from tickertapein.utils import ScrapeMetrics
+from tickertapein.utils import DeadLetterQueue
+
+# the per-host rate limiter shared with the BSE scripts lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+from marketdata.rate_limiter import shared_limiter
 
 # create all required scraper and utility objects
-names = TickerNames(page_list=TickerNames.PAGE_LIST_ALL, include_type=TickerNames.TYPE_ALL, log=True)
-stock = TickerStocks(log=True)
-etf = TickerETFs(log=True)
-loader = DataLoader(log=True)
-saver = DataSaver(log=True)
+metrics = ScrapeMetrics(log=True)
+session = HttpSession(pool_size=16, cache=ResponseCache(), limiter=shared_limiter(), metrics=metrics)
+names = TickerNames(page_list=TickerNames.PAGE_LIST_ALL, include_type=TickerNames.TYPE_ALL, log=True, session=session)
+dead_letters = DeadLetterQueue(log=True)
+stock = TickerStocks(log=True, concurrency=8, session=session, dead_letters=dead_letters)
+etf = TickerETFs(log=True, concurrency=8, session=session, dead_letters=dead_letters)
+history = SnapshotStore(log=True)
+catalog = SnapshotCatalog(log=True)
+loader = DataLoader(log=True, catalog=catalog, history=history)
+saver = DataSaver(log=True, history=history, catalog=catalog, metrics=metrics)
+stock_journal = CheckpointJournal(saver.SCRAPE_TYPE_STOCK, log=True)
+etf_journal = CheckpointJournal(saver.SCRAPE_TYPE_ETF, log=True)
+
+# `python main.py --daemon` keeps the snapshots fresh instead: the top list every few minutes,
+# large caps hourly and everything nightly, scheduled from the catalog
+if "--daemon" in sys.argv:
+    RefreshDaemon(saver, loader, catalog, names, stock, etf, log=True).run_forever()
+    sys.exit(0)
 
 # main process
+# without a saved names list the stock scrape starts on the companies of each list page as soon
+# as that page is in, and the list is collected on the way for its snapshot
+discovered = []
+
+
+def discover():
+    for company in names.iter_companies():
+        discovered.append(company)
+        yield company
+
+
 if loader.data_exists(loader.SCRAPE_TYPE_LIST):
     full_list = loader.load(loader.SCRAPE_TYPE_LIST)
+    companies = names.filter_by_type(full_list, names.TYPE_STOCK)
 else:
-    full_list = names.scrape()
+    full_list = None
+    companies = discover()
+
+if not loader.data_exists(loader.SCRAPE_TYPE_STOCK):
+    # records are streamed to disk as they are scraped; an interrupted run resumes
+    # from the journal, which is dropped once the snapshot is saved
+    with saver.open_writer(saver.SCRAPE_TYPE_STOCK) as writer:
+        stock.scrape(companies, journal=stock_journal, sink=writer.write)
+    stock_journal.clear()
+
+if full_list is None:
+    # the rest of the list, when the stock scrape didn't need it
+    for _ in companies:
+        pass
+    full_list = discovered
     saver.save(full_list, saver.SCRAPE_TYPE_LIST)
 
-stocks_list = names.filter_by_type(full_list, names.TYPE_STOCK)
 etfs_list = names.filter_by_type(full_list, names.TYPE_ETF)
 
-if loader.data_exists(loader.SCRAPE_TYPE_STOCK):
-    stock_data = loader.load(loader.SCRAPE_TYPE_STOCK)
-else:
-    stock_data = stock.scrape(stocks_list)
-    saver.save(stock_data, saver.SCRAPE_TYPE_STOCK)
+if not loader.data_exists(loader.SCRAPE_TYPE_ETF):
+    with saver.open_writer(saver.SCRAPE_TYPE_ETF) as writer:
+        etf.scrape(etfs_list, journal=etf_journal, sink=writer.write)
+    etf_journal.clear()
 
-if loader.data_exists(loader.SCRAPE_TYPE_ETF):
-    etf_data = loader.load(loader.SCRAPE_TYPE_ETF)
-else:
-    etf_data = etf.scrape(etfs_list)
-    saver.save(etf_data, saver.SCRAPE_TYPE_ETF)
+# pages that failed (in this or an earlier run) are fetched again with backoff and patched
+# into the snapshots, instead of rerunning the whole scrape
+stock.retry_failed(saver, saver.SCRAPE_TYPE_STOCK)
+etf.retry_failed(saver, saver.SCRAPE_TYPE_ETF)
+print("dead letters:", dead_letters.stats())
+
+print("http session:", session.stats())
+
+# per stage timings: scrape_metrics.json and a scrape_metrics.prom for node_exporter's textfile collector
+print(metrics.summary())
+metrics.save()
 
 print(loader.load(loader.SCRAPE_TYPE_LIST))
-print(loader.load(loader.SCRAPE_TYPE_STOCK))
-print(loader.load(loader.SCRAPE_TYPE_ETF))
+for record in loader.iter_records(loader.SCRAPE_TYPE_STOCK):
+    print(record)
+for record in loader.iter_records(loader.SCRAPE_TYPE_ETF):
+    print(record)
 
 saver.clear_all()
 
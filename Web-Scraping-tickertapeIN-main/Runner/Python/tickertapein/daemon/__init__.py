@@ -0,0 +1 @@
+from .refresh_daemon import RefreshDaemon, Tier
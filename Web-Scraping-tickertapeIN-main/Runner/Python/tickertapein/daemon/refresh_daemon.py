@@ -0,0 +1,221 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from ..scraper_engine.list import TickerNames
+from ..scraper_engine.stock import TickerStocks
+from ..scraper_engine.etf import TickerETFs
+from ..utils.data_loader import DataLoader
+from ..utils.data_saver import DataSaver
+from ..utils.snapshot_catalog import SnapshotCatalog
+
+
+class Tier:
+
+    # a group of companies refreshed every `interval` seconds; `select(daemon)` returns the
+    # companies (name, type, subdirectory) to scrape, a `full` tier rescrapes the names list
+    # as well and replaces the snapshots instead of patching them
+    def __init__(self, name: str, interval: float, select=None, full: bool = False):
+        self.name = name
+        self.interval = interval
+        self.select = select
+        self.full = full
+
+
+# the companies on tickertape's "top" list page
+def select_top(daemon: "RefreshDaemon") -> list:
+    return daemon.top_names.scrape()
+
+
+# the stocks of the latest snapshot tagged as large caps
+def select_large_caps(daemon: "RefreshDaemon") -> list:
+    companies = []
+    for record in daemon.served_records(DataSaver.SCRAPE_TYPE_STOCK):
+        if record and "large" in str(record.get("marketcap", "")).lower():
+            companies.append({"name": record.get("name"), "type": TickerStocks.TYPE, "subdirectory": RefreshDaemon.record_key(record)})
+    return companies
+
+
+class RefreshDaemon:
+
+    # top list every 5 minutes, large caps hourly, everything nightly
+    DEFAULT_TIERS = [
+        Tier("top", 5 * 60, select_top),
+        Tier("largecap", 60 * 60, select_large_caps),
+        Tier("full", 24 * 60 * 60, full=True)
+    ]
+
+    SCRAPE_TYPES = [DataSaver.SCRAPE_TYPE_STOCK, DataSaver.SCRAPE_TYPE_ETF]
+
+    # a full refresh is refused when the names list shrank below this share of the last one
+    MIN_LIST_RATIO = 0.9
+
+    def __init__(self, saver: DataSaver, loader: DataLoader, catalog: SnapshotCatalog, names: TickerNames,
+                 stock: TickerStocks, etf: TickerETFs, tiers: list = None, workers: int = 2,
+                 error_backoff: float = 30.0, max_error_backoff: float = 60 * 60, max_age: float = 0, log: bool = False):
+        self.saver = saver
+        self.loader = loader
+        self.catalog = catalog
+        self.names = names
+        self.stock = stock
+        self.etf = etf
+        self.tiers = tiers if tiers is not None else self.DEFAULT_TIERS
+        # a failing tier is retried after error_backoff seconds, doubled with every failure in a row
+        self.error_backoff = error_backoff
+        self.max_error_backoff = max_error_backoff
+        self.log = log
+        self.top_names = TickerNames(TickerNames.PAGE_LIST_TOP, TickerNames.TYPE_ALL, base_url=names.BASE_URL, session=names.session)
+
+        # a response cache must not answer a refresh with the page it already has: cached pages older
+        # than `max_age` are revalidated with a conditional GET (a 304 still skips the download and the
+        # parse), by default every time
+        for session in {id(scraper.session): scraper.session for scraper in [names, stock, etf]}.values():
+            session.max_age = max_age
+
+        # at most `workers` tiers refresh at once, a tier never runs twice at the same time;
+        # each scraper bounds its own page fetches with its concurrency
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="refresh")
+        self.running = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        # scrape type -> records being served; saves of one type are merged one at a time
+        self.served = {}
+        self.save_locks = {scrape_type: threading.Lock() for scrape_type in [DataSaver.SCRAPE_TYPE_LIST] + self.SCRAPE_TYPES}
+        self.saved_at = {}
+
+    # records are matched by their page (the subdirectory at the end of the url)
+    @staticmethod
+    def record_key(record: dict) -> str:
+        return record.get("subdirectory") or (record.get("url") or "").rstrip("/").rsplit("/", 1)[-1]
+
+    # seconds until a tier is due, from its last refresh in the catalog: the tier's interval after a
+    # successful one, a backoff growing with the failures in a row (never past the interval) after a failed one
+    def due_in(self, tier: Tier) -> float:
+        last = self.catalog.last_refresh(tier.name, status=None)
+        if last is None:
+            return 0.0
+        if last["status"] == "ok":
+            return max(0.0, last["finished_at"] + tier.interval - time.time())
+        errors = self.catalog.consecutive_errors(tier.name)
+        backoff = min(self.error_backoff * 2 ** max(0, errors - 1), self.max_error_backoff, tier.interval)
+        return max(0.0, last["finished_at"] + backoff - time.time())
+
+    # the records of a scrape type as of the last save
+    def served_records(self, scrape_type: str) -> list:
+        with self.lock:
+            records = self.served.get(scrape_type)
+        if records is None:
+            records = self.loader.load(scrape_type)
+            with self.lock:
+                records = self.served.setdefault(scrape_type, records)
+        return records
+
+    # stale while revalidate: the last saved records straight away, while any tier that is
+    # due gets refreshed in the background; nobody waits on a scrape
+    def get(self, scrape_type: str) -> list:
+        records = self.served_records(scrape_type)
+        if not self.stopped.is_set():
+            self.tick()
+        return records
+
+    def get_record(self, scrape_type: str, key: str) -> dict:
+        return self.loader.load_record(scrape_type, key)
+
+    # start every due tier that isn't already running, returns the names of the started ones
+    def tick(self) -> list:
+        started = []
+        with self.lock:
+            for tier in self.tiers:
+                future = self.running.get(tier.name)
+                if future is not None and not future.done():
+                    continue
+                if self.due_in(tier) > 0:
+                    continue
+                self.running[tier.name] = self.pool.submit(self.refresh, tier)
+                started.append(tier.name)
+        if self.log and started:
+            print("refreshing tiers: " + ", ".join(started))
+        return started
+
+    def refresh(self, tier: Tier) -> int:
+        started_at = time.time()
+        count = 0
+        try:
+            if tier.full:
+                companies = self.names.scrape()
+                # list pages that failed would drop every company on them, keep the old list instead
+                listed = len(self.served_records(DataSaver.SCRAPE_TYPE_LIST))
+                if len(companies) < listed * self.MIN_LIST_RATIO:
+                    raise RuntimeError("names list came back with " + str(len(companies)) + " of " + str(listed) + " companies")
+                self.__save(DataSaver.SCRAPE_TYPE_LIST, companies, companies, replace=True)
+            else:
+                companies = tier.select(self)
+
+            for scraper, scrape_type in [(self.stock, DataSaver.SCRAPE_TYPE_STOCK), (self.etf, DataSaver.SCRAPE_TYPE_ETF)]:
+                todo = [company for company in companies if company["type"] == scraper.TYPE]
+                if not todo:
+                    continue
+                count += self.__save(scrape_type, scraper.scrape(todo), todo, replace=tier.full)
+            status = "ok"
+        except Exception as e:
+            # a failed refresh keeps serving the last data and is retried after a backoff
+            print("refresh of tier " + tier.name + " failed: " + str(e))
+            if self.log:
+                traceback.print_exc()
+            status = "error: " + type(e).__name__
+        self.catalog.record_refresh(tier.name, started_at, time.time(), count, status)
+        if self.saver.metrics is not None:
+            # the metrics files always show the totals up to the last refresh
+            self.saver.metrics.save()
+        if self.log:
+            print("tier " + tier.name + " refreshed " + str(count) + " records in %.1fs (%s)" % (time.time() - started_at, status))
+        return count
+
+    # write a new snapshot: the refreshed records patched into the latest one, or for a full
+    # tier the records of `companies` in their order; pages that failed this time ({}) keep
+    # their previous record. Returns the number of records refreshed.
+    def __save(self, scrape_type: str, records: list, companies: list, replace: bool = False) -> int:
+        with self.save_locks[scrape_type]:
+            fresh = {self.record_key(record): record for record in records if record}
+            previous = [record for record in self.loader.iter_records(scrape_type) if record]
+            if replace:
+                # companies no longer listed drop out
+                kept = {self.record_key(record): record for record in previous}
+                merged = [fresh.get(company["subdirectory"]) or kept.get(company["subdirectory"]) for company in companies]
+                merged = [record for record in merged if record]
+            else:
+                merged = [fresh.get(self.record_key(record), record) for record in previous]
+                known = {self.record_key(record) for record in previous}
+                merged += [record for key, record in fresh.items() if key not in known]
+
+            # snapshot file names have one second resolution, two saves must not share one
+            wait = self.saved_at.get(scrape_type, 0) + 1 - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            with self.saver.open_writer(scrape_type) as writer:
+                for record in merged:
+                    writer.write(record)
+            self.saved_at[scrape_type] = time.time()
+            with self.lock:
+                self.served[scrape_type] = merged
+        return len(fresh)
+
+    # tick until stopped (Ctrl-C or stop()), sleeping until the next tier is due
+    def run_forever(self, poll: float = 5.0):
+        if self.log:
+            print("refresh daemon running tiers: " + ", ".join(tier.name + " every " + str(tier.interval) + "s" for tier in self.tiers))
+        try:
+            while not self.stopped.is_set():
+                self.tick()
+                wait = min([self.due_in(tier) for tier in self.tiers] + [poll])
+                self.stopped.wait(max(wait, 0.5))
+        except KeyboardInterrupt:
+            print("stopping refresh daemon...")
+        finally:
+            self.stop()
+
+    def stop(self, wait: bool = True):
+        self.stopped.set()
+        self.pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,2 @@
+from .ticker_pages import TickerPages
+from .page_extractor import Field, PageExtractor
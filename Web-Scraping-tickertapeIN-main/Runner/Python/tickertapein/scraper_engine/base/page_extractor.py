@@ -0,0 +1,161 @@
+import time
+
+import lxml.html
+from lxml import etree
+
+
+# translate a "tag.class1.class2 tag2.class3" selector to XPath. every step is
+# scoped to the first match of the previous one, the same as chaining
+# soup.find(...).find_all(...) calls.
+def compile_selector(selector: str, relative: bool = False) -> etree.XPath:
+    steps = []
+    for step in selector.split():
+        tag, *classes = step.split(".")
+        predicates = "".join(
+            "[contains(concat(' ', normalize-space(@class), ' '), ' " + name + " ')]" for name in classes
+        )
+        steps.append((tag or "*") + predicates)
+
+    xpath = (".//" if relative else "//") + steps[0]
+    for step in steps[1:]:
+        xpath = "(" + xpath + ")[1]//" + step
+    return etree.XPath(xpath)
+
+
+# text of an element and all its children, comments excluded (same as bs4 .text)
+def node_text(node) -> str:
+    return "".join(node.itertext())
+
+
+##### post-processors: take the list of matched nodes and return the value #####
+
+def text(nodes: list):
+    return node_text(nodes[0]) if nodes else None
+
+
+def nth_text(index: int):
+    def post(nodes: list):
+        # raises IndexError like the original indexing when the block is incomplete
+        return node_text(nodes[index])
+    return post
+
+
+def percentage(nodes: list):
+    return node_text(nodes[0]).replace("(", "").replace(")", "").strip() if nodes else None
+
+
+def profile(nodes: list):
+    # heading and paragraph of a profile card, e.g. "Company Profile: ..."
+    html_block = nodes[0]
+    h2 = html_block.find(".//h2")
+    p = html_block.find(".//p")
+    value_h = node_text(h2) if h2 is not None else ""
+    value_p = node_text(p) if p is not None else ""
+    return value_h + ": " + value_p if (value_h + value_p) != "" else None
+
+
+def to_key(label: str) -> str:
+    # "Dividend Yield" -> "dividendYield"
+    key = label.title().replace(" ", "")
+    return key[0].lower() + key[1:]
+
+
+TOOLTIP_HOLDER = compile_selector("span.tooltip-holder", relative=True)
+
+
+def checklist_item(item) -> tuple:
+    label = TOOLTIP_HOLDER(item)[0].text
+    if label is None:
+        raise ValueError("checklist item without a label")
+    key = to_key(label)
+    key = "redFlagSafe" if "redflag" in key.lower() else key
+    value = item.find(".//i").get("class").split()[3].split("-")[1]
+    return key, value
+
+
+def checklist(item_selector: str = None):
+    # checklist items are either the children of the matched block or the
+    # blocks matching `item_selector` inside it
+    item_xpath = compile_selector(item_selector, relative=True) if item_selector else None
+
+    def post(nodes: list) -> dict:
+        html_block = nodes[0]
+        items = item_xpath(html_block) if item_xpath is not None else [child for child in html_block if isinstance(child.tag, str)]
+        return dict(checklist_item(item) for item in items)
+    return post
+
+
+RATIO_KEYS = compile_selector("span.ellipsis.desktop--only", relative=True)
+RATIO_VALUES = compile_selector("div.value", relative=True)
+
+
+def key_metrics(nodes: list) -> dict:
+    html_block = nodes[0]
+    keys = RATIO_KEYS(html_block)
+    values = RATIO_VALUES(html_block)
+    metrics = {}
+    for i in range(len(keys)):
+        value = node_text(values[i])
+        metrics[to_key(node_text(keys[i]))] = None if value == "—" else value
+    return metrics
+
+
+def buy_recommendation(nodes: list):
+    # "49%" from <div><span>49<span>%</span></span></div>, None when it is "—"
+    span = nodes[0].find(".//div").find(".//span")
+    if span.text is None:
+        raise ValueError("forecast value not found")
+    value = span.text if span.text != "—" else ""
+    symbol_block = span.find(".//span")
+    symbol = node_text(symbol_block) if symbol_block is not None else ""
+    return value + symbol if (value + symbol) != "" else None
+
+
+class Field:
+
+    def __init__(self, path: str, selector: str = None, post=text, context: str = None):
+        # dotted output path ("overview.currentPrice"), the selector to match and
+        # the post-processor applied to the matches; `context` fields are copied
+        # from the values passed to extract() instead
+        self.path = path.split(".")
+        self.selector = selector
+        self.post = post
+        self.context = context
+
+
+class PageExtractor:
+
+    def __init__(self, fields: list):
+        self.fields = fields
+
+        # compile every distinct selector once, fields sharing a selector share its matches
+        self.xpaths = {}
+        for field in fields:
+            if field.selector is not None and field.selector not in self.xpaths:
+                self.xpaths[field.selector] = compile_selector(field.selector)
+
+    # with a `timings` dict the seconds spent parsing (html to tree and selector matches) and
+    # normalizing (matches to the record) are put in it as "parse" and "normalize"
+    def extract(self, html: str, timings: dict = None, **context) -> dict:
+        start_time = time.perf_counter()
+        root = lxml.html.document_fromstring(html)
+        matches = {selector: xpath(root) for selector, xpath in self.xpaths.items()}
+        if timings is not None:
+            parsed_time = time.perf_counter()
+            timings["parse"] = parsed_time - start_time
+
+        data = {}
+        for field in self.fields:
+            if field.context is not None:
+                value = context[field.context]
+            else:
+                value = field.post(matches[field.selector])
+
+            # place the value at its (possibly nested) path
+            target = data
+            for key in field.path[:-1]:
+                target = target.setdefault(key, {})
+            target[field.path[-1]] = value
+        if timings is not None:
+            timings["normalize"] = time.perf_counter() - parsed_time
+        return data
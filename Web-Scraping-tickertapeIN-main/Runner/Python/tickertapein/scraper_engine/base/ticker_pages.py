@@ -0,0 +1,417 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+from typing import Iterable
+
+from ...utils.http_session import HttpSession
+from ...utils.checkpoint_journal import CheckpointJournal
+from ...utils.scrape_metrics import ScrapeMetrics
+from ...utils.dead_letter_queue import DeadLetterQueue
+from ...utils.data_saver import DataSaver
+
+
+class TickerPages:
+
+    BASE_URL = "https://www.tickertape.in"
+    TYPE = None
+    LABEL = None
+    EXTRACTOR = None
+
+    # with `dead_letters` every page that fails is queued there for retry_failed()
+    def __init__(self, log: bool = False, concurrency: int = 1, base_url: str = None, session: HttpSession = None,
+                 parse_workers: int = 0, queue_size: int = 64, dead_letters: DeadLetterQueue = None):
+        self.log = log
+        self.dead_letters = dead_letters
+        self.concurrency = concurrency
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.session = session if session is not None else HttpSession(pool_size=max(concurrency, 16))
+        self.result = None
+        if base_url is not None:
+            self.BASE_URL = base_url
+
+    # url to the company page
+    def get_url(self, subdirectory: str) -> str:
+        return self.BASE_URL + "/" + self.TYPE + "/" + subdirectory
+
+    # download a page (I/O only)
+    def fetch_page(self, url: str):
+        # hit the page and get html over the pooled session
+        return self.session.get(url)
+
+    # extract html data from webpage and form output data (CPU only, runs in parse worker processes)
+    @classmethod
+    def parse_page(cls, html: str, url: str) -> dict:
+        return cls.EXTRACTOR.extract(html, url=url, type=cls.TYPE)
+
+    # parse_page plus its parse / normalize timings, returns (data, timings, error) instead of raising
+    # so a parse worker process hands the timings of a failed page back as well
+    @classmethod
+    def parse_page_timed(cls, html: str, url: str) -> tuple:
+        timings = {}
+        try:
+            return cls.EXTRACTOR.extract(html, timings=timings, url=url, type=cls.TYPE), timings, None
+        except Exception as e:
+            return {}, timings, e
+
+    # feed the parse / normalize timings of a page to the session metrics; a failure counts
+    # against the stage it happened in
+    def record_parse(self, url: str, timings: dict, error: Exception = None):
+        metrics = self.session.metrics
+        for stage in [ScrapeMetrics.STAGE_PARSE, ScrapeMetrics.STAGE_NORMALIZE]:
+            if stage in timings:
+                metrics.observe(stage, timings[stage], url)
+        if error is not None:
+            metrics.error(ScrapeMetrics.STAGE_NORMALIZE if ScrapeMetrics.STAGE_PARSE in timings else ScrapeMetrics.STAGE_PARSE, error)
+
+    # record parsed earlier from an identical page body, when the session has a response cache
+    def get_cached_record(self, url: str, response):
+        if self.session.cache is None:
+            return None
+        return self.session.cache.get_record(url, getattr(response, "body_hash", None))
+
+    def cache_record(self, url: str, body_hash: str, data: dict):
+        if self.session.cache is not None and data:
+            self.session.cache.put_record(url, body_hash, data)
+
+    def get_details(self, subdirectory: str) -> dict:
+        url = self.get_url(subdirectory)
+        try:
+            response = self.fetch_page(url)
+            # an error page would only fail to parse further down
+            response.raise_for_status()
+
+            # an unchanged page needs no parsing
+            data = self.get_cached_record(url, response)
+            if data is None:
+                if self.session.metrics is not None:
+                    data, timings, error = self.parse_page_timed(response.text, url)
+                    self.record_parse(url, timings, error)
+                    if error is not None:
+                        raise error
+                else:
+                    data = self.parse_page(response.text, url)
+                self.cache_record(url, getattr(response, "body_hash", None), data)
+            self.page_succeeded(subdirectory)
+            return data
+        except Exception as e:
+            self.page_failed(subdirectory, url, e)
+            return {}
+
+    # report a failed page and queue it for the retry pass
+    def page_failed(self, subdirectory: str, url: str, error: Exception):
+        print(error)
+        if self.dead_letters is not None:
+            self.dead_letters.add(self.TYPE, subdirectory, url, error)
+
+    def page_succeeded(self, subdirectory: str):
+        if self.dead_letters is not None:
+            self.dead_letters.resolved(self.TYPE, subdirectory)
+
+    # scrape the dead-lettered pages of this type again, each once its backoff is over, until they
+    # succeed or run out of attempts; the recovered records are patched into the current snapshot
+    # of `scrape_type` and returned
+    def retry_failed(self, saver: DataSaver, scrape_type: str) -> list:
+        if self.dead_letters is None:
+            return []
+        recovered = []
+        while True:
+            entries = self.dead_letters.entries(self.TYPE, due=True)
+            if not entries:
+                wait = self.dead_letters.next_due_in(self.TYPE)
+                if wait is None:
+                    break
+                time.sleep(wait)
+                continue
+            if self.log:
+                print("retrying " + str(len(entries)) + " failed " + self.LABEL + " pages...")
+            companies = [{"name": entry["subdirectory"], "type": self.TYPE, "subdirectory": entry["subdirectory"]} for entry in entries]
+            recovered += [record for record in self.scrape(companies) if record]
+
+        if recovered:
+            saver.patch(recovered, scrape_type)
+        if self.log:
+            print(str(len(recovered)) + " failed " + self.LABEL + " pages recovered, " + str(len(self.dead_letters.entries(self.TYPE))) + " given up on")
+        return recovered
+
+    # scrape a single company page, returns its record ({} when it failed: get_details reports
+    # the failure and queues the page in the dead letters)
+    def __scrape_company(self, company: dict, journal: CheckpointJournal = None) -> dict:
+        company_name = company["name"]
+        company_dir = company["subdirectory"]
+
+        if self.log:
+            print("scraping data for:", company_name, "url: " + self.get_url(company_dir))
+        else:
+            print('.', end='', flush=True)
+
+        # get data from the page
+        data = self.get_details(company_dir)
+        if journal is not None and data:
+            journal.record(company_dir, data)
+        if self.log:
+            print("successful!" if data else "failed!")
+        return data
+
+    # split the companies of this page type into the ones to scrape and the ones an interrupted
+    # run already completed; `companies_list` can be any iterable, e.g. TickerNames.iter_companies()
+    # while the names list is still being scraped, its companies are taken on as they come
+    def __prepare(self, companies_list: Iterable, journal: CheckpointJournal = None, sink=None) -> tuple:
+        done = journal.completed() if journal is not None else {}
+        output = ScrapeOutput([], done, sink)
+        if done and isinstance(companies_list, list):
+            companies = [company for company in companies_list if company["type"] == self.TYPE]
+            resumed = len([company for company in companies if company["subdirectory"] in done])
+            print("resuming: " + str(resumed) + " of " + str(len(companies)) + " " + self.LABEL + " pages already scraped")
+
+        def todo():
+            for company in companies_list:
+                output.seen += 1
+                if company["type"] != self.TYPE:
+                    continue
+                index = output.add(company)
+                if company["subdirectory"] not in done:
+                    yield index, company
+        return output, todo()
+
+    # log the summary, the records are in `output` (or already went to its sink)
+    def __finish(self, output: "ScrapeOutput", start_time: float) -> list:
+        fulldata = output.records
+        count = output.count
+        invalid_count = output.seen - len(output.companies)
+
+        end_time = time.time()
+        total_time = timedelta(seconds=(end_time - start_time))
+
+        if self.log:
+            print("all pages scraped successfully!")
+            print(count, "/", output.seen, self.TYPE, "data scraped successfully.")
+            if invalid_count > 0:
+                print(invalid_count, "other non", self.TYPE, "data found and ignored!")
+            print("total time taken:", str(total_time))
+        print()
+        print("completed!")
+
+        self.result = fulldata
+        return fulldata
+
+    # scrape one company on a worker and hand the result over in input order
+    def __scrape_into(self, index: int, company: dict, journal: CheckpointJournal, output: "ScrapeOutput"):
+        output.complete(index, True, self.__scrape_company(company, journal))
+
+    # with a `sink` (e.g. DataSaver.open_writer(...).write) every record is passed to it
+    # in input order as soon as it is scraped instead of being collected and returned
+    def scrape(self, companies_list: Iterable, journal: CheckpointJournal = None, sink=None) -> list:
+        # pipeline mode parses in worker processes, concurrent mode runs the async engine to completion
+        if self.parse_workers > 0:
+            return self.scrape_pipeline(companies_list, journal=journal, sink=sink)
+        if self.concurrency > 1:
+            return asyncio.run(self.scrape_async(companies_list, journal=journal, sink=sink))
+
+        # let's scrape all the data!
+        print("scraping " + self.LABEL + " data...")
+        start_time = time.time()
+
+        output, todo = self.__prepare(companies_list, journal, sink)
+        for index, company in todo:
+            self.__scrape_into(index, company, journal, output)
+
+        return self.__finish(output, start_time)
+
+    async def scrape_async(self, companies_list: Iterable, concurrency: int = None, journal: CheckpointJournal = None,
+                           sink=None) -> list:
+        # let's scrape all the data, at most `concurrency` pages at a time!
+        concurrency = concurrency if concurrency is not None else self.concurrency
+        print("scraping " + self.LABEL + " data with concurrency " + str(concurrency) + "...")
+        start_time = time.time()
+
+        output, todo = self.__prepare(companies_list, journal, sink)
+
+        # page fetches are blocking, so run them on a bounded worker pool;
+        # the output puts the results back in input order
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        try:
+            if isinstance(companies_list, list):
+                tasks = [loop.run_in_executor(executor, self.__scrape_into, index, company, journal, output) for index, company in todo]
+            else:
+                # companies still being discovered block on their way in, wait for them off the event loop
+                tasks = []
+                while True:
+                    item = await loop.run_in_executor(None, next, todo, None)
+                    if item is None:
+                        break
+                    tasks.append(loop.run_in_executor(executor, self.__scrape_into, item[0], item[1], journal, output))
+            await asyncio.gather(*tasks)
+        finally:
+            # on Ctrl-C don't work through the rest of the queued pages
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return self.__finish(output, start_time)
+
+    # fetch stage worker: download bodies for the companies in `pages` into `fetched`
+    def __fetch_worker(self, pages: queue.Queue, fetched: queue.Queue):
+        while True:
+            item = pages.get()
+            if item is None:
+                # tells the collector this worker is through
+                fetched.put(None)
+                return
+            index, company = item
+            url = self.get_url(company["subdirectory"])
+
+            if self.log:
+                print("scraping data for:", company["name"], "url: " + url)
+            else:
+                print('.', end='', flush=True)
+
+            try:
+                response = self.fetch_page(url)
+                response.raise_for_status()
+                fetched.put((index, url, response, self.get_cached_record(url, response), None))
+            except Exception as e:
+                fetched.put((index, url, None, None, e))
+
+    def scrape_pipeline(self, companies_list: Iterable, fetch_workers: int = None, parse_workers: int = None,
+                        journal: CheckpointJournal = None, sink=None) -> list:
+        # let's scrape all the data: threads download, processes parse!
+        fetch_workers = fetch_workers if fetch_workers is not None else max(1, self.concurrency)
+        parse_workers = parse_workers if parse_workers is not None else (self.parse_workers or os.cpu_count() or 1)
+        print("scraping " + self.LABEL + " data with " + str(fetch_workers) + " fetch threads and " + str(parse_workers) + " parse processes...")
+        start_time = time.time()
+
+        output, todo = self.__prepare(companies_list, journal, sink)
+        companies = output.companies
+
+        def record(index: int, data: dict):
+            if data:
+                self.page_succeeded(companies[index]["subdirectory"])
+            if journal is not None and data:
+                journal.record(companies[index]["subdirectory"], data)
+            output.complete(index, True, data)
+            if self.log:
+                print("successful!")
+
+        # both queues are bounded so at most `queue_size` downloaded bodies are held in memory
+        pages = queue.Queue(maxsize=self.queue_size)
+        fetched = queue.Queue(maxsize=self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            # start the parse processes before any fetch thread exists
+            pool.submit(int).result()
+
+            threads = [threading.Thread(target=self.__fetch_worker, args=(pages, fetched), daemon=True) for _ in range(fetch_workers)]
+            for thread in threads:
+                thread.start()
+
+            def feed():
+                try:
+                    for item in todo:
+                        pages.put(item)
+                finally:
+                    # a companies generator that fails still lets the workers finish
+                    for _ in threads:
+                        pages.put(None)
+            threading.Thread(target=feed, daemon=True).start()
+
+            pending = {}
+            # the number of pages is only known once the feed is through, so collect until every fetch worker is
+            finished_workers = 0
+            while finished_workers < len(threads):
+                item = fetched.get()
+                if item is None:
+                    finished_workers += 1
+                    continue
+                index, url, response, cached, error = item
+                if error is not None:
+                    # same as get_details: report and keep an empty record
+                    self.page_failed(companies[index]["subdirectory"], url, error)
+                    record(index, {})
+                elif cached is not None:
+                    record(index, cached)
+                else:
+                    parse = type(self).parse_page_timed if self.session.metrics is not None else type(self).parse_page
+                    future = pool.submit(parse, response.text, url)
+                    pending[future] = (index, companies[index]["subdirectory"], url, getattr(response, "body_hash", None))
+
+                # keep at most two pages per parse process in flight
+                while len(pending) >= parse_workers * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self.__collect(future, pending.pop(future), record)
+
+            for future in list(pending):
+                self.__collect(future, pending.pop(future), record)
+
+            for thread in threads:
+                thread.join()
+
+        return self.__finish(output, start_time)
+
+    def __collect(self, future, page: tuple, record):
+        index, subdirectory, url, body_hash = page
+        try:
+            data = future.result()
+            if self.session.metrics is not None:
+                data, timings, error = data
+                self.record_parse(url, timings, error)
+                if error is not None:
+                    raise error
+        except Exception as e:
+            self.page_failed(subdirectory, url, e)
+            data = {}
+        self.cache_record(url, body_hash, data)
+        record(index, data)
+
+
+class ScrapeOutput:
+
+    def __init__(self, companies: list, done: dict, sink=None):
+        # results arrive in any order from the workers, records leave in input order:
+        # resumed ones from `done`, scraped ones once every earlier company is through
+        self.companies = companies
+        self.done = done
+        self.sink = sink
+        self.records = []
+        self.count = 0
+        # companies of any type handed to the scrape
+        self.seen = 0
+        self.pending = {}
+        self.next_index = 0
+        self.lock = threading.Lock()
+        with self.lock:
+            self.__drain()
+
+    # take on the next company of the scrape, returns its index
+    def add(self, company: dict) -> int:
+        with self.lock:
+            self.companies.append(company)
+            self.__drain()
+            return len(self.companies) - 1
+
+    def complete(self, index: int, success: bool, data: dict):
+        with self.lock:
+            self.pending[index] = (success, data)
+            self.__drain()
+
+    def __drain(self):
+        while self.next_index < len(self.companies):
+            subdirectory = self.companies[self.next_index]["subdirectory"]
+            if subdirectory in self.done:
+                success, data = True, self.done[subdirectory]
+            elif self.next_index in self.pending:
+                success, data = self.pending.pop(self.next_index)
+            else:
+                return
+            self.next_index += 1
+            if not success:
+                continue
+            self.count += 1
+            if self.sink is not None:
+                self.sink(data)
+            else:
+                self.records.append(data)
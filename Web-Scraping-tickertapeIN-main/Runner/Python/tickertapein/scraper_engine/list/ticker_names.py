@@ -1,8 +1,11 @@
-import requests
 from bs4 import BeautifulSoup
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
+from ...utils.http_session import HttpSession
+from ...utils.scrape_metrics import ScrapeMetrics
+
 
 class TickerNames:
 
@@ -17,24 +20,16 @@ class TickerNames:
     TYPE_ETF = "etfs"
     TYPE_STOCK = "stocks"
 
-    def __init__(self, page_list: str, include_type: str, log: bool = False):
+    def __init__(self, page_list: str, include_type: str, log: bool = False, base_url: str = None, session: HttpSession = None,
+                 concurrency: int = 8):
         self.page_list = page_list
         self.type = include_type
         self.log = log
+        self.concurrency = concurrency
+        self.session = session if session is not None else HttpSession()
         self.result = None
-
-    # get webpage soup object
-    def __get_soup(self, url_filter: str):
-        # hit the page and get html
-        header = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36"
-        }
-        response = requests.get(self.BASE_URL + "/stocks?filter=" + url_filter, headers=header)
-
-        # give the webpage to Beautiful Soup using parsers: "html.parser" or "lxml"
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        return soup
+        if base_url is not None:
+            self.BASE_URL = base_url
 
     # custom filter function
     def __filter_data_list_fn(self, list_block):
@@ -59,52 +54,101 @@ class TickerNames:
                 "subdirectory": block.a['href'].split('/')[2],
                 "url": self.BASE_URL + block.a['href']
             }
-            if self.type == self.TYPE_ALL or self.type == data_obj['type']:
-                data_list.append(data_obj)
+            data_list.append(data_obj)
         return data_list
-    
-    def get_names(self, url_filter: str) -> list:
-        try:
-            # get soup
-            soup = self.__get_soup(url_filter)
 
-            # find all li
-            html_block = soup.find_all("li")
+    # all names on a list page, parsed again only when the page body changed
+    def __get_all_names(self, url_filter: str) -> list:
+        # hit the page and get html over the pooled session
+        url = self.BASE_URL + "/stocks?filter=" + url_filter
+        response = self.session.get(url)
 
-            # filter out lis that doesn't contain our data
-            filtered_html_block = self.__get_filtered_html_blocks_list(html_block)
+        cache = self.session.cache
+        body_hash = getattr(response, "body_hash", None)
+        data = cache.get_record(url, body_hash) if cache is not None else None
+        if data is not None:
+            return data
 
-            # get the data
-            data = self.__map_html_block_list_to_data_list(filtered_html_block)
+        metrics = self.session.metrics
+        start_time = time.perf_counter()
 
-            return data
+        # give the webpage to Beautiful Soup using parsers: "html.parser" or "lxml"
+        soup = BeautifulSoup(response.text, 'lxml')
+
+        # find all li
+        html_block = soup.find_all("li")
+        parsed_time = time.perf_counter()
+
+        # filter out lis that doesn't contain our data
+        filtered_html_block = self.__get_filtered_html_blocks_list(html_block)
+
+        # get the data
+        data = self.__map_html_block_list_to_data_list(filtered_html_block)
+
+        if metrics is not None:
+            metrics.observe(ScrapeMetrics.STAGE_PARSE, parsed_time - start_time, url)
+            metrics.observe(ScrapeMetrics.STAGE_NORMALIZE, time.perf_counter() - parsed_time, url)
+
+        if cache is not None and data:
+            cache.put_record(url, body_hash, data)
+        return data
+
+    def get_names(self, url_filter: str) -> list:
+        try:
+            data = self.__get_all_names(url_filter)
+            return [data_obj for data_obj in data if self.type == self.TYPE_ALL or self.type == data_obj['type']]
         except Exception as e:
             print(e)
             return []
     
+    # names of one list page, returns (success, names)
+    def __scrape_page(self, page: str) -> tuple:
+        if self.log:
+            print("scraping page: " + self.BASE_URL + "/stocks?filter=" + page)
+        else:
+            print('.', end='', flush=True)
+
+        try:
+            # get data from the page
+            data = self.get_names(page)
+            if self.log:
+                print("successful!")
+            return True, data
+        except Exception as e:
+            # some issue occurred, catch exception
+            if self.log:
+                print("failed!")
+                print(e)
+            return False, []
+
+    # yields the names of every page in page order as soon as that page is in, while the
+    # later pages are still downloading (at most `concurrency` at a time)
+    def scrape_iter(self):
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        try:
+            futures = [executor.submit(self.__scrape_page, page) for page in self.page_list]
+            for future in futures:
+                success, data = future.result()
+                yield data
+        finally:
+            # a consumer that stops early doesn't wait for the rest of the queued pages
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # the companies of every list page, yielded as soon as their page is in, so the stock and
+    # ETF scrapes can start on them while the rest of the list is still downloading
+    def iter_companies(self):
+        for data in self.scrape_iter():
+            yield from data
+
     def scrape(self) -> list:
         # let's scrape all the pages!
         print("scraping names list...")
         fulldata = []
-        page_list = self.page_list
 
         start_time = time.time()
-        for page in page_list:
-            if self.log:
-                print("scraping page: " + self.BASE_URL + "/stocks?filter=" + page)
-            else:
-                print('.', end='', flush=True)
-                
-            try:
-                # get data from each page and append to data list
-                fulldata = fulldata + self.get_names(page)
-                if self.log:
-                    print("successful!")
-            except Exception as e:
-                # some issue occurred, catch exception
-                if self.log:
-                    print("failed!")
-                    print(e)
+        for data in self.scrape_iter():
+            # append to data list
+            fulldata.extend(data)
         end_time = time.time()
         total_time = timedelta(seconds=(end_time - start_time))
 
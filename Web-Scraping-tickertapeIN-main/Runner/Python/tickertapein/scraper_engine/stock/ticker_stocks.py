@@ -1,205 +1,47 @@
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
-from datetime import timedelta
+from ..base import TickerPages, Field, PageExtractor
+from ..base.page_extractor import text, nth_text, percentage, profile, checklist, key_metrics, buy_recommendation
 
 
-class TickerStocks:
+class TickerStocks(TickerPages):
 
-    BASE_URL = "https://www.tickertape.in"
     TYPE = "stocks"
-
-    def __init__(self, log: bool = False):
-        self.log = log
-        self.result = None
-    
-    # get webpage soup object
-    def __getsoup(self, subdirectory: str):
-        # url to the stock page
-        url = self.BASE_URL + "/" + self.TYPE + "/" + subdirectory
-
-        # hit the page and get html
-        header = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36"
-        }
-        response = requests.get(url, headers=header)
-
-        # give the webpage to Beautiful Soup using parsers: "html.parser" or "lxml"
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        return soup
-
-    def get_details(self, subdirectory: str) -> dict:
-        try:
-            # get soup
-            soup = self.__getsoup(subdirectory)
-
-            ######### extract html data from webpage and form output data #########
-            data = {}
-
-            ##### [1] Basics #####
-            # company name
-            html_block = soup.find("h3", class_="security-name")
-            data["name"] = html_block.text if html_block is not None else None
-
-            # ticker name
-            html_block = soup.find("span", class_="ticker")
-            data["ticker"] = html_block.text if html_block is not None else None
-            
-            # url
-            data["url"] = self.BASE_URL + "/" + self.TYPE + "/" + subdirectory
-
-            # type
-            data["type"] = self.TYPE
-
-            # current price
-            html_block = soup.find("span", class_="current-price")
-            data["price"] = html_block.text if html_block is not None else None
-
-            # marketcap, sector and risk
-            html_block = soup.find("div", class_="stock-labels")
-            html_block = html_block.find_all("span", class_="stock-label-title")
-            data["sector"] = html_block[0].text if html_block[0] is not None else None
-            data["marketcap"] = html_block[1].text if html_block[1] is not None else None
-            data["risk"] = html_block[2].text if html_block[2] is not None else None
-
-            # profile
-            html_block = soup.find("div", class_="peers-card")
-            value_h = html_block.h2.text if html_block.h2 is not None else ""
-            value_p = html_block.p.text if html_block.p is not None else ""
-            data["profile"] = value_h + ": " + value_p if (value_h + value_p) != "" else None
-
-            ##### [2] Overview #####
-            overview = {}
-
-            # current price
-            html_block = soup.find("span", class_="current-price")
-            overview["currentPrice"] = html_block.text if html_block is not None else None
-
-            # change absolute-value
-            html_block = soup.find("span", class_="absolute-value")
-            overview["absoluteChange"] = html_block.text if html_block is not None else None
-
-            # change percentage-value
-            html_block = soup.find("span", class_="percentage-value")
-            overview["percentageChange"] = str(html_block.text).replace("(", "").replace(")", "").strip() if html_block is not None else None
-
-            # marketcap, sector and risk
-            html_block = soup.find("div", class_="stock-labels")
-            title = html_block.find_all("span", class_="stock-label-title")
-            desc = html_block.find_all("span", class_="stock-label-desc")
-
-            overview["sectorType"] = title[0].text if title[0] is not None else None
-            overview["sectorDesc"] = desc[0].text if desc[0] is not None else None
-
-            overview["capType"] = title[1].text if title[1] is not None else None
-            overview["capDesc"] = desc[1].text if desc[1] is not None else None
-
-            overview["riskType"] = title[2].text if title[2] is not None else None
-            overview["riskDesc"] = desc[2].text if desc[2] is not None else None
-
-            # put overview into data
-            data["overview"] = overview
-
-            ##### [3] Investment Checklist #####
-            investment_checklist = {}
-
-            # checklist carousel-item get all keys and values
-            html_block = soup.find("div", class_="carousel-item")
-            for item in html_block.childGenerator():
-                key = item.find("span", class_="tooltip-holder").contents[0]
-                key = key.title().replace(" ", "")
-                key = key[0].lower() + key[1:]
-                key = "redFlagSafe" if "redflag" in key.lower() else key
-                value = item.find("i")['class'][3].split("-")[1]
-                investment_checklist[key] = value
-
-            # put investmentChecklist into data
-            data["investmentChecklist"] = investment_checklist
-
-            ##### [4] Key Metrics #####
-            keyMetrics = {}
-
-            # PERatio, PBRatio, DividendYield, SectorPE, SectorPB, SectorDividendYield
-            html_block = soup.find("div", class_="ratios-card")
-            keys = html_block.select("span.ellipsis.desktop--only")
-            values = html_block.find_all("div", class_="value")
-            for i in range(len(keys)):
-                key = keys[i].text
-                key = key.title().replace(" ", "")
-                key = key[0].lower() + key[1:]
-                value = values[i].text
-                value = None if str(value) == "—" else str(value)
-                keyMetrics[key] = value
-
-            # put keyMetrics into data
-            data["keyMetrics"] = keyMetrics
-
-            ##### [5] Forecast & Ratings #####
-            forecasts = {}
-
-            # Forecast
-            html_block = soup.find("div", class_="forecast-radial")
-            value = html_block.div.span.contents[0] if str(html_block.div.span.contents[0]) != "—" else ""
-            symbol = html_block.div.span.span.text if html_block.div.span.span is not None else ""
-            forecasts["buyRecommendation"] = value + symbol if (value + symbol) != "" else None
-            forecasts["forecast"] = html_block.h4.text if html_block.h4 is not None else None
-
-            # put keyMetrics into data
-            data["forecasts"] = forecasts
-
-            # return the scraped data
-            return data
-        except Exception as e:
-            print(e)
-            return {}
-    
-    def scrape(self, stocks_list: list) -> list:
-        # let's scrape all the stock data!
-        print("scraping stock data...")
-        fulldata = []
-        count = 0
-        invalid_count = 0
-
-        start_time = time.time()
-        for companies in stocks_list:
-            company_name = companies["name"]
-            company_type = companies["type"]
-            company_dir = companies["subdirectory"]
-
-            if company_type != "stocks":
-                invalid_count += 1
-                continue
-            
-            if self.log:
-                print("scraping data for:", company_name, "url: " + self.BASE_URL + "/" + company_type + "/" + company_dir)
-            else:
-                print('.', end='', flush=True)
-
-            try:
-                # get data from each page and append to data list
-                data = self.get_details(company_dir)
-                fulldata.append(data)
-                count += 1
-                if self.log:
-                    print("successful!")
-            except Exception as e:
-                # some issue occured, catch exception
-                if self.log:
-                    print("failed!")
-                    print(e)
-        end_time = time.time()
-        total_time = timedelta(seconds=(end_time - start_time))
-
-        if self.log:
-            print("all pages scraped successfully!")
-            print(count, "/", len(stocks_list), self.TYPE, "data scraped successfully.")
-            if invalid_count > 0:
-                print(invalid_count, "other non", self.TYPE, "data found and ignored!")
-            print("total time taken:", str(total_time))
-        print()
-        print("completed!")
-
-        self.result = fulldata
-        return fulldata
+    LABEL = "stock"
+
+    # field -> selector -> post-processor spec of the stock page
+    FIELDS = [
+        ##### [1] Basics #####
+        Field("name", "h3.security-name", text),
+        Field("ticker", "span.ticker", text),
+        Field("url", context="url"),
+        Field("type", context="type"),
+        Field("price", "span.current-price", text),
+        Field("sector", "div.stock-labels span.stock-label-title", nth_text(0)),
+        Field("marketcap", "div.stock-labels span.stock-label-title", nth_text(1)),
+        Field("risk", "div.stock-labels span.stock-label-title", nth_text(2)),
+        Field("profile", "div.peers-card", profile),
+
+        ##### [2] Overview #####
+        Field("overview.currentPrice", "span.current-price", text),
+        Field("overview.absoluteChange", "span.absolute-value", text),
+        Field("overview.percentageChange", "span.percentage-value", percentage),
+        Field("overview.sectorType", "div.stock-labels span.stock-label-title", nth_text(0)),
+        Field("overview.sectorDesc", "div.stock-labels span.stock-label-desc", nth_text(0)),
+        Field("overview.capType", "div.stock-labels span.stock-label-title", nth_text(1)),
+        Field("overview.capDesc", "div.stock-labels span.stock-label-desc", nth_text(1)),
+        Field("overview.riskType", "div.stock-labels span.stock-label-title", nth_text(2)),
+        Field("overview.riskDesc", "div.stock-labels span.stock-label-desc", nth_text(2)),
+
+        ##### [3] Investment Checklist #####
+        Field("investmentChecklist", "div.carousel-item", checklist()),
+
+        ##### [4] Key Metrics #####
+        # PERatio, PBRatio, DividendYield, SectorPE, SectorPB, SectorDividendYield
+        Field("keyMetrics", "div.ratios-card", key_metrics),
+
+        ##### [5] Forecast & Ratings #####
+        Field("forecasts.buyRecommendation", "div.forecast-radial", buy_recommendation),
+        Field("forecasts.forecast", "div.forecast-radial h4", text)
+    ]
+
+    # compiled once, shared by every instance
+    EXTRACTOR = PageExtractor(FIELDS)
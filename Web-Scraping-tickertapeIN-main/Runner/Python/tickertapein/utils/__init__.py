@@ -1,2 +1,9 @@
 from .data_saver import DataSaver
 from .data_loader import DataLoader
+from .http_session import HttpSession
+from .response_cache import ResponseCache
+from .checkpoint_journal import CheckpointJournal
+from .snapshot_store import SnapshotStore
+from .snapshot_catalog import SnapshotCatalog
+from .scrape_metrics import ScrapeMetrics
+from .dead_letter_queue import DeadLetterQueue
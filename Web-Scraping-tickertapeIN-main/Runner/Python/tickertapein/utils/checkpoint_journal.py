@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+
+
+class CheckpointJournal:
+
+    def __init__(self, scrape_type: str, dir_path: str = None, log: bool = False):
+        self.scrape_type = scrape_type
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/checkpoints")
+        self.file_path = os.path.join(self.dir_path, scrape_type + ".journal")
+        self.log = log
+        self.lock = threading.Lock()
+        self.tail_checked = False
+
+    # subdirectory -> record of every item completed by earlier (interrupted) runs
+    def completed(self) -> dict:
+        done = {}
+        if not os.path.isfile(self.file_path):
+            return done
+        with open(self.file_path, "r") as readfile:
+            for line in readfile:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a line cut short by a crash, that item is simply scraped again
+                    continue
+                done[entry["subdirectory"]] = entry["data"]
+        if self.log and done:
+            print("checkpoint journal: " + str(len(done)) + " " + self.scrape_type + " records already scraped")
+        return done
+
+    # cut off a last line left without its newline by a crash, so the next record starts on a line
+    # of its own instead of being glued onto the fragment (call with the lock held)
+    def __truncate_torn_tail(self):
+        if not os.path.isfile(self.file_path):
+            return
+        with open(self.file_path, "rb+") as journal:
+            end = journal.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 64 * 1024)
+                journal.seek(start)
+                block = journal.read(position - start)
+                if position == end and block.endswith(b"\n"):
+                    return
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    journal.truncate(start + newline + 1)
+                    return
+                position = start
+            journal.truncate(0)
+
+    # append one completed item, flushed right away so it survives a crash or Ctrl-C
+    def record(self, subdirectory: str, data: dict):
+        line = json.dumps({"subdirectory": subdirectory, "data": data}) + "\n"
+        with self.lock:
+            os.makedirs(self.dir_path, exist_ok=True)
+            if not self.tail_checked:
+                self.__truncate_torn_tail()
+                self.tail_checked = True
+            with open(self.file_path, "a") as outfile:
+                outfile.write(line)
+                outfile.flush()
+
+    # drop the journal once the final snapshot is saved
+    def clear(self):
+        with self.lock:
+            if os.path.isfile(self.file_path):
+                os.remove(self.file_path)
+        if self.log:
+            print("cleared " + self.scrape_type + " checkpoint journal")
@@ -0,0 +1,171 @@
+import json
+import re
+
+# pyarrow is only needed for the columnar (parquet) snapshots, it is imported on first use
+
+
+# "3,561.20", "+14.90", "0.42%", "₹ 8,674.02cr" -> float; percentages stay in percent, amounts in crores
+NUMBER = re.compile(r"^([+-]?[0-9][0-9,]*(?:\.[0-9]+)?)\s*(?:%|cr)?$")
+NULL_TOKENS = {"", "—", "-", "NA", "N/A"}
+
+# string columns with at most this many distinct values (and repeating values) are stored as categories
+MAX_CATEGORIES = 256
+
+BATCH_SIZE = 1024
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("the parquet file format needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def parse_number(value):
+    # float for numeric strings, None for the "—" placeholders, raises ValueError otherwise
+    if value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+        return None if value is None else float(value)
+    if not isinstance(value, str):
+        raise ValueError("not a number: " + repr(value))
+    value = value.replace("₹", "").strip()
+    if value in NULL_TOKENS:
+        return None
+    match = NUMBER.match(value)
+    if match is None:
+        raise ValueError("not a number: " + repr(value))
+    return float(match.group(1).replace(",", ""))
+
+
+# {"overview": {"currentPrice": ...}} -> {"overview.currentPrice": ...}
+def flatten(record: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def unflatten(flat: dict) -> dict:
+    record = {}
+    for column, value in flat.items():
+        if value is None:
+            continue
+        target = record
+        *parents, key = column.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+    return record
+
+
+class ColumnType:
+
+    def __init__(self):
+        self.count = 0
+        self.numeric = True
+        self.seen_number = False
+        self.text = False
+        self.categories = set()
+
+    def add(self, value):
+        if value is None:
+            return
+        self.count += 1
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            self.text = True
+        if self.numeric:
+            try:
+                self.seen_number = parse_number(value) is not None or self.seen_number
+            except ValueError:
+                self.numeric = False
+        if len(self.categories) <= MAX_CATEGORIES:
+            self.categories.add(value if isinstance(value, str) else json.dumps(value))
+
+    def arrow_type(self):
+        pa = load_pyarrow()
+        if self.numeric and self.seen_number:
+            return pa.float64()
+        if not self.text and 0 < len(self.categories) <= MAX_CATEGORIES and len(self.categories) * 2 <= self.count:
+            return pa.dictionary(pa.int32(), pa.string())
+        return pa.string()
+
+
+# one pass over the records to pick a type for every (flattened) column
+def infer_schema(records):
+    pa = load_pyarrow()
+    columns = {}
+    for record in records:
+        for column, value in flatten(record).items():
+            columns.setdefault(column, ColumnType()).add(value)
+    return pa.schema([(column, column_type.arrow_type()) for column, column_type in columns.items()])
+
+
+def normalize(value, arrow_type):
+    pa = load_pyarrow()
+    if value is None:
+        return None
+    if arrow_type == pa.float64():
+        return parse_number(value)
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def to_batch(records: list, schema):
+    pa = load_pyarrow()
+    flats = [flatten(record) for record in records]
+    arrays = []
+    for field in schema:
+        values = [normalize(flat.get(field.name), field.type) for flat in flats]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# write the records as parquet; `open_records` returns a fresh iterator over them and
+# is called twice (types first, then the data) so they never have to fit in memory
+def write_parquet(file_path: str, open_records, batch_size: int = BATCH_SIZE) -> int:
+    pa = load_pyarrow()
+    schema = infer_schema(open_records())
+    count = 0
+    with pa.parquet.ParquetWriter(file_path, schema, compression="zstd") as writer:
+        batch = []
+        for record in open_records():
+            batch.append(record)
+            if len(batch) == batch_size:
+                writer.write_batch(to_batch(batch, schema))
+                count += len(batch)
+                batch = []
+        if batch or count == 0:
+            writer.write_batch(to_batch(batch, schema))
+            count += len(batch)
+    return count
+
+
+# typed table, reading only `columns` (flattened names such as "keyMetrics.peRatio") when given
+def read_table(file_path: str, columns: list = None):
+    pa = load_pyarrow()
+    return pa.parquet.read_table(file_path, columns=columns)
+
+
+# records back in their nested shape, with the typed values
+def iter_parquet(file_path: str, columns: list = None, batch_size: int = BATCH_SIZE):
+    pa = load_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(file_path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        for flat in batch.to_pylist():
+            yield unflatten(flat)
+
+
+def table_from_records(records):
+    # the same typed table for json / ndjson snapshots, normalized on the fly
+    pa = load_pyarrow()
+    records = list(records)
+    schema = infer_schema(records)
+    return pa.Table.from_batches([to_batch(records, schema)], schema=schema)
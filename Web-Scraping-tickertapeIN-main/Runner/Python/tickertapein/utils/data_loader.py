@@ -1,7 +1,13 @@
 import json
 import glob
+import mmap
 import os
 
+from . import columnar
+from .snapshot_store import SnapshotStore
+from .snapshot_catalog import SnapshotCatalog
+from .offset_index import OffsetIndex
+
 
 class DataLoader:
     
@@ -12,8 +18,11 @@ class DataLoader:
 
     FILE_FORMAT_JSON = "json"
     FILE_FORMAT_TEXT = "txt"
+    FILE_FORMAT_NDJSON = "ndjson"
+    FILE_FORMAT_PARQUET = "parquet"
 
-    def __init__(self, file_format: str = "json", log: bool = False):
+    def __init__(self, file_format: str = "json", log: bool = False, catalog: SnapshotCatalog = None,
+                 history: SnapshotStore = None):
         self.dir_to_scrape_type_map = {
             'Lists': self.SCRAPE_TYPE_LIST,
             'Stocks': self.SCRAPE_TYPE_STOCK,
@@ -21,6 +30,11 @@ class DataLoader:
         }
         self.file_format = file_format
         self.log = log
+        self.catalog = catalog
+        self.history = history
+
+        # snapshot file path -> (offset index, memory-mapped file), kept open for further lookups
+        self.indexes = {}
     
     def get_paths(self, file_name, scrape_type):
         if scrape_type == self.SCRAPE_TYPE_LIST:
@@ -36,8 +50,12 @@ class DataLoader:
         return dir_path, file_path, file_name
 
     def data_exists(self, scrape_type: str) -> bool:
+        # snapshots saved before the catalog was in use are still found by listing the folder
+        if self.catalog is not None and self.catalog.latest(scrape_type) is not None:
+            return self.catalog.has_files(scrape_type)
         dir_path, _, _ = self.get_paths('', scrape_type)
-        data_files_list = [name for name in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, name))]
+        # snapshots still being written (.part) and offset indexes (.idx) don't count
+        data_files_list = [name for name in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, name)) and not name.endswith(('.part', '.idx'))]
         data_files_list.remove('track.json')
         data_count = len(data_files_list)
         return data_count > 0
@@ -56,15 +74,35 @@ class DataLoader:
         dir_path, file_path, file_name = self.get_paths(file_name, scrape_type)
 
         # load data
-        with open(file_path, "r") as readfile:
-            data = json.load(readfile)
+        if file_name.endswith("." + self.FILE_FORMAT_NDJSON) or file_name.endswith("." + self.FILE_FORMAT_PARQUET):
+            data = list(self.iter_file(file_name, scrape_type))
+        else:
+            with open(file_path, "r") as readfile:
+                data = json.load(readfile)
 
         if self.log:
             print("data loaded successfully!")
             
         return data
 
-    def load(self, scrape_type: str) -> list:
+    # snapshots catalogued in [start, end] (datetimes), oldest first
+    def snapshots(self, scrape_type: str, start=None, end=None) -> list:
+        return self.catalog.between(scrape_type, start, end)
+
+    # records of a catalogued snapshot, from its file or else rebuilt from the snapshot history
+    def load_entry(self, entry: dict) -> list:
+        if entry["on_disk"]:
+            return self.load_file(entry["file_name"], entry["scrape_type"])
+        if entry["history_version"] is not None and self.history is not None:
+            return self.history.load(entry["scrape_type"], entry["history_version"])
+        raise FileNotFoundError(entry["scrape_type"] + " snapshot " + entry["file_name"] + " is no longer available")
+
+    def load(self, scrape_type: str, as_of=None) -> list:
+        # the snapshot that was current at `as_of` (a datetime), from the catalog
+        if as_of is not None:
+            entry = self.catalog.as_of(scrape_type, as_of)
+            return self.load_entry(entry) if entry is not None else []
+
         # load the history
         hist = self.get_history(scrape_type)
         if not hist:
@@ -72,3 +110,79 @@ class DataLoader:
         file_name = hist['file_name']
         data = self.load_file(file_name, scrape_type)
         return data
+
+    # yield the records of a snapshot one at a time; ndjson files are read line by line,
+    # older json files still have to be loaded whole
+    def iter_file(self, file_name: str, scrape_type: str):
+        dir_path, file_path, file_name = self.get_paths(file_name, scrape_type)
+        if file_name.endswith("." + self.FILE_FORMAT_PARQUET):
+            yield from columnar.iter_parquet(file_path)
+            return
+        if not file_name.endswith("." + self.FILE_FORMAT_NDJSON):
+            yield from self.load_file(file_name, scrape_type)
+            return
+        with open(file_path, "r") as readfile:
+            for line in readfile:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_records(self, scrape_type: str):
+        # iterate the latest tracked snapshot
+        hist = self.get_history(scrape_type)
+        if not hist:
+            return
+        yield from self.iter_file(hist['file_name'], scrape_type)
+
+    # typed columns of the latest snapshot as a pyarrow Table (.to_pandas() for a DataFrame);
+    # `columns` are flattened field names, e.g. ["price", "keyMetrics.peRatio"], and only
+    # those are read from a parquet snapshot. json / ndjson snapshots are normalized on load.
+    def load_table(self, scrape_type: str, columns: list = None):
+        hist = self.get_history(scrape_type)
+        if not hist:
+            return columnar.table_from_records([])
+        dir_path, file_path, file_name = self.get_paths(hist['file_name'], scrape_type)
+        if file_name.endswith("." + self.FILE_FORMAT_PARQUET):
+            return columnar.read_table(file_path, columns=columns)
+        table = columnar.table_from_records(self.iter_file(file_name, scrape_type))
+        return table.select(columns) if columns is not None else table
+
+    def __open_index(self, file_path: str) -> tuple:
+        if file_path not in self.indexes:
+            if not os.path.isfile(file_path + OffsetIndex.SUFFIX) or os.path.getsize(file_path) == 0:
+                return None, None
+            with open(file_path, "rb") as readfile:
+                data = mmap.mmap(readfile.fileno(), 0, access=mmap.ACCESS_READ)
+            self.indexes[file_path] = (OffsetIndex(file_path + OffsetIndex.SUFFIX), data)
+        return self.indexes[file_path]
+
+    # a single record by ticker or subdirectory, decoded on its own through the snapshot's
+    # offset index; snapshots without one are scanned
+    def load_record(self, scrape_type: str, key: str, as_of=None) -> dict:
+        if as_of is not None:
+            entry = self.catalog.as_of(scrape_type, as_of)
+            if entry is None:
+                return None
+            if not entry["on_disk"]:
+                return next((record for record in self.load_entry(entry) if OffsetIndex.matches(record, key)), None)
+            file_name = entry["file_name"]
+        else:
+            hist = self.get_history(scrape_type)
+            if not hist:
+                return None
+            file_name = hist['file_name']
+
+        dir_path, file_path, file_name = self.get_paths(file_name, scrape_type)
+        index, data = self.__open_index(file_path)
+        if index is None:
+            return next((record for record in self.iter_file(file_name, scrape_type) if OffsetIndex.matches(record, key)), None)
+        for offset, length in index.find(key):
+            record = json.loads(data[offset:offset + length])
+            if OffsetIndex.matches(record, key):
+                return record
+        return None
+
+    def close(self):
+        for index, data in self.indexes.values():
+            index.close()
+            data.close()
+        self.indexes = {}
@@ -3,6 +3,13 @@ import time
 import glob
 import os
 
+from . import columnar
+from .data_loader import DataLoader
+from .snapshot_store import SnapshotStore
+from .snapshot_catalog import SnapshotCatalog
+from .offset_index import OffsetIndex
+from .scrape_metrics import ScrapeMetrics
+
 
 class DataSaver:
 
@@ -13,8 +20,12 @@ class DataSaver:
 
     FILE_FORMAT_JSON = "json"
     FILE_FORMAT_TEXT = "txt"
+    FILE_FORMAT_NDJSON = "ndjson"
+    FILE_FORMAT_PARQUET = "parquet"
 
-    def __init__(self, file_format: str = "json", log: bool = False):
+    # with `metrics` the time and bytes of every snapshot written count as the save stage
+    def __init__(self, file_format: str = "json", log: bool = False, history: SnapshotStore = None,
+                 catalog: SnapshotCatalog = None, metrics: ScrapeMetrics = None):
         self.dir_to_scrape_type_map = {
             'Lists': self.SCRAPE_TYPE_LIST,
             'Stocks': self.SCRAPE_TYPE_STOCK,
@@ -22,16 +33,20 @@ class DataSaver:
         }
         self.file_format = file_format
         self.log = log
+        self.history = history
+        self.catalog = catalog
+        self.metrics = metrics
 
-    def get_paths(self, scrape_type):
+    def get_paths(self, scrape_type, file_format: str = None):
+        file_format = file_format if file_format is not None else self.file_format
         if scrape_type == self.SCRAPE_TYPE_LIST:
-            file_name = self.SCRAPE_TYPE_LIST + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + self.file_format
+            file_name = self.SCRAPE_TYPE_LIST + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + file_format
             dir_path = os.path.abspath("./tickertapein/data/Lists")
         elif scrape_type == self.SCRAPE_TYPE_STOCK:
-            file_name = self.SCRAPE_TYPE_STOCK + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + self.file_format
+            file_name = self.SCRAPE_TYPE_STOCK + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + file_format
             dir_path = os.path.abspath("./tickertapein/data/Stocks")
         elif scrape_type == self.SCRAPE_TYPE_ETF:
-            file_name = self.SCRAPE_TYPE_ETF + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + self.file_format
+            file_name = self.SCRAPE_TYPE_ETF + "_" + time.strftime("%Y_%m_%d_%H_%M_%S") + "." + file_format
             dir_path = os.path.abspath("./tickertapein/data/ETFs")
         else:
             file_name = ""
@@ -44,20 +59,118 @@ class DataSaver:
         if self.log:
             print("saving " + scrape_type + " data in " + self.file_format + " file format...")
 
+        if self.file_format == self.FILE_FORMAT_NDJSON:
+            with self.open_writer(scrape_type) as writer:
+                for record in data:
+                    writer.write(record)
+            return
+
+        start_time = time.perf_counter()
         dir_path, file_path, file_name = self.get_paths(scrape_type)
 
         # save data
-        with open(file_path, "w") as outfile:
-            json.dump(data, outfile)
+        if self.file_format == self.FILE_FORMAT_PARQUET:
+            # typed columns, numbers and categories normalized once here
+            columnar.write_parquet(file_path + RecordWriter.PART_SUFFIX, lambda: iter(data))
+            os.replace(file_path + RecordWriter.PART_SUFFIX, file_path)
+        else:
+            # same bytes as json.dump, written record by record to index their offsets
+            rows = []
+            with open(file_path, "w", newline="\n") as outfile:
+                outfile.write("[")
+                offset = 1
+                for i, record in enumerate(data):
+                    if i > 0:
+                        outfile.write(", ")
+                        offset += 2
+                    encoded = json.dumps(record)
+                    outfile.write(encoded)
+                    rows.extend(OffsetIndex.rows(record, offset, len(encoded)))
+                    offset += len(encoded)
+                outfile.write("]")
+            OffsetIndex.write(file_path + OffsetIndex.SUFFIX, rows)
+
+        self.track(dir_path, scrape_type, file_name, len(data))
+        if self.metrics is not None:
+            self.metrics.observe(ScrapeMetrics.STAGE_SAVE, time.perf_counter() - start_time, file_name, os.path.getsize(file_path))
+
+        if self.log:
+            print("data saved successfully!")
 
-        # save log for tracking
-        # TODO: type of data, pages, ticker type, count, datetime
-        data = {"datetime": time.strftime("%d-%m-%Y %I:%M:%S %p"), "scrape_type": scrape_type, "file_name": file_name}
+    # save log for tracking
+    def track(self, dir_path: str, scrape_type: str, file_name: str, count: int, commit: bool = True):
+        loader = DataLoader(log=self.log)
+        previous = loader.get_history(scrape_type)
+
+        # TODO: type of data, pages, ticker type
+        data = {"datetime": time.strftime("%d-%m-%Y %I:%M:%S %p"), "scrape_type": scrape_type, "file_name": file_name, "count": count}
         with open(dir_path + "/track.json", "w") as outfile:
             json.dump(data, outfile)
 
+        # with a snapshot history only the latest full file is kept, earlier ones live on as deltas
+        history_version = None
+        if self.history is not None and commit:
+            committed = len(self.history.versions(scrape_type)) > 0
+            history_version = self.history.save(loader.iter_file(file_name, scrape_type), scrape_type)["version"]
+            if committed and previous and previous["file_name"] != file_name and os.path.isfile(os.path.join(dir_path, previous["file_name"])):
+                os.remove(os.path.join(dir_path, previous["file_name"]))
+                if os.path.isfile(os.path.join(dir_path, previous["file_name"] + OffsetIndex.SUFFIX)):
+                    os.remove(os.path.join(dir_path, previous["file_name"] + OffsetIndex.SUFFIX))
+                if self.catalog is not None:
+                    self.catalog.removed(scrape_type, previous["file_name"])
+
+        if self.catalog is not None:
+            self.catalog.register(scrape_type, os.path.join(dir_path, file_name), count, history_version)
+
+    # rewrite the tracked snapshot in another file format (e.g. a streamed ndjson scrape as parquet)
+    # and track the new file; ndjson and parquet are converted without loading the whole snapshot
+    def convert(self, scrape_type: str, file_format: str):
+        loader = DataLoader(log=self.log)
+        hist = loader.get_history(scrape_type)
+        if not hist:
+            return
         if self.log:
-            print("data saved successfully!")
+            print("converting " + hist["file_name"] + " to " + file_format + " file format...")
+
+        dir_path, file_path, file_name = self.get_paths(scrape_type, file_format)
+        open_records = lambda: loader.iter_file(hist["file_name"], scrape_type)
+        if file_format == self.FILE_FORMAT_PARQUET:
+            count = columnar.write_parquet(file_path + RecordWriter.PART_SUFFIX, open_records)
+            os.replace(file_path + RecordWriter.PART_SUFFIX, file_path)
+        elif file_format == self.FILE_FORMAT_NDJSON:
+            with RecordWriter(self, scrape_type, dir_path, file_name, commit=False) as writer:
+                for record in open_records():
+                    writer.write(record)
+            return
+        else:
+            data = list(open_records())
+            with open(file_path, "w") as outfile:
+                json.dump(data, outfile)
+            count = len(data)
+        self.track(dir_path, scrape_type, file_name, count, commit=False)
+
+    # write a new snapshot of `scrape_type`: the tracked one with `records` in place of the records of
+    # the same pages (matched by url), new pages appended and the empty records of failed pages dropped
+    def patch(self, records: list, scrape_type: str) -> list:
+        loader = DataLoader(log=self.log)
+        page = lambda record: (record.get("url") or "").rstrip("/").rsplit("/", 1)[-1]
+        fresh = {page(record): record for record in records if record}
+        previous = [record for record in loader.iter_records(scrape_type) if record]
+        merged = [fresh.pop(page(record), record) for record in previous] + list(fresh.values())
+        with self.open_writer(scrape_type) as writer:
+            for record in merged:
+                writer.write(record)
+        if self.log:
+            print("patched " + str(len(records)) + " records into the " + scrape_type + " snapshot")
+        return merged
+
+    # writer appending one record per line as they are scraped, the snapshot becomes
+    # the tracked one only once the writer is closed
+    def open_writer(self, scrape_type: str) -> "RecordWriter":
+        if self.log:
+            print("saving " + scrape_type + " data in " + self.FILE_FORMAT_NDJSON + " file format...")
+        dir_path, file_path, file_name = self.get_paths(scrape_type, self.FILE_FORMAT_NDJSON)
+        return RecordWriter(self, scrape_type, dir_path, file_name)
 
     def clear(self, scrape_type: str, keep_history: bool = False):
         dir_path, _, _ = self.get_paths(scrape_type)
@@ -68,6 +181,8 @@ class DataSaver:
                     print('removing: ' + file_path)
                 else:
                     print('.', end='', flush=True)
+        if self.catalog is not None:
+            self.catalog.removed(scrape_type)
         if not keep_history:
             with open(dir_path + "/track.json", "w") as outfile:
                 json.dump({}, outfile)
@@ -82,3 +197,65 @@ class DataSaver:
                 print('clearing ' + folder + ' ...')
             self.clear(self.dir_to_scrape_type_map[folder], keep_history)
 
+
+
+class RecordWriter:
+
+    PART_SUFFIX = ".part"
+
+    def __init__(self, saver: DataSaver, scrape_type: str, dir_path: str, file_name: str, commit: bool = True):
+        self.saver = saver
+        self.commit = commit
+        self.scrape_type = scrape_type
+        self.dir_path = dir_path
+        self.file_name = file_name
+        self.file_path = os.path.join(dir_path, file_name)
+        self.count = 0
+
+        # byte offset of the next record and the offset index rows so far
+        self.offset = 0
+        self.rows = []
+
+        # seconds spent writing, reported to the saver's metrics once the snapshot is closed
+        self.seconds = 0.0
+
+        # written under a temporary name, loaders never see a half written snapshot
+        self.outfile = open(self.file_path + self.PART_SUFFIX, "w", newline="\n")
+
+    def write(self, record):
+        start_time = time.perf_counter()
+        encoded = json.dumps(record)
+        self.outfile.write(encoded + "\n")
+        self.rows.extend(OffsetIndex.rows(record, self.offset, len(encoded)))
+        self.offset += len(encoded) + 1
+        self.count += 1
+        self.seconds += time.perf_counter() - start_time
+
+    def close(self):
+        if self.outfile.closed:
+            return
+        start_time = time.perf_counter()
+        self.outfile.close()
+        OffsetIndex.write(self.file_path + OffsetIndex.SUFFIX, self.rows)
+        os.replace(self.file_path + self.PART_SUFFIX, self.file_path)
+        self.saver.track(self.dir_path, self.scrape_type, self.file_name, self.count, commit=self.commit)
+        if self.saver.metrics is not None:
+            self.saver.metrics.observe(ScrapeMetrics.STAGE_SAVE, self.seconds + time.perf_counter() - start_time, self.file_name, self.offset)
+        if self.saver.log:
+            print(str(self.count) + " records saved successfully!")
+
+    # drop the partial file, the tracked snapshot stays as it was
+    def abort(self):
+        if self.outfile.closed:
+            return
+        self.outfile.close()
+        os.remove(self.file_path + self.PART_SUFFIX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class DeadLetterQueue:
+
+    COLUMNS = ["type", "subdirectory", "url", "error", "message", "attempts", "first_failed_at", "last_failed_at",
+               "next_attempt_at"]
+
+    # a page that failed `attempts` times is retried after backoff * 2 ** (attempts - 1) seconds,
+    # at most `max_backoff`; it is given up on after `max_attempts`
+    def __init__(self, dir_path: str = None, backoff: float = 1.0, max_backoff: float = 300.0, max_attempts: int = 5,
+                 log: bool = False):
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/deadletters")
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.log = log
+
+        # one row per failed page, removed once a later scrape of the page succeeds
+        os.makedirs(self.dir_path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.dir_path, "deadletters.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            "type TEXT, subdirectory TEXT, url TEXT, error TEXT, message TEXT, attempts INTEGER, "
+            "first_failed_at REAL, last_failed_at REAL, next_attempt_at REAL, PRIMARY KEY (type, subdirectory))"
+        )
+        self.db.commit()
+
+        # keys of the queued pages, so a successful scrape only touches the db for pages that were queued
+        self.keys = set(self.db.execute("SELECT type, subdirectory FROM dead_letters").fetchall())
+
+    def __delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    # a page of `page_type` (stocks / etfs) failed with `error`, returns its attempt count so far
+    def add(self, page_type: str, subdirectory: str, url: str, error: Exception) -> int:
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT attempts, first_failed_at FROM dead_letters WHERE type = ? AND subdirectory = ?",
+                                  (page_type, subdirectory)).fetchone()
+            attempts, first_failed_at = (row[0] + 1, row[1]) if row is not None else (1, now)
+            self.db.execute(
+                "INSERT OR REPLACE INTO dead_letters (type, subdirectory, url, error, message, attempts, first_failed_at, "
+                "last_failed_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (page_type, subdirectory, url, type(error).__name__, str(error)[:500], attempts, first_failed_at, now,
+                 now + self.__delay(attempts))
+            )
+            self.db.commit()
+            self.keys.add((page_type, subdirectory))
+        if self.log:
+            print("dead-lettered " + url + " (" + type(error).__name__ + ", attempt " + str(attempts) + ")")
+        return attempts
+
+    # a page scraped fine, drop it from the queue if it was in it
+    def resolved(self, page_type: str, subdirectory: str):
+        if (page_type, subdirectory) not in self.keys:
+            return
+        with self.lock:
+            self.db.execute("DELETE FROM dead_letters WHERE type = ? AND subdirectory = ?", (page_type, subdirectory))
+            self.db.commit()
+            self.keys.discard((page_type, subdirectory))
+
+    # queued pages of a type, oldest failure first; `due` only the ones whose backoff is over and
+    # that have attempts left
+    def entries(self, page_type: str = None, due: bool = False) -> list:
+        query = "SELECT " + ", ".join(self.COLUMNS) + " FROM dead_letters WHERE 1 = 1"
+        params = []
+        if page_type is not None:
+            query += " AND type = ?"
+            params.append(page_type)
+        if due:
+            query += " AND next_attempt_at <= ? AND attempts < ?"
+            params += [time.time(), self.max_attempts]
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY first_failed_at", params).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    # seconds until the next page of a type that has attempts left is due, None when there is none
+    def next_due_in(self, page_type: str) -> float:
+        with self.lock:
+            row = self.db.execute("SELECT MIN(next_attempt_at) FROM dead_letters WHERE type = ? AND attempts < ?",
+                                  (page_type, self.max_attempts)).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def stats(self) -> dict:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT type, error, COUNT(*), SUM(attempts >= ?) FROM dead_letters GROUP BY type, error", (self.max_attempts,)
+            ).fetchall()
+        stats = {}
+        for page_type, error, count, given_up in rows:
+            entry = stats.setdefault(page_type, {"queued": 0, "givenUp": 0, "errors": {}})
+            entry["queued"] += count
+            entry["givenUp"] += given_up
+            entry["errors"][error] = count
+        return stats
+
+    def clear(self, page_type: str = None):
+        with self.lock:
+            if page_type is None:
+                self.db.execute("DELETE FROM dead_letters")
+                self.keys.clear()
+            else:
+                self.db.execute("DELETE FROM dead_letters WHERE type = ?", (page_type,))
+                self.keys = {key for key in self.keys if key[0] != page_type}
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,177 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+# "gzip,deflate" plus "br"/"zstd" when the matching decoder package is installed
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .response_cache import ResponseCache
+from .scrape_metrics import ScrapeMetrics
+
+
+# connection pool classes whose new connections report their connect time (DNS, TCP and TLS)
+def timed_pool_classes(metrics: ScrapeMetrics) -> dict:
+    pool_classes = {}
+    for scheme, pool_class in [("http", HTTPConnectionPool), ("https", HTTPSConnectionPool)]:
+        def connect(connection, base=pool_class.ConnectionCls):
+            start_time = time.perf_counter()
+            try:
+                base.connect(connection)
+            except Exception as e:
+                metrics.error(ScrapeMetrics.STAGE_CONNECT, e)
+                raise
+            metrics.observe(ScrapeMetrics.STAGE_CONNECT, time.perf_counter() - start_time, connection.host + ":" + str(connection.port))
+
+        connection_class = type("Timed" + pool_class.ConnectionCls.__name__, (pool_class.ConnectionCls,), {"connect": connect})
+        pool_classes[scheme] = type("Timed" + pool_class.__name__, (pool_class,), {"ConnectionCls": connection_class})
+    return pool_classes
+
+
+class HttpSession:
+
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.163 Safari/537.36"
+
+    # `limiter` paces requests per host and backs off on 429/503 (marketdata.rate_limiter.RateLimiter,
+    # or anything with its request(url, send) method); pass the shared one to split a host's budget
+    # with the other fetchers; `metrics` times connects and downloads (and the scrapers' parse stages);
+    # `max_age` caps how long a cached page is served without asking the site (default the cache's ttl)
+    def __init__(self, pool_size: int = 16, timeout: float = 30, cache: ResponseCache = None, log: bool = False,
+                 limiter=None, metrics: ScrapeMetrics = None, max_age: float = None):
+        self.timeout = timeout
+        self.cache = cache
+        self.max_age = max_age
+        self.log = log
+        self.limiter = limiter
+        self.metrics = metrics
+
+        # one keep-alive connection pool per host, shared by every request
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        if metrics is not None:
+            self.adapter.poolmanager.pool_classes_by_scheme = timed_pool_classes(metrics)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({
+            "User-Agent": self.USER_AGENT,
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive"
+        })
+
+        # transfer counters
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+
+    # `max_age` overrides the session's for this request, 0 revalidates a cached page with a conditional GET
+    def get(self, url: str, max_age: float = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cache is not None:
+            return self.__cached_get(url, self.max_age if max_age is None else max_age, **kwargs)
+        return self.__get(url, **kwargs)
+
+    def __get(self, url: str, **kwargs) -> requests.Response:
+        # download time of the request that was answered, waits on the rate limiter excluded
+        timings = []
+
+        def send() -> requests.Response:
+            start_time = time.perf_counter()
+            response = self.session.get(url, **kwargs)
+            timings.append(time.perf_counter() - start_time)
+            return response
+
+        try:
+            response = self.limiter.request(url, send) if self.limiter is not None else send()
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.error(ScrapeMetrics.STAGE_DOWNLOAD, e)
+            raise
+
+        # bytes as sent on the wire (compressed) vs after content decoding
+        decoded = len(response.content)
+        received = response.raw.tell() if response.raw is not None else decoded
+        with self.lock:
+            self.request_count += 1
+            self.bytes_received += received
+            self.bytes_decoded += decoded
+
+        if self.metrics is not None:
+            self.metrics.observe(ScrapeMetrics.STAGE_DOWNLOAD, timings[-1], url, received)
+            if response.status_code >= 400:
+                self.metrics.error(ScrapeMetrics.STAGE_DOWNLOAD, "HTTP " + str(response.status_code))
+        return response
+
+    # serve fresh entries from the cache, revalidate stale ones with a conditional GET;
+    # every response gets a `body_hash` and a `from_cache` flag
+    def __cached_get(self, url: str, max_age: float, **kwargs) -> requests.Response:
+        entry = self.cache.lookup(url)
+        if entry is not None and self.cache.is_fresh(entry, max_age):
+            response = self.__from_cache(url, entry)
+            if response is not None:
+                self.cache.hit()
+                return response
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+        response = self.__get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            cached = self.__from_cache(url, entry)
+            if cached is not None:
+                self.cache.revalidated(url, response.headers)
+                return cached
+            # evicted while revalidating, fetch it unconditionally
+            response = self.__get(url, **kwargs)
+
+        self.cache.miss()
+        response.from_cache = False
+        response.body_hash = self.cache.hash_body(response.content)
+        if response.status_code == 200:
+            self.cache.store(url, response.content, response.body_hash, response.encoding, response.headers)
+        return response
+
+    def __from_cache(self, url: str, entry: dict):
+        cached = self.cache.load(url)
+        if cached is None:
+            return None
+        body, encoding, content_type = cached
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.encoding = encoding
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type or "text/html"})
+        response.from_cache = True
+        response.body_hash = entry["body_hash"]
+        return response
+
+    # number of TCP connections opened so far, summed over the pooled hosts
+    def get_connection_count(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self) -> dict:
+        connections = self.get_connection_count()
+        with self.lock:
+            stats = {
+                "requests": self.request_count,
+                "connectionsOpened": connections,
+                "connectionsReused": max(0, self.request_count - connections),
+                "bytesReceived": self.bytes_received,
+                "bytesDecoded": self.bytes_decoded,
+                "compressionRatio": round(self.bytes_decoded / self.bytes_received, 2) if self.bytes_received else None
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        if self.metrics is not None:
+            stats["stages"] = {stage: report["seconds"] for stage, report in self.metrics.report()["stages"].items()}
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,81 @@
+import hashlib
+import mmap
+import os
+import struct
+
+
+class OffsetIndex:
+
+    # sidecar "<snapshot>.idx": a header and fixed-size entries sorted by key hash,
+    # every record is found under its ticker and its subdirectory (case-insensitive)
+    SUFFIX = ".idx"
+    MAGIC = b"TTIDX001"
+    HEADER = struct.Struct("<8sQ")
+    ENTRY = struct.Struct("<QQI")
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        with open(index_path, "rb") as readfile:
+            self.map = mmap.mmap(readfile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC:
+            raise ValueError("not a snapshot offset index: " + index_path)
+
+    @staticmethod
+    def hash_key(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.casefold().encode(), digest_size=8).digest(), "little")
+
+    # lookup keys of a record: ticker and subdirectory (the last part of the page url)
+    @staticmethod
+    def record_keys(record: dict) -> list:
+        keys = []
+        if record.get("ticker"):
+            keys.append(record["ticker"])
+        subdirectory = record.get("subdirectory") or (record.get("url") or "").rstrip("/").rsplit("/", 1)[-1]
+        if subdirectory and subdirectory.casefold() not in [key.casefold() for key in keys]:
+            keys.append(subdirectory)
+        return keys
+
+    @classmethod
+    def matches(cls, record: dict, key: str) -> bool:
+        return key.casefold() in [record_key.casefold() for record_key in cls.record_keys(record)]
+
+    # index rows of a record stored at `offset` (bytes) in the snapshot file
+    @classmethod
+    def rows(cls, record: dict, offset: int, length: int) -> list:
+        return [(cls.hash_key(key), offset, length) for key in cls.record_keys(record)] if isinstance(record, dict) else []
+
+    @classmethod
+    def write(cls, index_path: str, rows: list):
+        rows = sorted(rows)
+        with open(index_path + ".part", "wb") as outfile:
+            outfile.write(cls.HEADER.pack(cls.MAGIC, len(rows)))
+            for row in rows:
+                outfile.write(cls.ENTRY.pack(*row))
+        os.replace(index_path + ".part", index_path)
+
+    def __entry(self, position: int) -> tuple:
+        return self.ENTRY.unpack_from(self.map, self.HEADER.size + position * self.ENTRY.size)
+
+    # (offset, length) of every record filed under the hash of `key`; hash collisions
+    # are rare and left to the caller to weed out
+    def find(self, key: str) -> list:
+        target = self.hash_key(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__entry(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        while low < self.count:
+            key_hash, offset, length = self.__entry(low)
+            if key_hash != target:
+                break
+            found.append((offset, length))
+            low += 1
+        return found
+
+    def close(self):
+        self.map.close()
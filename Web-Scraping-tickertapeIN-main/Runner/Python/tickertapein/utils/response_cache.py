@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ResponseCache:
+
+    def __init__(self, dir_path: str = None, ttl: float = 6 * 60 * 60, max_bytes: int = 512 * 1024 * 1024, log: bool = False):
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/cache")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.log = log
+
+        # one row per url: compressed body, validators, body hash and the record parsed from it
+        os.makedirs(self.dir_path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.dir_path, "responses.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body BLOB, size INTEGER, encoding TEXT, content_type TEXT, "
+            "etag TEXT, last_modified TEXT, body_hash TEXT, record TEXT, fetched_at REAL, accessed_at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.record_hits = 0
+
+    @staticmethod
+    def hash_body(body: bytes) -> str:
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    # cached entry for a url, or None
+    def lookup(self, url: str):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, fetched_at, body_hash FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"url": url, "etag": row[0], "last_modified": row[1], "fetched_at": row[2], "body_hash": row[3]}
+
+    # fresh for the ttl, or for `max_age` seconds when that is shorter (0 always revalidates)
+    def is_fresh(self, entry: dict, max_age: float = None) -> bool:
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        return time.time() - entry["fetched_at"] < ttl
+
+    # validators to send with a conditional GET for a stale entry
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # body, encoding and content type of a cached url, marks it as recently used;
+    # None if it was evicted in the meantime
+    def load(self, url: str):
+        with self.lock:
+            row = self.db.execute("SELECT body, encoding, content_type FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+        return zlib.decompress(row[0]), row[1], row[2]
+
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+
+    # a 304 Not Modified: the cached body is good for another ttl
+    def revalidated(self, url: str, headers: dict):
+        with self.lock:
+            self.revalidations += 1
+            self.db.execute(
+                "UPDATE responses SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), url)
+            )
+            self.db.commit()
+
+    # store a fresh 200 response, keeping the parsed record only if the body is unchanged
+    def store(self, url: str, body: bytes, body_hash: str, encoding: str, headers: dict):
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT size, body_hash, record FROM responses WHERE url = ?", (url,)).fetchone()
+            record = row[2] if row is not None and row[1] == body_hash else None
+            self.total_bytes += len(compressed) - (row[0] if row is not None else 0)
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, compressed, len(compressed), encoding, headers.get("Content-Type"),
+                 headers.get("ETag"), headers.get("Last-Modified"), body_hash, record, now, now)
+            )
+            self.__evict()
+            self.db.commit()
+
+    # drop least recently used entries until the cache fits in max_bytes
+    def __evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute("SELECT url, size FROM responses ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.log:
+                    print("evicting from cache: " + url)
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    # record parsed earlier from a body with this hash, so the page need not be parsed again
+    def get_record(self, url: str, body_hash: str):
+        if body_hash is None:
+            return None
+        with self.lock:
+            row = self.db.execute("SELECT record FROM responses WHERE url = ? AND body_hash = ?", (url, body_hash)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            self.record_hits += 1
+        return json.loads(row[0])
+
+    def put_record(self, url: str, body_hash: str, record):
+        if body_hash is None:
+            return
+        with self.lock:
+            self.db.execute("UPDATE responses SET record = ? WHERE url = ? AND body_hash = ?", (json.dumps(record), url, body_hash))
+            self.db.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "parseSkipped": self.record_hits,
+                "bytes": self.total_bytes
+            }
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,184 @@
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageStats:
+
+    # latency histogram of one stage with the Prometheus default buckets (seconds)
+    BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    def __init__(self, slowest: int):
+        self.slowest = slowest
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.errors = {}
+        # min-heap of the `slowest` longest (seconds, url)
+        self.slowest_urls = []
+
+    def observe(self, seconds: float, url: str = None, size: int = 0):
+        index = 0
+        while index < len(self.BUCKETS) and seconds > self.BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.bytes += size
+        if url is not None and self.slowest > 0:
+            if len(self.slowest_urls) < self.slowest:
+                heapq.heappush(self.slowest_urls, (seconds, url))
+            elif seconds > self.slowest_urls[0][0]:
+                heapq.heapreplace(self.slowest_urls, (seconds, url))
+
+    # quantile estimated from the histogram, interpolated inside its bucket
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.BUCKETS[index - 1] if index > 0 else 0.0
+                upper = self.BUCKETS[index] if index < len(self.BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def report(self) -> dict:
+        return {
+            "count": self.count,
+            "seconds": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": round(self.quantile(0.5), 6) if self.count else None,
+            "p90": round(self.quantile(0.9), 6) if self.count else None,
+            "p99": round(self.quantile(0.99), 6) if self.count else None,
+            "max": round(self.max, 6),
+            "bytes": self.bytes,
+            "buckets": {str(le): count for le, count in zip(self.BUCKETS + ["+Inf"], self.counts)},
+            "errors": dict(self.errors),
+            "slowest": [{"url": url, "seconds": round(seconds, 6)} for seconds, url in sorted(self.slowest_urls, reverse=True)]
+        }
+
+
+class ScrapeMetrics:
+
+    # connect: DNS + TCP + TLS of a new connection, download: request until the whole body is in
+    # (a new connection's connect included), parse: html to tree and selector matches,
+    # normalize: matches to the output record, save: writing records to the snapshot
+    STAGE_CONNECT = "connect"
+    STAGE_DOWNLOAD = "download"
+    STAGE_PARSE = "parse"
+    STAGE_NORMALIZE = "normalize"
+    STAGE_SAVE = "save"
+    STAGES = [STAGE_CONNECT, STAGE_DOWNLOAD, STAGE_PARSE, STAGE_NORMALIZE, STAGE_SAVE]
+
+    PROMETHEUS_PREFIX = "tickertape_scrape"
+
+    def __init__(self, slowest: int = 10, dir_path: str = None, log: bool = False):
+        self.slowest = slowest
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/metrics")
+        self.log = log
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.stages = {stage: StageStats(self.slowest) for stage in self.STAGES}
+
+    def observe(self, stage: str, seconds: float, url: str = None, size: int = 0):
+        with self.lock:
+            self.stages[stage].observe(seconds, url, size)
+
+    # count a failure of a stage under its exception type (or a label like "HTTP 500")
+    def error(self, stage: str, error):
+        kind = error if isinstance(error, str) else type(error).__name__
+        with self.lock:
+            errors = self.stages[stage].errors
+            errors[kind] = errors.get(kind, 0) + 1
+
+    # time the block as `stage`; an exception is counted as an error of the stage and raised again
+    @contextmanager
+    def timer(self, stage: str, url: str = None):
+        start_time = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(stage, e)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start_time, url)
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "wallSeconds": round(time.time() - self.started_at, 3),
+                "stages": {stage: stats.report() for stage, stats in self.stages.items()}
+            }
+
+    # Prometheus text exposition format, as read by node_exporter's textfile collector
+    def prometheus(self) -> str:
+        prefix = self.PROMETHEUS_PREFIX
+        lines = [
+            "# HELP " + prefix + "_stage_seconds Time spent per scrape stage.",
+            "# TYPE " + prefix + "_stage_seconds histogram"
+        ]
+        with self.lock:
+            for stage, stats in self.stages.items():
+                cumulative = 0
+                for le, count in zip(stats.BUCKETS + ["+Inf"], stats.counts):
+                    cumulative += count
+                    lines.append(prefix + '_stage_seconds_bucket{stage="' + stage + '",le="' + str(le) + '"} ' + str(cumulative))
+                lines.append(prefix + '_stage_seconds_sum{stage="' + stage + '"} ' + repr(stats.sum))
+                lines.append(prefix + '_stage_seconds_count{stage="' + stage + '"} ' + str(stats.count))
+
+            lines += ["# HELP " + prefix + "_stage_bytes_total Bytes handled per scrape stage.",
+                      "# TYPE " + prefix + "_stage_bytes_total counter"]
+            lines += [prefix + '_stage_bytes_total{stage="' + stage + '"} ' + str(stats.bytes) for stage, stats in self.stages.items()]
+
+            lines += ["# HELP " + prefix + "_errors_total Failures per scrape stage and exception type.",
+                      "# TYPE " + prefix + "_errors_total counter"]
+            for stage, stats in self.stages.items():
+                for kind, count in sorted(stats.errors.items()):
+                    lines.append(prefix + '_errors_total{stage="' + stage + '",exception="' + kind.replace('"', "'") + '"} ' + str(count))
+
+            lines += ["# HELP " + prefix + "_started_timestamp_seconds Start of the measured run.",
+                      "# TYPE " + prefix + "_started_timestamp_seconds gauge",
+                      prefix + "_started_timestamp_seconds " + repr(self.started_at)]
+        return "\n".join(lines) + "\n"
+
+    # write scrape_metrics.json and scrape_metrics.prom, each replaced in one step so a
+    # collector never reads half a file; returns the two paths
+    def save(self, name: str = "scrape_metrics") -> tuple:
+        os.makedirs(self.dir_path, exist_ok=True)
+        json_path = os.path.join(self.dir_path, name + ".json")
+        prom_path = os.path.join(self.dir_path, name + ".prom")
+        for path, body in [(json_path, json.dumps(self.report(), indent=1)), (prom_path, self.prometheus())]:
+            with open(path + ".part", "w") as outfile:
+                outfile.write(body)
+            os.replace(path + ".part", path)
+        if self.log:
+            print("scrape metrics saved to " + json_path + " and " + prom_path)
+        return json_path, prom_path
+
+    # one line per stage, for the end of a run
+    def summary(self) -> str:
+        lines = []
+        for stage, stats in self.report()["stages"].items():
+            if stats["count"] == 0:
+                continue
+            line = "%-9s %6d x  total %8.2fs  p50 %7.1fms  p99 %7.1fms" % (stage, stats["count"], stats["seconds"], stats["p50"] * 1000, stats["p99"] * 1000)
+            if stats["bytes"]:
+                line += "  %8.1f KB" % (stats["bytes"] / 1024)
+            if stats["errors"]:
+                line += "  errors " + ", ".join(kind + " x" + str(count) for kind, count in stats["errors"].items())
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+class SnapshotCatalog:
+
+    COLUMNS = ["id", "scrape_type", "saved_at", "datetime", "file_name", "file_format", "count", "size", "checksum",
+               "history_version", "on_disk"]
+    REFRESH_COLUMNS = ["id", "tier", "started_at", "finished_at", "count", "status"]
+
+    def __init__(self, dir_path: str = None, log: bool = False):
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/catalog")
+        self.log = log
+
+        # one row per saved snapshot; on_disk drops to 0 once the file is removed, a snapshot
+        # kept in the history can still be loaded through its history_version
+        os.makedirs(self.dir_path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.dir_path, "catalog.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, scrape_type TEXT, saved_at REAL, datetime TEXT, file_name TEXT, "
+            "file_format TEXT, count INTEGER, size INTEGER, checksum TEXT, history_version INTEGER, on_disk INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS snapshots_type_saved_at ON snapshots (scrape_type, saved_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS snapshots_type_file ON snapshots (scrape_type, file_name)")
+
+        # one row per refresh daemon run of a tier, what its schedule is worked out from
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS refreshes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, tier TEXT, started_at REAL, finished_at REAL, count INTEGER, status TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS refreshes_tier_finished_at ON refreshes (tier, finished_at)")
+        self.db.commit()
+
+    @staticmethod
+    def checksum(file_path: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as readfile:
+            for chunk in iter(lambda: readfile.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def timestamp(when) -> float:
+        # datetime (naive ones are local time) or unix time
+        return when.timestamp() if isinstance(when, datetime) else float(when)
+
+    def __entries(self, rows: list) -> list:
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    # `saved_at` (datetime or unix time) defaults to now, pass it to catalogue older snapshots
+    def register(self, scrape_type: str, file_path: str, count: int, history_version: int = None, saved_at=None) -> dict:
+        saved_at = self.timestamp(saved_at) if saved_at is not None else time.time()
+        file_name = os.path.basename(file_path)
+        row = (scrape_type, saved_at, datetime.fromtimestamp(saved_at).isoformat(timespec="seconds"), file_name,
+               file_name.rsplit(".", 1)[-1], count, os.path.getsize(file_path), self.checksum(file_path), history_version, 1)
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO snapshots (scrape_type, saved_at, datetime, file_name, file_format, count, size, checksum, "
+                "history_version, on_disk) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self.db.commit()
+        if self.log:
+            print("catalogued " + scrape_type + " snapshot " + file_name)
+        return dict(zip(self.COLUMNS, (cursor.lastrowid,) + row))
+
+    # the file of a snapshot was deleted (clear, or replaced by a history delta)
+    def removed(self, scrape_type: str, file_name: str = None):
+        with self.lock:
+            if file_name is None:
+                self.db.execute("UPDATE snapshots SET on_disk = 0 WHERE scrape_type = ?", (scrape_type,))
+            else:
+                self.db.execute("UPDATE snapshots SET on_disk = 0 WHERE scrape_type = ? AND file_name = ?", (scrape_type, file_name))
+            self.db.commit()
+
+    def has_files(self, scrape_type: str) -> bool:
+        with self.lock:
+            row = self.db.execute("SELECT 1 FROM snapshots WHERE scrape_type = ? AND on_disk = 1 LIMIT 1", (scrape_type,)).fetchone()
+        return row is not None
+
+    # latest snapshot saved at or before `as_of` (default: now), or None
+    def as_of(self, scrape_type: str, as_of=None) -> dict:
+        saved_at = self.timestamp(as_of) if as_of is not None else float("inf")
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT * FROM snapshots WHERE scrape_type = ? AND saved_at <= ? ORDER BY saved_at DESC, id DESC LIMIT 1",
+                (scrape_type, saved_at)
+            ).fetchall()
+        entries = self.__entries(rows)
+        return entries[0] if entries else None
+
+    def latest(self, scrape_type: str) -> dict:
+        return self.as_of(scrape_type)
+
+    # snapshots saved in [start, end], oldest first
+    def between(self, scrape_type: str, start=None, end=None) -> list:
+        start = self.timestamp(start) if start is not None else float("-inf")
+        end = self.timestamp(end) if end is not None else float("inf")
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT * FROM snapshots WHERE scrape_type = ? AND saved_at >= ? AND saved_at <= ? ORDER BY saved_at, id",
+                (scrape_type, start, end)
+            ).fetchall()
+        return self.__entries(rows)
+
+    def record_refresh(self, tier: str, started_at: float, finished_at: float, count: int, status: str = "ok") -> dict:
+        row = (tier, started_at, finished_at, count, status)
+        with self.lock:
+            cursor = self.db.execute("INSERT INTO refreshes (tier, started_at, finished_at, count, status) VALUES (?, ?, ?, ?, ?)", row)
+            self.db.commit()
+        return dict(zip(self.REFRESH_COLUMNS, (cursor.lastrowid,) + row))
+
+    # latest refresh of a tier (with `status`, any status when None), or None
+    def last_refresh(self, tier: str, status: str = "ok") -> dict:
+        with self.lock:
+            if status is None:
+                row = self.db.execute("SELECT * FROM refreshes WHERE tier = ? ORDER BY finished_at DESC, id DESC LIMIT 1", (tier,)).fetchone()
+            else:
+                row = self.db.execute("SELECT * FROM refreshes WHERE tier = ? AND status = ? ORDER BY finished_at DESC, id DESC LIMIT 1",
+                                      (tier, status)).fetchone()
+        return dict(zip(self.REFRESH_COLUMNS, row)) if row is not None else None
+
+    # failed refreshes of a tier since its last successful one
+    def consecutive_errors(self, tier: str) -> int:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT COUNT(*) FROM refreshes WHERE tier = ? AND status != 'ok' AND finished_at >= "
+                "COALESCE((SELECT MAX(finished_at) FROM refreshes WHERE tier = ? AND status = 'ok'), 0)", (tier, tier)
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
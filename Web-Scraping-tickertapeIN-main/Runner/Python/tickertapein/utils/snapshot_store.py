@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .columnar import flatten
+
+
+class SnapshotStore:
+
+    KIND_BASE = "base"
+    KIND_DELTA = "delta"
+
+    def __init__(self, dir_path: str = None, compact_every: int = 24, compact_ratio: float = 2.0, log: bool = False):
+        # a full base snapshot every `compact_every` versions, or sooner once the deltas
+        # since the last base add up to `compact_ratio` of its size
+        self.dir_path = dir_path if dir_path is not None else os.path.abspath("./tickertapein/history")
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        self.log = log
+        self.lock = threading.Lock()
+
+        # scrape type -> (version, records, hashes) of the last version saved, the base of the next delta
+        self.latest = {}
+
+    @staticmethod
+    def hash_record(record: dict) -> str:
+        return hashlib.blake2b(json.dumps(record, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    # records are keyed by ticker; pages sharing a ticker are told apart by their url
+    @staticmethod
+    def record_key(record: dict, seen: set) -> str:
+        key = record.get("ticker") or record.get("subdirectory") or record.get("url")
+        if key in seen:
+            key = key + "|" + str(record.get("url") or record.get("subdirectory"))
+        return key
+
+    def get_paths(self, scrape_type: str) -> tuple:
+        type_path = os.path.join(self.dir_path, scrape_type)
+        return type_path, os.path.join(type_path, "manifest.json")
+
+    # every stored version of a scrape type, oldest first
+    def versions(self, scrape_type: str) -> list:
+        _, manifest_path = self.get_paths(scrape_type)
+        if not os.path.isfile(manifest_path):
+            return []
+        with open(manifest_path, "r") as readfile:
+            return json.load(readfile)
+
+    def __write_manifest(self, scrape_type: str, versions: list):
+        _, manifest_path = self.get_paths(scrape_type)
+        with open(manifest_path + ".part", "w") as outfile:
+            json.dump(versions, outfile, indent=1)
+        os.replace(manifest_path + ".part", manifest_path)
+
+    def __entry(self, scrape_type: str, version: int = None) -> dict:
+        versions = self.versions(scrape_type)
+        if not versions:
+            return None
+        if version is None:
+            return versions[-1]
+        for entry in versions:
+            if entry["version"] == version:
+                return entry
+        raise KeyError("no " + scrape_type + " snapshot version " + str(version))
+
+    # rebuild a version as an ordered key -> record dict from its base and the deltas after it
+    def __rebuild(self, scrape_type: str, version: int) -> dict:
+        type_path, _ = self.get_paths(scrape_type)
+        versions = [entry for entry in self.versions(scrape_type) if entry["version"] <= version]
+        start = max(i for i, entry in enumerate(versions) if entry["kind"] == self.KIND_BASE)
+
+        records = {}
+        for entry in versions[start:]:
+            with open(os.path.join(type_path, entry["file"]), "r") as readfile:
+                for line in readfile:
+                    change = json.loads(line)
+                    op = change["op"]
+                    if op == "put":
+                        records[change["key"]] = change["record"]
+                    elif op == "patch":
+                        self.__apply(records[change["key"]], change)
+                    elif op == "del":
+                        del records[change["key"]]
+                    elif op == "order":
+                        records = {key: records[key] for key in change["keys"]}
+        return records
+
+    def __apply(self, record: dict, patch: dict):
+        for path in patch["unset"]:
+            self.__unset_path(record, path.split("."))
+        for path, value in patch["set"].items():
+            self.__set_path(record, path.split("."), value)
+
+    @staticmethod
+    def __set_path(record: dict, path: list, value):
+        for key in path[:-1]:
+            record = record.setdefault(key, {})
+        record[path[-1]] = value
+
+    @staticmethod
+    def __unset_path(record: dict, path: list):
+        parents = [record]
+        for key in path[:-1]:
+            parents.append(parents[-1][key])
+        del parents[-1][path[-1]]
+        # drop the nested blocks left empty
+        for key, parent in zip(reversed(path[:-1]), reversed(parents[:-1])):
+            if parent[key]:
+                break
+            del parent[key]
+
+    def load(self, scrape_type: str, version: int = None) -> list:
+        # the records of a version (latest by default) in their scraped order
+        entry = self.__entry(scrape_type, version)
+        if entry is None:
+            return []
+        return list(self.__rebuild(scrape_type, entry["version"]).values())
+
+    # store a snapshot as a delta against the latest version, or as a new base when due;
+    # failed pages ({}) carry no key and are not kept
+    def save(self, data, scrape_type: str, compact: bool = False) -> dict:
+        with self.lock:
+            type_path, _ = self.get_paths(scrape_type)
+            os.makedirs(type_path, exist_ok=True)
+            versions = self.versions(scrape_type)
+            latest = versions[-1] if versions else None
+            if latest is None:
+                previous, previous_hashes = {}, {}
+            elif self.latest.get(scrape_type, (None,))[0] == latest["version"]:
+                _, previous, previous_hashes = self.latest[scrape_type]
+            else:
+                previous = self.__rebuild(scrape_type, latest["version"])
+                previous_hashes = {key: self.hash_record(record) for key, record in previous.items()}
+
+            records = {}
+            seen = set()
+            for record in data:
+                if not record:
+                    continue
+                key = self.record_key(record, seen)
+                seen.add(key)
+                records[key] = record
+
+            since_base = []
+            for entry in reversed(versions):
+                since_base.append(entry)
+                if entry["kind"] == self.KIND_BASE:
+                    break
+            delta_bytes = sum(entry["bytes"] for entry in since_base[:-1])
+            base_bytes = since_base[-1]["bytes"] if since_base else 0
+            rebase = compact or latest is None or len(since_base) >= self.compact_every or delta_bytes >= base_bytes * self.compact_ratio
+
+            version = latest["version"] + 1 if latest is not None else 1
+            kind = self.KIND_BASE if rebase else self.KIND_DELTA
+            file_name = kind + "_" + str(version).zfill(6) + ".ndjson"
+            counts = {"added": 0, "changed": 0, "removed": 0}
+
+            full_bytes = 0
+            hashes = {}
+            with open(os.path.join(type_path, file_name), "w") as outfile:
+                for key, record in records.items():
+                    content_hash = hashes[key] = self.hash_record(record)
+                    encoded = json.dumps(record)
+                    full_bytes += len(encoded) + 2
+                    if key not in previous:
+                        counts["added"] += 1
+                    elif previous_hashes[key] != content_hash:
+                        counts["changed"] += 1
+                        if not rebase and not self.__has_empty_block(previous[key]) and not self.__has_empty_block(record):
+                            outfile.write(json.dumps(self.__patch(key, previous[key], record, content_hash)) + "\n")
+                            continue
+                    elif not rebase:
+                        continue
+                    outfile.write('{"op": "put", "key": ' + json.dumps(key) + ', "hash": "' + content_hash + '", "record": ' + encoded + "}\n")
+
+                if not rebase:
+                    for key in previous:
+                        if key not in records:
+                            counts["removed"] += 1
+                            outfile.write(json.dumps({"op": "del", "key": key}) + "\n")
+                    # a delta puts new records at the end, record the order when that is not enough
+                    order = [key for key in previous if key in records] + [key for key in records if key not in previous]
+                    if order != list(records):
+                        outfile.write(json.dumps({"op": "order", "keys": list(records)}) + "\n")
+                else:
+                    counts["removed"] = sum(1 for key in previous if key not in records)
+
+            entry = {
+                "version": version,
+                "datetime": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "kind": kind,
+                "file": file_name,
+                "count": len(records),
+                "added": counts["added"],
+                "changed": counts["changed"],
+                "removed": counts["removed"],
+                "bytes": os.path.getsize(os.path.join(type_path, file_name)),
+                "fullBytes": full_bytes
+            }
+            self.__write_manifest(scrape_type, versions + [entry])
+            self.latest[scrape_type] = (version, records, hashes)
+
+        if self.log:
+            print("stored " + scrape_type + " snapshot version " + str(version) + " as " + kind + ": " +
+                  str(counts["added"]) + " added, " + str(counts["changed"]) + " changed, " + str(counts["removed"]) + " removed")
+        return entry
+
+    # changed fields of a record by flattened path
+    def __patch(self, key: str, old: dict, new: dict, content_hash: str) -> dict:
+        old_flat = flatten(old)
+        new_flat = flatten(new)
+        changed = {path: value for path, value in new_flat.items() if path not in old_flat or old_flat[path] != value}
+        removed = [path for path in old_flat if path not in new_flat]
+        return {"op": "patch", "key": key, "hash": content_hash, "set": changed, "unset": removed}
+
+    # flattened paths can't express an empty nested block, such records are stored whole
+    def __has_empty_block(self, record: dict) -> bool:
+        return any(isinstance(value, dict) and (not value or self.__has_empty_block(value)) for value in record.values())
+
+    # drop every version older than the latest base; they can no longer be loaded afterwards
+    def prune(self, scrape_type: str) -> int:
+        with self.lock:
+            type_path, _ = self.get_paths(scrape_type)
+            versions = self.versions(scrape_type)
+            bases = [i for i, entry in enumerate(versions) if entry["kind"] == self.KIND_BASE]
+            if not bases or bases[-1] == 0:
+                return 0
+            for entry in versions[:bases[-1]]:
+                os.remove(os.path.join(type_path, entry["file"]))
+            self.__write_manifest(scrape_type, versions[bases[-1]:])
+            return bases[-1]
+
+    # bytes on disk against the same versions stored as full json copies
+    def stats(self, scrape_type: str) -> dict:
+        versions = self.versions(scrape_type)
+        stored = sum(entry["bytes"] for entry in versions)
+        full = sum(entry["fullBytes"] for entry in versions)
+        return {
+            "versions": len(versions),
+            "bases": sum(1 for entry in versions if entry["kind"] == self.KIND_BASE),
+            "bytes": stored,
+            "fullBytes": full,
+            "savedBytes": full - stored,
+            "savedRatio": round(1 - stored / full, 4) if full else 0.0
+        }
@@ -0,0 +1,106 @@
+# Batch quotes one by one (the old batch_quotes loop) vs the concurrent fan-out,
+# against a stand-in for bsedata's getQuote with network-like latency, paced by a
+# per-host rate limiter like the shared one. A few scrips hang and must come back
+# as timeouts without holding up the batch; every other quote must come back. Under
+# a slow upstream where many scrips hang, the given-up threads must stay capped.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_batch_quotes --scrips 200 --rate 20
+
+import argparse
+import random
+import threading
+import time
+
+from marketdata.batch_quotes import BatchQuotes, QuoteTimeout
+from marketdata.rate_limiter import BSE_MOBILE_HOST, RateLimiter
+
+
+def check_slow_upstream(workers=4, max_abandoned=4, scrips=60, timeout=0.3):
+    """A third of the scrips take 1s, over three timeouts: returns the peak of requests in flight,
+    which counts the threads given up on too, and the scrips that timed out"""
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def get_quote(scrip_code):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        try:
+            time.sleep(1.0 if int(scrip_code) % 3 == 0 else 0.01)
+            return {"scripCode": scrip_code}
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    batch = BatchQuotes(get_quote, workers=workers, timeout=timeout, max_abandoned=max_abandoned)
+    results = list(batch.iter([str(500000 + i) for i in range(scrips)]))
+    assert len(results) == scrips
+    timed_out = [code for code, quote, error in results if isinstance(error, QuoteTimeout)]
+    assert sorted(timed_out) == [code for code, _, _ in sorted(results) if int(code) % 3 == 0]
+    return in_flight[1], timed_out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scrips", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.25, help="mean seconds per quote")
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second allowed to the BSE host")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hanging", type=int, default=2, help="scrips whose request hangs")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+
+    random.seed(7)
+    scrip_codes = [str(500000 + i) for i in range(args.scrips)]
+    hanging = set(random.sample(scrip_codes, args.hanging))
+    latencies = {code: random.expovariate(1 / args.latency) for code in scrip_codes}
+
+    def get_quote(scrip_code):
+        time.sleep(30 if scrip_code in hanging else latencies[scrip_code])
+        return {"scripCode": scrip_code, "companyName": "Company " + scrip_code, "currentValue": "100.00"}
+
+    def limited(limiter):
+        return lambda code: limiter.call(BSE_MOBILE_HOST, get_quote, (code,))
+
+    # one by one, leaving out the hanging scrips (they would take the loop 30s each)
+    limiter = RateLimiter(rates={BSE_MOBILE_HOST: (args.rate, 1)})
+    fetch = limited(limiter)
+    start_time = time.perf_counter()
+    first = None
+    for code in scrip_codes:
+        if code in hanging:
+            continue
+        fetch(code)
+        first = first or time.perf_counter() - start_time
+    serial_seconds = time.perf_counter() - start_time
+    print("one by one:  %6.2fs, first quote after %.2fs (hanging scrips skipped)" % (serial_seconds, first))
+
+    limiter = RateLimiter(rates={BSE_MOBILE_HOST: (args.rate, 1)})
+    batch = BatchQuotes(limited(limiter), workers=args.workers, timeout=args.timeout)
+    start_time = time.perf_counter()
+    first = None
+    quotes, timed_out = {}, []
+    for code, quote, error in batch.iter(scrip_codes):
+        first = first or time.perf_counter() - start_time
+        if isinstance(error, QuoteTimeout):
+            timed_out.append(code)
+        else:
+            assert error is None and quote["scripCode"] == code
+            quotes[code] = quote
+    fanout_seconds = time.perf_counter() - start_time
+    assert set(timed_out) == hanging
+    assert len(quotes) == args.scrips - args.hanging
+    print("fan-out x%d: %6.2fs, first quote after %.2fs, %d timed out (%.1fx faster)" % (
+        args.workers, fanout_seconds, first, len(timed_out), serial_seconds / fanout_seconds))
+    print("limiter:", limiter.stats())
+
+    peak, slow_timed_out = check_slow_upstream()
+    uncapped, _ = check_slow_upstream(max_abandoned=10 ** 6)
+    assert peak <= 4 + 4 < uncapped, (peak, uncapped)
+    print("slow upstream: at most %d requests in flight for 4 workers + 4 given up on (%d uncapped), %d timed out" % (
+        peak, uncapped, len(slow_timed_out)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# get_comprehensive_data's calls (getQuote, topGainers, topLosers per scrip) for a
+# batch of scrips on a few threads, straight to a stand-in bsedata client vs through
+# CachedBSE. The market-wide lists must be fetched once per TTL however many threads
+# ask for them at the same moment, and every caller must get the same data.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_bse_cache --scrips 1000 --workers 8
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from marketdata.bse_cache import CachedBSE
+
+
+class StandInBSE:
+    """Counts calls and sleeps like a request to m.bseindia.com"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def _call(self, endpoint, value):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        time.sleep(self.latency)
+        return value
+
+    def getQuote(self, scrip_code):
+        return self._call("getQuote", {"scripCode": scrip_code, "currentValue": "100.00"})
+
+    def topGainers(self):
+        return self._call("topGainers", [{"scripCode": "500325", "pChange": "4.10"}])
+
+    def topLosers(self):
+        return self._call("topLosers", [{"scripCode": "500209", "pChange": "-3.20"}])
+
+
+def comprehensive(bse, scrip_code):
+    return {"quote_data": bse.getQuote(scrip_code), "top_gainers": bse.topGainers(), "top_losers": bse.topLosers()}
+
+
+def run(bse, scrip_codes, workers):
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda code: comprehensive(bse, code), scrip_codes))
+    return results, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scrips", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    scrip_codes = [str(500000 + i) for i in range(args.scrips)]
+
+    client = StandInBSE(args.latency)
+    expected, direct_seconds = run(client, scrip_codes, args.workers)
+    print("direct:  %6.2fs  calls %s" % (direct_seconds, client.calls))
+
+    client = StandInBSE(args.latency)
+    cached = CachedBSE(client)
+    results, cached_seconds = run(cached, scrip_codes, args.workers)
+    assert results == expected
+    assert client.calls == {"getQuote": args.scrips, "topGainers": 1, "topLosers": 1}
+    print("cached:  %6.2fs  calls %s  (%.1fx faster)" % (cached_seconds, client.calls, direct_seconds / cached_seconds))
+    print("stats:  ", cached.stats())
+
+    # the same batch again within the quote TTL is served from memory
+    results, again_seconds = run(cached, scrip_codes, args.workers)
+    assert results == expected and client.calls["getQuote"] == args.scrips
+    print("again:   %6.2fs  hit ratio %s" % (again_seconds, cached.stats()["hitRatio"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Company documents (quote, ComHeader, AnnualReport) for a batch of scrips one
+# request at a time, the old get_all_company_data loop, vs the async pipeline that
+# fetches a scrip's three sources together and keeps several scrips in flight. Both
+# run against a local stand-in for the BSE API with network-like latency, paced by
+# one per-host rate limiter, and must produce the same documents.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_company_pipeline --scrips 60 --concurrency 8
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from marketdata.bse_cache import CachedBSE
+from marketdata.rate_limiter import RateLimiter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main"))
+with contextlib.redirect_stdout(io.StringIO()):
+    from comp_url_data_extractor import BSECompanyDataExtractor
+
+HOST = "127.0.0.1"
+
+
+def stand_in_server(latency):
+    """BseIndiaAPI's ComHeader and AnnualReport, plus a quote endpoint for bsedata's getQuote"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            scrip_code = parse_qs(url.query).get("scripcode", [""])[0]
+            time.sleep(latency)
+            if url.path.endswith("/ComHeader/w"):
+                body = {"SecurityCode": scrip_code, "Industry": "Refineries", "FaceVal": "10.00"}
+            elif url.path.endswith("/AnnualReport/w"):
+                body = {"Table": [{"scrip_code": scrip_code, "year": year} for year in (2023, 2024, 2025)]}
+            elif url.path.endswith("/quote"):
+                body = {"scripCode": scrip_code, "companyName": "Company " + scrip_code, "currentValue": "100.00"}
+            else:
+                self.send_error(404)
+                return
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((HOST, 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StandInQuotes:
+    """bsedata client whose getQuote goes to the stand-in server"""
+
+    def __init__(self, base):
+        self.base = base
+        self.session = requests.Session()
+
+    def getQuote(self, scrip_code):
+        return self.session.get(self.base + "/quote", params={"scripcode": scrip_code}, timeout=10).json()
+
+
+def extractor(base, rate):
+    """Extractor pointed at the stand-in, its API and quote calls sharing one host budget"""
+    limiter = RateLimiter(rates={HOST: (rate, 4)})
+    with contextlib.redirect_stdout(io.StringIO()):
+        extractor = BSECompanyDataExtractor(api_base=base + "/BseIndiaAPI/api")
+    extractor.limiter = limiter
+    extractor.bse = CachedBSE(StandInQuotes(base), limiter=limiter, host=HOST)
+    extractor.bse_available = True
+    return extractor, limiter
+
+
+def without_fetch_time(company_data):
+    return {key: value for key, value in company_data.items() if key != "fetch_time"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scrips", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request")
+    parser.add_argument("--rate", type=float, default=40.0, help="requests per second allowed to the host")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = stand_in_server(args.latency)
+    base = "http://%s:%d" % (HOST, server.server_address[1])
+    scrip_codes = [str(500000 + i) for i in range(args.scrips)]
+
+    # the old loop: one scrip after the other, one source after the other
+    serial, _ = extractor(base, args.rate)
+    start_time = time.perf_counter()
+    expected = {}
+    for scrip_code in scrip_codes:
+        expected[scrip_code] = {
+            "scrip_code": scrip_code,
+            "basic_quote": serial.get_basic_quote(scrip_code),
+            "detailed_quote": serial.get_detailed_quote(scrip_code),
+            "financials": serial.get_company_financials(scrip_code),
+        }
+    serial_seconds = time.perf_counter() - start_time
+    assert all(all(company_data[part] for part in serial.PARTS) for company_data in expected.values())
+    print("one by one:      %6.2fs  %5.1f companies/s" % (serial_seconds, args.scrips / serial_seconds))
+
+    pipeline, limiter = extractor(base, args.rate)
+    streamed = []
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        collected = pipeline.extract_companies(scrip_codes, concurrency=args.concurrency, sink=streamed.append)
+    pipeline_seconds = time.perf_counter() - start_time
+    assert collected == {} and len(streamed) == args.scrips
+    assert {company_data["scrip_code"]: without_fetch_time(company_data) for company_data in streamed} == expected
+    print("async x%-3d       %6.2fs  %5.1f companies/s  (%.1fx faster)" % (
+        args.concurrency, pipeline_seconds, args.scrips / pipeline_seconds, serial_seconds / pipeline_seconds))
+    print("limiter:", limiter.stats())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Intraday watchlist monitoring: polling every scrip each interval and diffing the
+# quote dicts by hand, vs QuotePoller's jittered schedule that backs off scrips whose
+# quote doesn't move. The stand-in market moves a few hot scrips all the time and
+# leaves the rest quiet; requests and CPU should follow the changes, and every scrip
+# must end on its latest quote. Each request costs some CPU, like bsedata parsing the
+# quote page, so the request count shows up in the CPU time too.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_quote_poller --scrips 2000 --seconds 6
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from marketdata.quote_poller import QuotePoller
+
+
+class StandInMarket:
+    """Quotes shaped like bsedata's getQuote, a hot share of them moving every tick"""
+
+    def __init__(self, scrip_codes, hot, tick, parse_cost):
+        self.parse_cost = parse_cost
+        self.lock = threading.Lock()
+        self.quotes = {
+            code: {"companyName": "Company " + code, "scripCode": code, "currentValue": "100.00",
+                   "change": "0.00", "pChange": "0.00", "totalTradedQuantity": "0", "previousClose": "100.00",
+                   "dayHigh": "100.00", "dayLow": "100.00", "updatedOn": "17 Oct 26 | 10:00 AM"}
+            for code in scrip_codes
+        }
+        self.hot = random.sample(scrip_codes, int(len(scrip_codes) * hot))
+        self.tick = tick
+        self.requests = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._move, daemon=True)
+        self.thread.start()
+
+    def _move(self):
+        while not self.stopped.wait(self.tick):
+            with self.lock:
+                for code in self.hot:
+                    quote = self.quotes[code]
+                    price = float(quote["currentValue"]) + random.choice((-0.05, 0.05))
+                    quote["currentValue"] = "%.2f" % price
+                    quote["pChange"] = "%.2f" % (price - 100.0)
+                    quote["totalTradedQuantity"] = str(int(quote["totalTradedQuantity"]) + random.randint(1, 500))
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def getQuote(self, scrip_code):
+        with self.lock:
+            self.requests += 1
+            page = json.dumps(self.quotes[scrip_code])
+        for _ in range(self.parse_cost):
+            quote = json.loads(page)
+        return quote
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scrips", type=int, default=2000)
+    parser.add_argument("--hot", type=float, default=0.05, help="share of scrips that keep moving")
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--parse-cost", type=int, default=20, help="json decodes of the quote per request")
+    args = parser.parse_args()
+
+    random.seed(11)
+    scrip_codes = [str(500000 + i) for i in range(args.scrips)]
+
+    # the hand-rolled loop: every scrip every interval, whole dicts compared
+    market = StandInMarket(scrip_codes, args.hot, args.interval / 2, args.parse_cost)
+    last, changes = {}, 0
+    cpu_time, start_time = time.process_time(), time.perf_counter()
+    while time.perf_counter() - start_time < args.seconds:
+        round_start = time.perf_counter()
+        for code in scrip_codes:
+            quote = market.getQuote(code)
+            if last.get(code) != quote:
+                last[code] = quote
+                changes += 1
+        time.sleep(max(0.0, args.interval - (time.perf_counter() - round_start)))
+    loop_cpu = time.process_time() - cpu_time
+    market.stop()
+    loop_requests = market.requests
+    print("poll everything:  %7d requests  %6d changes  cpu %5.2fs" % (loop_requests, changes, loop_cpu))
+
+    market = StandInMarket(scrip_codes, args.hot, args.interval / 2, args.parse_cost)
+    poller = QuotePoller(market.getQuote, scrip_codes, interval=args.interval, history=20)
+    events = []
+    poller.subscribe(events.append)
+    cpu_time = time.process_time()
+    poller.start()
+    time.sleep(args.seconds)
+    market.stop()
+    poller_cpu = time.process_time() - cpu_time
+    during = poller.stats()
+    # long enough for every scrip, backed off or not, to be polled once more
+    time.sleep(poller.max_interval * (1 + poller.jitter) + args.interval)
+    poller.stop()
+
+    stats = poller.stats()
+    assert stats["errors"] == 0 and stats["changes"] == len(events)
+    assert all(set(event["changed"]) <= set(poller.FIELDS) for event in events)
+    for code in scrip_codes:
+        assert poller.latest(code) == market.quotes[code], code
+        assert len(poller.quotes(code)) <= 20
+    print("QuotePoller:      %7d requests  %6d changes  cpu %5.2fs  (%.1fx fewer requests)" % (
+        during["requests"], during["changes"], poller_cpu, loop_requests / during["requests"]))
+    print("stats:", stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Scrip master: first build from a full listing, reopening it while fresh (no
+# download), and a refresh that only writes additions and delistings, against the
+# old path of copying the whole listing row by row into a DataFrame on every run.
+# The listing is the saved BSE company list, so nothing goes over the network.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_scrip_master
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from marketdata.scrip_master import ScripMaster
+
+from .bench_search_index import BSE_COMPANIES
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--added", type=int, default=25)
+    parser.add_argument("--delisted", type=int, default=10)
+    parser.add_argument("--opens", type=int, default=20)
+    args = parser.parse_args()
+
+    df = pd.read_csv(BSE_COMPANIES)
+    listing = dict(zip(df["Scrip_Code"].astype(str), df["Company_Name"].astype(str)))
+    downloads = []
+
+    def fetch():
+        downloads.append(time.time())
+        return dict(listing)
+
+    # what extract_all_company_names did after the download: a dict per row, with progress prints
+    start_time = time.perf_counter()
+    companies_data = []
+    for i, (scrip_code, company_name) in enumerate(listing.items()):
+        companies_data.append({'Scrip_Code': scrip_code, 'Company_Name': company_name})
+    old_df = pd.DataFrame(companies_data)
+    old_seconds = time.perf_counter() - start_time
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "scrip_master.db")
+
+        start_time = time.perf_counter()
+        master = ScripMaster(path, fetch=fetch)
+        counts = master.refresh()
+        master.close()
+        build_seconds = time.perf_counter() - start_time
+        assert counts["added"] == len(listing) and counts["version"] == 1
+
+        # a fresh master opens without downloading anything
+        start_time = time.perf_counter()
+        for _ in range(args.opens):
+            master = ScripMaster(path, fetch=fetch)
+            assert master.refresh() is None
+            codes = master.scrip_codes()
+            new_df = pd.DataFrame({'Scrip_Code': list(codes.keys()), 'Company_Name': list(codes.values())})
+            master.close()
+        open_seconds = (time.perf_counter() - start_time) / args.opens
+        assert len(downloads) == 1 and new_df.equals(old_df)
+
+        # the listing moves on: a few new scrips, a few gone
+        random.seed(3)
+        for code in random.sample(sorted(listing), args.delisted):
+            del listing[code]
+        for i in range(args.added):
+            listing[str(900000 + i)] = "NEW COMPANY " + str(i) + " LTD"
+
+        master = ScripMaster(path, max_age=0, fetch=fetch)
+        start_time = time.perf_counter()
+        counts = master.refresh()
+        refresh_seconds = time.perf_counter() - start_time
+        assert counts == {"version": 2, "added": args.added, "renamed": 0, "delisted": args.delisted}
+        assert master.scrip_codes() == listing
+        assert len(master.changes(since_version=1)) == args.added + args.delisted
+        master.close()
+
+        print("row by row DataFrame (every run):  %7.2f ms for %d scrips" % (old_seconds * 1000, len(old_df)))
+        print("first build:                       %7.2f ms" % (build_seconds * 1000))
+        print("open while fresh + DataFrame:      %7.2f ms, no download" % (open_seconds * 1000))
+        print("refresh (+%d / -%d):                %7.2f ms, %d rows written" % (
+            args.added, args.delisted, refresh_seconds * 1000, args.added + args.delisted))
+
+
+if __name__ == "__main__":
+    main()
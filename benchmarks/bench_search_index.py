@@ -0,0 +1,116 @@
+# Fuzzy name search through the trigram index against the substring scan the
+# scripts used before, over the BSE company list and the tickertape names list.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_search_index --repeat 200
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from marketdata.search_index import NameSearchIndex
+
+BSE_COMPANIES = "main/data/bse_companies.csv"
+TICKERTAPE_COMPANIES = "Web-Scraping-tickertapeIN-main/Scraped Data/full-company-list.json"
+
+# (query, a word the top hit has to contain)
+QUERIES = [
+    ("hdfc bnk", "hdfc bank"),
+    ("tcs", "tata consultancy"),
+    ("sbi", "state bank"),
+    ("infy", "infosys"),
+    ("relaince", "reliance"),
+    ("tata moters", "tata motors"),
+    ("hindustan unilvr", "hindustan unilever"),
+    ("icici bank", "icici bank"),
+    ("bajaj finance", "bajaj finance"),
+    ("asian paint", "asian paints"),
+]
+
+
+def entries():
+    df = pd.read_csv(BSE_COMPANIES)
+    bse = NameSearchIndex.bse_entries(dict(zip(df["Scrip_Code"], df["Company_Name"].astype(str))))
+    with open(TICKERTAPE_COMPANIES, "r") as readfile:
+        tickertape = NameSearchIndex.tickertape_entries(json.load(readfile))
+    return bse + tickertape
+
+
+def substring_scan(names, query):
+    query = query.lower()
+    return [name for name in names if query in name.lower()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    data = entries()
+    names = [entry["name"] for entry in data]
+
+    start_time = time.perf_counter()
+    index = NameSearchIndex(data)
+    build_time = time.perf_counter() - start_time
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "names.npz")
+        start_time = time.perf_counter()
+        index.save(path)
+        save_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        loaded = NameSearchIndex.load(path)
+        load_time = time.perf_counter() - start_time
+        size = os.path.getsize(path)
+
+    print("%d names | build %.0f ms | save %.0f ms | load %.0f ms | %d KB on disk" %
+          (len(index), build_time * 1000, save_time * 1000, load_time * 1000, size // 1024))
+
+    hits = 0
+    for query, expected in QUERIES:
+        results = index.search(query, k=5)
+        assert [entry for _, entry in results] == [entry for _, entry in loaded.search(query, k=5)]
+        top = results[0][1]["name"] if results else "-"
+        hit = expected in top.lower()
+        hits += hit
+        print("  %-18s -> %-40s %s | substring scan: %d matches" %
+              (query, top[:40], "ok" if hit else "MISS", len(substring_scan(names, query))))
+
+    # uncached: an empty cache for every query; cached: the same queries again
+    start_time = time.perf_counter()
+    for _ in range(args.repeat):
+        for query, _ in QUERIES:
+            index.cache.clear()
+            index.search(query)
+    uncached = (time.perf_counter() - start_time) / (args.repeat * len(QUERIES))
+
+    for query, _ in QUERIES:
+        index.search(query)
+    start_time = time.perf_counter()
+    for _ in range(args.repeat):
+        for query, _ in QUERIES:
+            index.search(query)
+    cached = (time.perf_counter() - start_time) / (args.repeat * len(QUERIES))
+
+    # a caller changing the entries it got back must not change later results
+    query = QUERIES[0][0]
+    before = index.search(query)
+    before[0][1]["name"] = "changed"
+    assert index.search(query) != before and index.search(query)[0][1]["name"] != "changed"
+
+    start_time = time.perf_counter()
+    for _ in range(max(1, args.repeat // 10)):
+        for query, _ in QUERIES:
+            substring_scan(names, query)
+    scan = (time.perf_counter() - start_time) / (max(1, args.repeat // 10) * len(QUERIES))
+
+    print("top-1 hits %d/%d | index %.1f us/query | cached %.1f us/query | substring scan %.1f us/query" %
+          (hits, len(QUERIES), uncached * 1e6, cached * 1e6, scan * 1e6))
+
+
+if __name__ == "__main__":
+    main()
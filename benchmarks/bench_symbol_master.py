@@ -0,0 +1,83 @@
+# Symbol master build, incremental refresh, reopen and lookups in every direction,
+# against resolving a company by name matching for every request.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_symbol_master --lookups 100000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from marketdata.search_index import NameSearchIndex
+from marketdata.symbol_master import SymbolMaster, read_records
+
+from .bench_search_index import BSE_COMPANIES, TICKERTAPE_COMPANIES
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(BSE_COMPANIES)
+    scrip_codes = dict(zip(df["Scrip_Code"].astype(str), df["Company_Name"].astype(str)))
+    names_list = read_records(TICKERTAPE_COMPANIES)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "symbol_master.db")
+        symbols = SymbolMaster(path)
+        start_time = time.perf_counter()
+        symbols.add_tickertape(names_list)
+        symbols.add_bse(scrip_codes)
+        build_time = time.perf_counter() - start_time
+
+        # the daily refresh: nothing changed but a handful of new listings
+        fresh = {str(900000 + i): name for i, name in enumerate(["NEWCO %d INDUSTRIES LTD." % i for i in range(20)])}
+        start_time = time.perf_counter()
+        symbols.add_tickertape(names_list)
+        symbols.add_bse({**scrip_codes, **fresh})
+        refresh_time = time.perf_counter() - start_time
+        stats = symbols.stats()
+        symbols.close()
+
+        start_time = time.perf_counter()
+        symbols = SymbolMaster(path)
+        open_time = time.perf_counter() - start_time
+
+        print("%d symbols | %d joined (%d fuzzy) | %d BSE only | %d tickertape only" %
+              (stats["symbols"], stats["joined"], stats["joined_fuzzy"], stats["bse_only"], stats["tickertape_only"]))
+        print("build %.0f ms | refresh %.0f ms | reopen %.0f ms | %d KB on disk" %
+              (build_time * 1000, refresh_time * 1000, open_time * 1000, os.path.getsize(path) // 1024))
+
+        joined = [symbol for symbol in symbols.symbols.values() if symbol["scrip_code"] and symbol["slug"]]
+        rng = random.Random(3)
+        picks = [rng.choice(joined) for _ in range(args.lookups)]
+        for label, key in [("scrip code", lambda symbol: symbol["scrip_code"]),
+                           ("slug", lambda symbol: symbol["slug"]),
+                           ("yahoo .BO", lambda symbol: symbol["scrip_code"] + ".BO"),
+                           ("tickertape id", lambda symbol: symbol["sid"])]:
+            keys = [key(symbol) for symbol in picks]
+            start_time = time.perf_counter()
+            for value in keys:
+                symbols.resolve(value)
+            lookup_time = (time.perf_counter() - start_time) / len(keys)
+            assert all(symbols.resolve(value)["id"] == symbol["id"] for value, symbol in zip(keys[:1000], picks[:1000]))
+            print("  resolve by %-13s %.2f us" % (label, lookup_time * 1e6))
+        symbols.close()
+
+    # what a cross-source job did before: match the BSE name against the tickertape names
+    index = NameSearchIndex(NameSearchIndex.tickertape_entries(names_list))
+    names = [symbol["bse_name"] for symbol in picks[:200]]
+    start_time = time.perf_counter()
+    for name in names:
+        index.cache.clear()
+        index.search(name, k=1)
+    print("  name matching      %.2f us" % ((time.perf_counter() - start_time) / len(names) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Polled quotes kept as ticks: save_data's pretty-printed JSON per quote vs the
+# tick store's fixed-width records in per-day segments. Measures append cost (one
+# tick at a time, as the poller hands them over, and in batches), bytes on disk per
+# tick, and a time-range scan through the memory map, which must not copy.
+#
+# run from the repository root:
+#   python -m benchmarks.bench_tick_store --ticks 1000000
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from marketdata.tick_store import TICK_DTYPE, TickStore
+
+
+def quote(scrip_code, price, volume, change):
+    """A bsedata getQuote result, trimmed to what a tick keeps plus the usual text fields"""
+    return {"companyName": "Company " + scrip_code, "scripCode": scrip_code, "currentValue": "{:,.2f}".format(price),
+            "change": "%.2f" % (price * change / 100), "pChange": "%.2f" % change,
+            "totalTradedQuantity": "%.2f Lakh" % (volume / 1e5), "updatedOn": "16 Oct 26 | 10:00 AM"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=1000000)
+    parser.add_argument("--scrips", type=int, default=3000)
+    parser.add_argument("--json-ticks", type=int, default=5000, help="ticks written the save_data way")
+    args = parser.parse_args()
+
+    random.seed(5)
+    rng = np.random.default_rng(5)
+    start_ms = int(time.mktime((2026, 10, 16, 9, 15, 0, 0, 0, -1)) * 1000)
+    records = np.zeros(args.ticks, dtype=TICK_DTYPE)
+    # a trading session and a half, so the ticks cross into a second day's segment
+    records["ts"] = start_ms + np.sort(rng.integers(0, 24 * 60 * 60 * 1000, args.ticks))
+    records["scrip"] = 500000 + rng.integers(0, args.scrips, args.ticks)
+    records["price"] = np.round(rng.uniform(10, 5000, args.ticks), 2)
+    records["volume"] = rng.integers(0, 10 ** 7, args.ticks)
+    records["change"] = np.round(rng.normal(0, 2, args.ticks), 2)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # save_data: one indented JSON file per quote
+        os.makedirs(os.path.join(scratch, "json"))
+        start_time = time.perf_counter()
+        json_bytes = 0
+        for i, tick in enumerate(records[:args.json_ticks]):
+            path = os.path.join(scratch, "json", "bsedata_%d_%d.json" % (tick["scrip"], i))
+            with open(path, "w") as f:
+                json.dump({"scrip_code": str(tick["scrip"]), "quote_data": quote(
+                    str(tick["scrip"]), tick["price"], tick["volume"], tick["change"])}, f, indent=2, default=str)
+            json_bytes += os.path.getsize(path)
+        json_seconds = (time.perf_counter() - start_time) / args.json_ticks
+        print("save_data JSON:   %7.1f us/tick  %6.0f bytes/tick" % (json_seconds * 1e6, json_bytes / args.json_ticks))
+
+        # the poller's path: one getQuote result at a time
+        store = TickStore(os.path.join(scratch, "single"))
+        count = min(args.ticks, 100000)
+        quotes = [quote(str(tick["scrip"]), tick["price"], tick["volume"], tick["change"]) for tick in records[:count]]
+        start_time = time.perf_counter()
+        for tick, q in zip(records[:count], quotes):
+            store.append_quote(q, ts=int(tick["ts"]))
+        single_seconds = (time.perf_counter() - start_time) / count
+        stored = store.read()
+        assert np.array_equal(stored["scrip"], records["scrip"][:count])
+        assert np.allclose(stored["price"], records["price"][:count])
+        # appending to the same day after close() reopens its segment, and keeps the time order check
+        store.close()
+        store.append(500000, 100.0, 10, 0.5, ts=int(records["ts"][count - 1]))
+        assert len(store.read()) == count + 1
+        try:
+            store.append(500000, 100.0, 10, 0.5, ts=int(records["ts"][0]) - 1)
+            raise AssertionError("a tick before the last one was appended")
+        except ValueError:
+            pass
+        store.close()
+        print("append_quote:     %7.1f us/tick  (%d ticks)" % (single_seconds * 1e6, count))
+
+        store = TickStore(os.path.join(scratch, "batch"))
+        start_time = time.perf_counter()
+        for batch in np.array_split(records, max(1, args.ticks // 2000)):
+            store.append_many(batch)
+        batch_seconds = (time.perf_counter() - start_time) / args.ticks
+        stats = store.stats()
+        assert stats["ticks"] == args.ticks and stats["segments"] == 2
+        print("append_many:      %7.2f us/tick  %6d bytes/tick  %.1f MB per million ticks" % (
+            batch_seconds * 1e6, stats["bytes"] // stats["ticks"], stats["bytes"] / args.ticks))
+
+        # an hour in the middle of the first day, through the memory map
+        low, high = start_ms + 2 * 60 * 60 * 1000, start_ms + 3 * 60 * 60 * 1000
+        start_time = time.perf_counter()
+        window = store.read(low, high)
+        vwap = float((window["price"] * window["volume"]).sum() / window["volume"].sum())
+        scan_seconds = time.perf_counter() - start_time
+        expected = records[(records["ts"] >= low) & (records["ts"] < high)]
+        assert np.array_equal(window, expected)
+        assert isinstance(window.base, np.memmap) or isinstance(window, np.memmap), "range scan copied the ticks"
+        print("1h range scan:    %7.2f ms for %d ticks (zero-copy), vwap %.2f" % (scan_seconds * 1000, len(window), vwap))
+
+        scrip = int(records["scrip"][0])
+        start_time = time.perf_counter()
+        history = store.read(scrip_code=scrip)
+        print("one scrip:        %7.2f ms for %d ticks" % ((time.perf_counter() - start_time) * 1000, len(history)))
+        assert np.array_equal(history, records[records["scrip"] == scrip])
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
-from bsedata.bse import BSE
 import pandas as pd
 import json
+import os
+import sys
 from datetime import datetime
-import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from marketdata.bse_cache import shared_bse
+from marketdata.search_index import NameSearchIndex
+from marketdata.batch_quotes import BatchQuotes
+from marketdata.quote_poller import QuotePoller
 
 class BSEDataExtractor:
     def __init__(self):
         """Initialize BSE data extractor using only bsedata library"""
         try:
-            self.bse = BSE()
+            # shared client: market-wide calls are cached and coalesced across scrips and
+            # callers, cache misses are paced by the shared rate limiter
+            self.bse = shared_bse()
+            self.search_index = None
             print("✓ BSE data library initialized successfully")
         except Exception as e:
             print(f"✗ Error initializing BSE library: {e}")
@@ -52,19 +61,16 @@ class BSEDataExtractor:
             print(f"Error getting category data: {e}")
             return None
     
-    def search_scrip(self, company_name):
-        """Search for scrip code by company name (limited functionality)"""
+    def search_scrip(self, company_name, k=10):
+        """Search for scrip codes by company name, best matches first (typos and abbreviations allowed)"""
         try:
-            # This is a basic implementation - bsedata doesn't have built-in search
-            scrip_codes = self.bse.getScripCodes()
-            if scrip_codes:
-                # Simple search in available data
-                matches = []
-                for code, name in scrip_codes.items():
-                    if company_name.lower() in name.lower():
-                        matches.append((code, name))
-                return matches
-            return None
+            # bsedata doesn't have built-in search, index the scrip list once
+            if self.search_index is None:
+                scrip_codes = self.bse.getScripCodes()
+                if not scrip_codes:
+                    return None
+                self.search_index = NameSearchIndex(NameSearchIndex.bse_entries(scrip_codes))
+            return [(entry["scrip_code"], entry["name"]) for score, entry in self.search_index.search(company_name, k=k)]
         except Exception as e:
             print(f"Error searching scrip: {e}")
             return None
@@ -92,8 +98,6 @@ class BSEDataExtractor:
         else:
             print("   ✗ Quote data failed")
         
-        time.sleep(0.5)
-        
         # 2. Get Market Data (for context)
         print("2. Fetching market data...")
         company_data['market_data']['top_gainers'] = self.get_top_gainers()
@@ -125,22 +129,39 @@ class BSEDataExtractor:
         except Exception as e:
             print(f"✗ Error saving JSON: {e}")
  
-    def batch_quotes(self, scrip_codes):
-        """Get quotes for multiple companies"""
+    def iter_quotes(self, scrip_codes, workers=8, timeout=10.0):
+        """Yield (scrip_code, quote, error) for each company as soon as its quote is in"""
+        # the workers share the BSE budget of the rate limiter, a scrip taking longer than
+        # `timeout` seconds (limiter waits included) is given up on instead of holding up the rest
+        return BatchQuotes(self.bse.getQuote, workers=workers, timeout=timeout).iter(scrip_codes)
+    
+    def watch_quotes(self, scrip_codes, interval=5.0, store=None, **options):
+        """Poller over a watchlist that reports only the quotes that changed, start() it to poll in the background;
+        with a TickStore as `store` every changed quote is appended to it as a tick"""
+        # unchanged scrips are polled less and less often, so requests follow the changes
+        # rather than the watchlist size; see QuotePoller for jitter, backoff and history
+        poller = QuotePoller(self.bse.getQuote, scrip_codes, interval=interval, **options)
+        if store is not None:
+            poller.subscribe(lambda event: store.append_quote(event["quote"]))
+        return poller
+    
+    def cache_stats(self):
+        """Hit and miss counts of the shared BSE client cache"""
+        return self.bse.stats()
+    
+    def batch_quotes(self, scrip_codes, workers=8, timeout=10.0):
+        """Get quotes for multiple companies concurrently"""
         results = {}
         
-        for scrip_code in scrip_codes:
-            print(f"\nFetching data for {scrip_code}...")
-            quote = self.get_quote(scrip_code)
+        for scrip_code, quote, error in self.iter_quotes(scrip_codes, workers=workers, timeout=timeout):
             if quote:
                 results[scrip_code] = quote
-                print(f"✓ Success: {quote.get('companyName', 'Unknown')}")
+                print(f"✓ {scrip_code}: {quote.get('companyName', 'Unknown')}")
             else:
-                print(f"✗ Failed to get data for {scrip_code}")
-            
-            time.sleep(0.5)  # Rate limiting
+                print(f"✗ Failed to get data for {scrip_code}: {error}")
         
-        return results
+        # in the order asked for
+        return {code: results[str(code)] for code in scrip_codes if str(code) in results}
 
 """Main function demonstrating bsedata library usage"""
 print("BSE Data Extractor - Pure bsedata Library")
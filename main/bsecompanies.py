@@ -4,6 +4,13 @@ import time
 import requests
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from marketdata.rate_limiter import shared_limiter
+from marketdata.search_index import NameSearchIndex
+from marketdata.symbol_master import SymbolMaster
+from marketdata.scrip_master import ScripMaster
 
 
 class BSECompaniesExtractor:
@@ -14,6 +21,9 @@ class BSECompaniesExtractor:
         Initialize the BSECompaniesExtractor class
         """
         self.bse = None         
+        self.search_index = None
+        self.search_key = None
+        self.scrip_master = None
 
     def fix_bsedata_library(self):
         """
@@ -31,51 +41,37 @@ class BSECompaniesExtractor:
             return False
 
 
-    def extract_all_company_names(self):
+    def get_scrip_master(self, path='data/scrip_master.db', max_age=24 * 60 * 60):
+        """
+        Open the persisted scrip master, downloaded again only once it is older than `max_age` seconds
+        """
+        if self.scrip_master is None:
+            self.scrip_master = ScripMaster(path, max_age=max_age, log=True)
+        return self.scrip_master
+
+    def extract_all_company_names(self, force_refresh=False):
         """
-        Extract all company names from BSE using bsedata library
+        Extract all company names from the BSE scrip master, refreshed with only the additions
+        and delistings since the last download when it is stale
         """
-        # First try to fix the library
-        if not self.fix_bsedata_library():
+        # a new company list gets a new search index
+        self.search_key = None
+        master = self.get_scrip_master()
+        try:
+            if master.refresh(force=force_refresh) is None:
+                print(f"Scrip master v{master.version} is fresh, no download needed")
+        except Exception as e:
+            print(f"Failed to refresh the scrip master: {str(e)}")
+        
+        company_list = master.scrip_codes()
+        if not company_list:
+            print("No companies found or API error")
             print("Trying alternative approach...")
             return self.extract_companies_web_scraping()
         
-        # Initialize BSE object
-        b = BSE()
-        
-        try:
-            # Get list of all companies
-            print("Fetching company list from BSE...")
-            company_list = b.getScripCodes()
-            
-            if not company_list:
-                print("No companies found or API error")
-                return self.extract_companies_web_scraping()
-            
-            # Extract company names and codes
-            companies_data = []
-            
-            print(f"Found {len(company_list)} companies. Processing...")
-            
-            for i, (scrip_code, company_name) in enumerate(company_list.items()):
-                companies_data.append({
-                    'Scrip_Code': scrip_code,
-                    'Company_Name': company_name
-                })
-                
-                # Progress indicator
-                if (i + 1) % 100 == 0:
-                    print(f"Processed {i + 1} companies...")
-            
-            # Create DataFrame
-            df = pd.DataFrame(companies_data)
-            
-            print(f"\nSuccessfully extracted {len(df)} company names!")
-            return df
-            
-        except Exception as e:
-            print(f"Error occurred: {str(e)}")
-            return None
+        df = pd.DataFrame({'Scrip_Code': list(company_list.keys()), 'Company_Name': list(company_list.values())})
+        print(f"\nSuccessfully extracted {len(df)} company names!")
+        return df
         
     def save_to_file(self,df, filename='data/bse_companies.csv'):
         """
@@ -87,6 +83,18 @@ class BSECompaniesExtractor:
         except Exception as e:
             print(f"Error saving file: {str(e)}")
 
+    def update_symbol_master(self, df, path='data/symbol_master.db'):
+        """
+        Add the extracted companies to the symbol master, joined to tickertape and Yahoo tickers
+        """
+        try:
+            symbols = SymbolMaster(path)
+            changed = symbols.add_bse(dict(zip(df['Scrip_Code'].astype(str), df['Company_Name'].astype(str))))
+            print(f"Symbol master updated: {changed} companies added or changed, {len(symbols)} symbols")
+            symbols.close()
+        except Exception as e:
+            print(f"Error updating symbol master: {str(e)}")
+
     def display_sample_data(self,df, n=10):
         """
         Display sample company data
@@ -96,15 +104,25 @@ class BSECompaniesExtractor:
         print(df.head(n).to_string(index=False))
         print(f"\nTotal companies: {len(df)}")
 
-    def search_company(self,df, search_term):
+    def search_company(self,df, search_term, k=10, reindex=False):
         """
-        Search for companies containing specific term
+        Search for companies matching a term, best matches first (typos and abbreviations allowed);
+        pass reindex=True after editing the names of the same DataFrame in place
         """
         if df is None:
             print("No data available")
             return
         
-        matches = df[df['Company_Name'].str.contains(search_term, case=False, na=False)]
+        # index the company names once per DataFrame (and its length, for rows added in place)
+        search_key = (id(df), len(df))
+        if reindex or self.search_key != search_key:
+            entries = [{'name': str(name), 'scrip_code': str(code), 'source': 'bse', 'row': i}
+                       for i, (code, name) in enumerate(zip(df['Scrip_Code'], df['Company_Name']))]
+            self.search_index = NameSearchIndex(entries)
+            self.search_key = search_key
+        
+        rows = [entry['row'] for score, entry in self.search_index.search(search_term, k=k)]
+        matches = df.iloc[rows]
         
         if len(matches) > 0:
             print(f"\nFound {len(matches)} companies matching '{search_term}':")
@@ -129,7 +147,7 @@ class BSECompaniesExtractor:
                 'Referer': 'https://www.bseindia.com/'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = shared_limiter().request(url, lambda: requests.get(url, headers=headers, timeout=30))
             
             if response.status_code == 200:
                 data = response.json()
@@ -202,3 +220,6 @@ if companies_df is not None:
     # Save to CSV file
     bse_extractor.save_to_file(companies_df)
     
+    # Join the scrip codes to the other sources
+    bse_extractor.update_symbol_master(companies_df)
+    
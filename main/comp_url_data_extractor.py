@@ -1,17 +1,37 @@
-from bsedata.bse import BSE
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
+import asyncio
 import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from marketdata.rate_limiter import shared_limiter
+from marketdata.bse_cache import shared_bse
+
 class BSECompanyDataExtractor:
-    def __init__(self,scrip_code=None):
+    API_BASE = "https://api.bseindia.com/BseIndiaAPI/api"
+
+    # the parts of a company document, one source each
+    PARTS = ['basic_quote', 'detailed_quote', 'financials']
+
+    def __init__(self,scrip_code=None, api_base=None, pool_size=32):
         """Initialize BSE data extractor"""
         self.scrip_code = scrip_code
+        self.api_base = api_base or self.API_BASE
+        self.limiter = shared_limiter()
+
+        # keep-alive connections shared by every request, also across worker threads
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
 
         try:
-            self.bse = BSE()
+            self.bse = shared_bse()
             self.bse_available = True
         except:
             self.bse_available = False
@@ -25,25 +45,26 @@ class BSECompanyDataExtractor:
             'Connection': 'keep-alive'
         }
     
-    def get_basic_quote(self):
+    def get_basic_quote(self, scrip_code=None):
         """Get basic quote data using bsedata library"""
         if not self.bse_available:
             return None
         
         try:
-            quote = self.bse.getQuote(self.scrip_code)
+            quote = self.bse.getQuote(scrip_code or self.scrip_code)
             return quote
         except Exception as e:
             print(f"Error getting quote via bsedata: {e}")
             return None
 
-    def get_detailed_quote(self):
+    def get_detailed_quote(self, scrip_code=None):
         """Get detailed quote information"""
         try:
-            url = f"https://api.bseindia.com/BseIndiaAPI/api/ComHeader/w"
-            params = {'quotetype': 'EQ', 'scripcode': self.scrip_code}
+            url = f"{self.api_base}/ComHeader/w"
+            params = {'quotetype': 'EQ', 'scripcode': scrip_code or self.scrip_code}
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            # paced per host and retried with backoff on 429/503
+            response = self.limiter.request(url, lambda: self.session.get(url, params=params, headers=self.headers, timeout=10))
             
             if response.status_code == 200:
                 return response.json()
@@ -54,13 +75,13 @@ class BSECompanyDataExtractor:
             print(f"Error getting detailed quote: {e}")
             return None
     
-    def get_company_financials(self ):
+    def get_company_financials(self, scrip_code=None):
         """Get company financial data"""
         try:
-            url = "https://api.bseindia.com/BseIndiaAPI/api/AnnualReport/w"
-            params = {'scripcode': self.scrip_code}
+            url = f"{self.api_base}/AnnualReport/w"
+            params = {'scripcode': scrip_code or self.scrip_code}
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            response = self.limiter.request(url, lambda: self.session.get(url, params=params, headers=self.headers, timeout=10))
             
             if response.status_code == 200:
                 return response.json()
@@ -71,61 +92,82 @@ class BSECompanyDataExtractor:
             print(f"Error getting financials: {e}")
             return None
 
-    def get_all_company_data(self):
-        """Get comprehensive company data"""
-        print(f"Fetching comprehensive data for scrip code: {self.scrip_code}")
+    @staticmethod
+    def run_sync(coroutine):
+        """Run a coroutine to completion from synchronous code, also when the caller has an event loop running"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # asyncio.run can't nest in a running loop (Jupyter, async callers), run it on a thread of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    def get_all_company_data(self, scrip_code=None):
+        """Get comprehensive company data, its three sources fetched at the same time"""
+        scrip_code = scrip_code or self.scrip_code
+        print(f"Fetching comprehensive data for scrip code: {scrip_code}")
         print("=" * 60)
         
+        company_data = self.run_sync(self.get_company_data_async(scrip_code))
+        
+        for i, (part, label) in enumerate(zip(self.PARTS, ['Basic quote', 'Detailed quote', 'Financial data'])):
+            if company_data[part]:
+                print(f"{i + 1}. ✓ {label} retrieved")
+            else:
+                print(f"{i + 1}. ✗ {label} failed")
+        
+        return company_data
+    
+    async def get_company_data_async(self, scrip_code, executor=None):
+        """Company document of one scrip, the quote, ComHeader and AnnualReport requests in parallel"""
+        loop = asyncio.get_running_loop()
         company_data = {
-            'scrip_code': self.scrip_code,
+            'scrip_code': scrip_code,
             'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'basic_quote': None,
-            'detailed_quote': None,
-            'financials': None,
         }
-        
-        # 1. Basic Quote (using bsedata if available)
-        print("1. Fetching basic quote...")
-        company_data['basic_quote'] = self.get_basic_quote()
-        if company_data['basic_quote']:
-            print("   ✓ Basic quote retrieved")
-        else:
-            print("   ✗ Basic quote failed")
-
+        fetchers = [self.get_basic_quote, self.get_detailed_quote, self.get_company_financials]
+        # the requests block, so they run on worker threads; the limiter paces them per host
+        parts = await asyncio.gather(*[loop.run_in_executor(executor, fetch, scrip_code) for fetch in fetchers])
+        company_data.update(zip(self.PARTS, parts))
+        return company_data
     
-        time.sleep(0.5)  # Rate limiting
-        
-        # 2. Detailed Quote
-        print("2. Fetching detailed quote...")
-        company_data['detailed_quote'] = self.get_detailed_quote()
-        if company_data['detailed_quote']:
-            print("   ✓ Detailed quote retrieved")
-        else:
-            print("   ✗ Detailed quote failed")
-        
-        time.sleep(0.5)
-        
-        
-        # 3. Company Financials
-        print("3. Fetching financial data...")
-        company_data['financials'] = self.get_company_financials()
-        if company_data['financials']:
-            print("   ✓ Financial data retrieved")
-        else:
-            print("   ✗ Financial data failed")
+    async def extract_companies_async(self, scrip_codes, concurrency=8, sink=None):
+        """Company documents of many scrips, `concurrency` scrips in flight under the shared rate limiter;
+        with a `sink` each document is passed to it as soon as it is complete instead of being collected"""
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency) * len(self.PARTS))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        all_companies_data = {}
         
-        time.sleep(0.5)
+        async def extract(scrip_code):
+            async with semaphore:
+                company_data = await self.get_company_data_async(scrip_code, executor)
+            retrieved = sum(1 for part in self.PARTS if company_data[part])
+            print(f"{'✓' if retrieved == len(self.PARTS) else '✗'} {scrip_code}: {retrieved}/{len(self.PARTS)} parts retrieved")
+            if sink is not None:
+                sink(company_data)
+            else:
+                all_companies_data[scrip_code] = company_data
         
-        return company_data
+        try:
+            await asyncio.gather(*[extract(scrip_code) for scrip_code in scrip_codes])
+        finally:
+            # on Ctrl-C don't work through the rest of the queued requests
+            executor.shutdown(wait=True, cancel_futures=True)
+        return all_companies_data
+    
+    def extract_companies(self, scrip_codes, concurrency=8, sink=None):
+        """Company documents of many scrips, see extract_companies_async"""
+        return self.run_sync(self.extract_companies_async(scrip_codes, concurrency=concurrency, sink=sink))
     
     def save_to_files(self, company_data, prefix=None):
         """Save company data to various files"""
         scrip_code = company_data['scrip_code']
         company_name = company_data['company_name'] if 'company_name' in company_data else 'company_data'
         if prefix:
-            filename_base = f"data/{prefix}_{self.scrip_code}"
+            filename_base = f"data/{prefix}_{scrip_code}"
         else:
-            filename_base = f"data/{company_name}_url_{self.scrip_code}"
+            filename_base = f"data/{company_name}_url_{scrip_code}"
         
         # Save complete data as JSON
         json_filename = f"{filename_base}_complete.json"
@@ -138,20 +180,10 @@ class BSECompanyDataExtractor:
 
 
 # Example usage for multiple companies
-def batch_extract_companies(scrip_codes):
-    """Extract data for multiple companies"""
+def batch_extract_companies(scrip_codes, concurrency=8, sink=None):
+    """Extract data for multiple companies, `concurrency` at a time"""
     extractor = BSECompanyDataExtractor()
-    all_companies_data = {}
-    
-    for scrip_code in scrip_codes:
-        print(f"\nProcessing {scrip_code}...")
-        company_data = extractor.get_all_company_data(scrip_code)
-        all_companies_data[scrip_code] = company_data
-        
-        # Small delay between requests
-        time.sleep(2)
-    
-    return all_companies_data
+    return extractor.extract_companies(scrip_codes, concurrency=concurrency, sink=sink)
 
 
 # This code uses the BSE URL directly, which is not recommended due to potential issues with scraping and rate limiting.
@@ -0,0 +1 @@
+"""Shared market data infrastructure for the BSE and tickertape scripts"""
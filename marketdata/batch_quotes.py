@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+
+
+class QuoteTimeout(Exception):
+    """A quote took longer than the per-scrip timeout"""
+
+
+class BatchQuotes:
+    """Fetch many quotes on a bounded set of worker threads and hand them out as they complete"""
+
+    def __init__(self, fetch, workers=8, timeout=10.0, max_abandoned=None):
+        """`fetch(scrip_code)` returns a quote or raises (pace it with the shared rate limiter);
+        a scrip that takes longer than `timeout` seconds is reported as timed out and its worker
+        replaced, so one hanging request doesn't hold up the batch. The given-up thread runs on
+        until its request returns; at most `max_abandoned` of them (default `workers`) are
+        replaced, past that a worker is only replaced once one of them is back, so a batch never
+        has more than workers + max_abandoned threads (a batch whose threads are all stuck waits
+        for one to come back)"""
+        self.fetch = fetch
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_abandoned = self.workers if max_abandoned is None else max(0, max_abandoned)
+
+    def _worker(self, tasks, results, abandoned):
+        """Take scrip codes until the stop marker, quit after a scrip that was given up on"""
+        while True:
+            scrip_code = tasks.get()
+            if scrip_code is None:
+                return
+            results.put(("started", scrip_code, time.monotonic()))
+            try:
+                quote, error = self.fetch(scrip_code), None
+            except Exception as e:
+                quote, error = None, e
+            if scrip_code in abandoned:
+                # given up on: a replacement worker took (or will take) over this one's place
+                results.put(("released", scrip_code, None))
+                return
+            results.put(("done", scrip_code, (quote, error)))
+
+    def _start_worker(self, tasks, results, abandoned):
+        thread = threading.Thread(target=self._worker, args=(tasks, results, abandoned), daemon=True)
+        thread.start()
+        return thread
+
+    def iter(self, scrip_codes):
+        """Yield (scrip_code, quote, error) in completion order; quote is None when error is set"""
+        scrip_codes = list(dict.fromkeys(str(code) for code in scrip_codes))
+        tasks = queue.Queue()
+        results = queue.Queue()
+        abandoned = set()
+        for scrip_code in scrip_codes:
+            tasks.put(scrip_code)
+        threads = [self._start_worker(tasks, results, abandoned) for _ in range(min(self.workers, len(scrip_codes)))]
+
+        started = {}
+        remaining = len(scrip_codes)
+        # given-up threads still in their request, and the replacements owed to the pool for them
+        stuck = set()
+        owed = 0
+        try:
+            while remaining:
+                # wait until the next result or the earliest running scrip's deadline
+                wait = None
+                if started and self.timeout is not None:
+                    wait = max(0.0, min(started.values()) + self.timeout - time.monotonic())
+                try:
+                    kind, scrip_code, value = results.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    for scrip_code, started_at in list(started.items()):
+                        if now - started_at >= self.timeout:
+                            del started[scrip_code]
+                            abandoned.add(scrip_code)
+                            stuck.add(scrip_code)
+                            if len(stuck) <= self.max_abandoned:
+                                threads.append(self._start_worker(tasks, results, abandoned))
+                            else:
+                                owed += 1
+                            remaining -= 1
+                            yield scrip_code, None, QuoteTimeout(f"no quote for {scrip_code} after {self.timeout}s")
+                    continue
+
+                if kind == "released":
+                    stuck.discard(scrip_code)
+                    if owed:
+                        threads.append(self._start_worker(tasks, results, abandoned))
+                        owed -= 1
+                elif kind == "started":
+                    started[scrip_code] = value
+                elif scrip_code in started:
+                    del started[scrip_code]
+                    remaining -= 1
+                    quote, error = value
+                    yield scrip_code, quote, error
+        finally:
+            # a consumer that stops early leaves the rest of the scrips unfetched
+            while True:
+                try:
+                    tasks.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in threads:
+                tasks.put(None)
+
+    def all(self, scrip_codes):
+        """{scrip_code: quote} of every scrip that came back, plus {scrip_code: error} of the rest"""
+        quotes, errors = {}, {}
+        for scrip_code, quote, error in self.iter(scrip_codes):
+            if error is None and quote:
+                quotes[scrip_code] = quote
+            else:
+                errors[scrip_code] = error
+        return quotes, errors
@@ -0,0 +1,126 @@
+import copy
+import threading
+import time
+from concurrent.futures import Future
+
+from .rate_limiter import BSE_MOBILE_HOST, shared_limiter
+
+
+class CachedBSE:
+    """bsedata BSE client with a TTL cache per endpoint and one request in flight per key"""
+
+    # seconds a result stays fresh; market-wide lists are the same for every scrip
+    TTLS = {
+        "getQuote": 5.0,
+        "topGainers": 60.0,
+        "topLosers": 60.0,
+        "getIndices": 30.0,
+        "getScripCodes": 24 * 60 * 60.0,
+        "verifyScripCode": 24 * 60 * 60.0,
+    }
+
+    def __init__(self, client, ttls=None, limiter=None, host=BSE_MOBILE_HOST, ignore=(), max_entries=10000):
+        """Wrap `client` (a bsedata.bse.BSE); cache misses go through `limiter` for `host` when given,
+        `ignore` are the exceptions that don't count as the host pushing back (e.g. InvalidStockException)"""
+        self.client = client
+        self.ttls = dict(self.TTLS, **(ttls or {}))
+        self.limiter = limiter
+        self.host = host
+        self.ignore = ignore
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.in_flight = {}
+        self.counters = {endpoint: {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0} for endpoint in self.ttls}
+
+    def __getattr__(self, name):
+        """Cached endpoints are looked up here, everything else goes to the client as is"""
+        if name in ("client", "ttls"):
+            raise AttributeError(name)
+        if name in self.ttls:
+            return lambda *args: self.call(name, *args)
+        return getattr(self.client, name)
+
+    def _fetch(self, endpoint, args):
+        """One call to the client, paced by the limiter"""
+        function = getattr(self.client, endpoint)
+        if self.limiter is None:
+            return function(*args)
+        return self.limiter.call(self.host, function, args, ignore=self.ignore)
+
+    def call(self, endpoint, *args):
+        """Result of `client.endpoint(*args)`: from the cache while fresh, else fetched once for all
+        concurrent callers of the same key; errors are raised to every waiting caller and not cached"""
+        key = (endpoint,) + args
+        counters = self.counters[endpoint]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                counters["hits"] += 1
+                return copy.deepcopy(entry[1])
+            future = self.in_flight.get(key)
+            if future is not None:
+                counters["coalesced"] += 1
+                leader = False
+            else:
+                counters["misses"] += 1
+                future = self.in_flight[key] = Future()
+                leader = True
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            value = self._fetch(endpoint, args)
+        except BaseException as e:
+            with self.lock:
+                counters["errors"] += 1
+                del self.in_flight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self._evict()
+            self.entries[key] = (time.monotonic() + self.ttls[endpoint], value)
+            del self.in_flight[key]
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def _evict(self):
+        """Drop expired entries, or the oldest half when none has expired (call with the lock held)"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]
+        if not expired:
+            expired = sorted(self.entries, key=lambda key: self.entries[key][0])[:len(self.entries) // 2]
+        for key in expired:
+            del self.entries[key]
+
+    def invalidate(self, endpoint=None):
+        """Forget the cached results of one endpoint, or all of them"""
+        with self.lock:
+            for key in [key for key in self.entries if endpoint is None or key[0] == endpoint]:
+                del self.entries[key]
+
+    def stats(self):
+        """Hits, misses, coalesced waits and errors per endpoint, plus the hit ratio over all calls"""
+        with self.lock:
+            stats = {endpoint: dict(counters) for endpoint, counters in self.counters.items() if any(counters.values())}
+            entries = len(self.entries)
+        calls = sum(counters["hits"] + counters["misses"] + counters["coalesced"] for counters in stats.values())
+        served = sum(counters["hits"] + counters["coalesced"] for counters in stats.values())
+        return {"endpoints": stats, "entries": entries, "hitRatio": round(served / calls, 3) if calls else None}
+
+
+shared_bse_lock = threading.Lock()
+shared_bse_instance = None
+
+
+def shared_bse():
+    """The process-wide cached BSE client, paced by the shared rate limiter"""
+    global shared_bse_instance
+    with shared_bse_lock:
+        if shared_bse_instance is None:
+            from bsedata.bse import BSE
+            from bsedata.exceptions import InvalidStockException
+            shared_bse_instance = CachedBSE(BSE(), limiter=shared_limiter(), ignore=(InvalidStockException,))
+        return shared_bse_instance
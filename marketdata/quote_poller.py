@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import random
+import threading
+import time
+from collections import deque
+
+from .batch_quotes import BatchQuotes
+
+
+class QuotePoller:
+    """Poll the quotes of a watchlist on a jittered schedule and pass on only the ones that changed"""
+
+    # the quote fields a change is looked for in (bsedata getQuote keys)
+    FIELDS = ("currentValue", "totalTradedQuantity", "pChange")
+
+    def __init__(self, fetch, scrip_codes=(), interval=5.0, jitter=0.1, max_interval=None, fields=FIELDS,
+                 history=50, workers=8, timeout=10.0):
+        """`fetch(scrip_code)` returns a quote dict or raises (e.g. the shared bse client's getQuote);
+        each scrip is polled every `interval` seconds give or take a `jitter` share of it, backing off
+        up to `max_interval` (default 8x interval) while its quote stays the same; the last `history`
+        changed quotes per scrip are kept"""
+        self.interval = interval
+        self.jitter = jitter
+        self.max_interval = max_interval or interval * 8
+        self.fields = tuple(fields)
+        self.history = history
+        self.batch = BatchQuotes(fetch, workers=workers, timeout=timeout)
+        self.lock = threading.Lock()
+        self.random = random.Random()
+        # heap of (due, scrip_code); an entry only counts while it matches self.due
+        self.schedule = []
+        self.due = {}
+        self.intervals = {}
+        self.last = {}
+        self.recent = {}
+        self.callbacks = []
+        self.counters = {"rounds": 0, "requests": 0, "changes": 0, "unchanged": 0, "errors": 0}
+        self.stopped = threading.Event()
+        self.thread = None
+        self.watch(scrip_codes)
+
+    def _jittered(self, interval):
+        return interval * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+    def _schedule(self, scrip_code, due):
+        """Set when a scrip is polled next (call with the lock held)"""
+        self.due[scrip_code] = due
+        heapq.heappush(self.schedule, (due, scrip_code))
+
+    def watch(self, scrip_codes):
+        """Add scrips to the watchlist, their first polls spread over one interval"""
+        now = time.monotonic()
+        with self.lock:
+            for scrip_code in map(str, scrip_codes):
+                if scrip_code not in self.due:
+                    self.intervals[scrip_code] = self.interval
+                    self.recent[scrip_code] = deque(maxlen=self.history)
+                    self._schedule(scrip_code, now + self.random.uniform(0, self.interval))
+
+    def unwatch(self, scrip_codes):
+        """Drop scrips from the watchlist along with their recent quotes"""
+        with self.lock:
+            for scrip_code in map(str, scrip_codes):
+                for state in (self.due, self.intervals, self.last, self.recent):
+                    state.pop(scrip_code, None)
+
+    def watchlist(self):
+        with self.lock:
+            return list(self.due)
+
+    def subscribe(self, callback):
+        """Call `callback(event)` for every change, on the polling thread"""
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+    def next_due_in(self):
+        """Seconds until the next scrip is due, None with an empty watchlist"""
+        with self.lock:
+            while self.schedule and self.due.get(self.schedule[0][1]) != self.schedule[0][0]:
+                heapq.heappop(self.schedule)
+            if not self.schedule:
+                return None
+            return max(0.0, self.schedule[0][0] - time.monotonic())
+
+    def _update(self, scrip_code, quote, error, now):
+        """Record one poll result and reschedule the scrip, returns the change event or None (call with the lock held)"""
+        if scrip_code not in self.intervals:
+            # unwatched while its quote was in flight
+            return None
+        event = None
+        if error is not None or not quote:
+            self.counters["errors"] += 1
+        else:
+            values = tuple(quote.get(field) for field in self.fields)
+            previous = self.last.get(scrip_code)
+            if values == previous:
+                self.counters["unchanged"] += 1
+                self.intervals[scrip_code] = min(self.intervals[scrip_code] * 2, self.max_interval)
+            else:
+                self.counters["changes"] += 1
+                self.last[scrip_code] = values
+                self.recent[scrip_code].append((time.time(), quote))
+                self.intervals[scrip_code] = self.interval
+                event = {
+                    "scripCode": scrip_code,
+                    "at": time.time(),
+                    "changed": {
+                        field: (previous[i] if previous else None, value)
+                        for i, (field, value) in enumerate(zip(self.fields, values))
+                        if previous is None or previous[i] != value
+                    },
+                    "quote": quote,
+                }
+        self._schedule(scrip_code, now + self._jittered(self.intervals[scrip_code]))
+        return event
+
+    def poll_once(self):
+        """Fetch the scrips that are due, returns their change events (also passed to the subscribers)"""
+        # scrips due within the jitter window are taken along, so jitter spreads the
+        # requests without splitting them into a round per scrip
+        until = time.monotonic() + self.interval * self.jitter
+        due = []
+        with self.lock:
+            while self.schedule and self.schedule[0][0] <= until:
+                due_at, scrip_code = heapq.heappop(self.schedule)
+                if self.due.get(scrip_code) == due_at:
+                    # not scheduled again until its quote is in
+                    self.due[scrip_code] = None
+                    due.append(scrip_code)
+        if not due:
+            return []
+
+        events = []
+        for scrip_code, quote, error in self.batch.iter(due):
+            with self.lock:
+                event = self._update(scrip_code, quote, error, time.monotonic())
+            if event is not None:
+                events.append(event)
+        with self.lock:
+            self.counters["rounds"] += 1
+            self.counters["requests"] += len(due)
+            callbacks = list(self.callbacks)
+        for event in events:
+            for callback in callbacks:
+                callback(event)
+        return events
+
+    def _run(self):
+        while not self.stopped.is_set():
+            wait = self.next_due_in()
+            if self.stopped.wait(self.interval if wait is None else wait):
+                return
+            self.poll_once()
+
+    def start(self):
+        """Poll in the background until stop()"""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    async def events(self):
+        """Async iterator over the change events of the running poller"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        callback = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+        self.subscribe(callback)
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            self.unsubscribe(callback)
+
+    def quotes(self, scrip_code):
+        """Recent changed quotes of a scrip as (unix time, quote), oldest first"""
+        with self.lock:
+            return list(self.recent.get(str(scrip_code), ()))
+
+    def latest(self, scrip_code):
+        """Last quote seen for a scrip, None before its first poll"""
+        recent = self.quotes(scrip_code)
+        return recent[-1][1] if recent else None
+
+    def stats(self):
+        """Watchlist size and counters, plus the share of polls that found a change"""
+        with self.lock:
+            stats = dict(self.counters, watched=len(self.due))
+        polled = stats["changes"] + stats["unchanged"]
+        stats["changeRatio"] = round(stats["changes"] / polled, 3) if polled else None
+        return stats
@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+
+# hosts behind the fetchers of this project
+BSE_MOBILE_HOST = "m.bseindia.com"      # bsedata quotes, gainers, losers
+BSE_API_HOST = "api.bseindia.com"       # BseIndiaAPI json endpoints
+NSE_HOST = "www.nseindia.com"
+TICKERTAPE_HOST = "www.tickertape.in"
+
+
+class HostBucket:
+    """Token bucket of one host plus its current backoff state"""
+
+    def __init__(self, rate, burst):
+        """Start full at the configured rate"""
+        self.max_rate = rate
+        self.rate = rate
+        self.ceiling = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def refill(self, now):
+        """Add the tokens earned since the last update, never above the burst size"""
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+
+class RateLimiter:
+    """Per-host token buckets, slowed down on 429/503 and Retry-After, sped up again on success"""
+
+    THROTTLE_STATUSES = {429, 503}
+
+    def __init__(self, rate=5.0, burst=5, rates=None, min_rate=0.2, backoff=1.0, max_backoff=60.0, recovery=0.05,
+                 max_retries=4, log=False):
+        """rate / burst are requests per second / back-to-back requests per host, `rates` overrides them per host
+        as {host: rate} or {host: (rate, burst)}; a throttled host halves its rate (down to `min_rate`), waits
+        Retry-After or an exponential backoff from `backoff` seconds, and earns back `recovery` of its rate
+        per successful request"""
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.recovery = recovery
+        self.max_retries = max_retries
+        self.log = log
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    @staticmethod
+    def host(url):
+        """Host of a url, a bare host is returned as is"""
+        return (urlsplit(url).hostname or url) if "//" in url else url
+
+    def _bucket(self, host):
+        """Bucket of a host, created on first use (call with the lock held)"""
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate = self.rates.get(host, self.rate)
+            rate, burst = rate if isinstance(rate, tuple) else (rate, self.burst)
+            bucket = self.buckets[host] = HostBucket(rate, burst)
+        return bucket
+
+    def acquire(self, url):
+        """Wait for a request slot on the host of `url`, returns the seconds waited"""
+        with self.lock:
+            bucket = self._bucket(self.host(url))
+            now = time.monotonic()
+            bucket.refill(now)
+            # take the token now, a negative balance queues the caller behind the earlier ones;
+            # a host backing off earns nothing before the end of its backoff
+            bucket.tokens -= 1
+            wait = max(0.0, bucket.updated - now) + (-bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0)
+            bucket.requests += 1
+            bucket.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    @staticmethod
+    def retry_after(value):
+        """Seconds to wait from a Retry-After header (seconds or an HTTP date), None when absent or invalid"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def throttled(self, url, retry_after=None):
+        """The host pushed back: halve its rate and hold every request until the backoff is over"""
+        with self.lock:
+            bucket = self._bucket(self.host(url))
+            bucket.throttled += 1
+            now = time.monotonic()
+            if now < bucket.blocked_until and retry_after is None:
+                # the other requests that were in flight when the host pushed back, already handled
+                return bucket.blocked_until - now
+            delay = retry_after
+            if delay is None:
+                # exponential backoff with jitter so parallel callers don't come back together
+                delay = min(self.max_backoff, self.backoff * 2 ** bucket.strikes) * random.uniform(0.5, 1.0)
+            bucket.strikes += 1
+            # the rate that got throttled is where recovery slows down next time
+            bucket.ceiling = bucket.rate
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            # nothing is earned while blocked
+            bucket.tokens = min(bucket.tokens, 0.0)
+            bucket.updated = bucket.blocked_until
+            rate = bucket.rate
+        if self.log:
+            print(f"✗ {self.host(url)} throttled, backing off {delay:.1f}s at {rate:.2f} req/s")
+        return delay
+
+    def succeeded(self, url):
+        """A request went through: recover a step towards the configured rate, slowly past the last throttled one"""
+        with self.lock:
+            bucket = self._bucket(self.host(url))
+            bucket.strikes = 0
+            if bucket.rate < bucket.max_rate:
+                bucket.refill(time.monotonic())
+                step = self.recovery * bucket.max_rate
+                if bucket.rate + step > bucket.ceiling * 0.9:
+                    step /= 10
+                bucket.rate = min(bucket.max_rate, bucket.rate + step)
+
+    def update(self, url, response):
+        """Feed a response back, returns True when it was a throttle (429 / 503 or a Retry-After)"""
+        retry_after = self.retry_after(response.headers.get("Retry-After"))
+        if response.status_code in self.THROTTLE_STATUSES or (retry_after is not None and response.status_code >= 400):
+            self.throttled(url, retry_after)
+            return True
+        self.succeeded(url)
+        return False
+
+    def request(self, url, send):
+        """Rate limited call of `send()` (a requests call on `url`), retried while the host throttles"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(url)
+            response = send()
+            if not self.update(url, response) or attempt == self.max_retries:
+                return response
+
+    def call(self, url, function, args=(), ignore=()):
+        """Rate limited call of a library function that hides the HTTP status (e.g. bsedata); an exception
+        other than the `ignore` ones counts as the host pushing back and is raised again"""
+        self.acquire(url)
+        try:
+            result = function(*args)
+        except ignore:
+            self.succeeded(url)
+            raise
+        except Exception:
+            self.throttled(url)
+            raise
+        self.succeeded(url)
+        return result
+
+    def stats(self):
+        """Current rate and counters per host"""
+        with self.lock:
+            return {
+                host: {
+                    "rate": round(bucket.rate, 3),
+                    "requests": bucket.requests,
+                    "throttled": bucket.throttled,
+                    "waited": round(bucket.waited, 3)
+                }
+                for host, bucket in self.buckets.items()
+            }
+
+
+shared_limiter_lock = threading.Lock()
+shared_limiter_instance = None
+
+
+def shared_limiter():
+    """The process-wide limiter every fetcher goes through, so they all share each host's budget"""
+    global shared_limiter_instance
+    with shared_limiter_lock:
+        if shared_limiter_instance is None:
+            shared_limiter_instance = RateLimiter(rates={
+                BSE_MOBILE_HOST: (2.0, 2),
+                BSE_API_HOST: (2.0, 2),
+                NSE_HOST: (1.0, 1),
+                TICKERTAPE_HOST: (10.0, 10)
+            })
+        return shared_limiter_instance
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from .rate_limiter import shared_limiter
+
+
+# the listing bsedata's updateScripCodes() downloads, {scrip code: company name}
+SCRIP_LIST_URL = "https://pub-87b187a07d9c42109c9e6999439a583f.r2.dev/stk.json"
+
+
+def download_scrip_codes():
+    """Fresh {scrip code: company name} listing, paced by the shared rate limiter"""
+    response = shared_limiter().request(SCRIP_LIST_URL, lambda: requests.get(SCRIP_LIST_URL, timeout=30))
+    response.raise_for_status()
+    return {str(code): name for code, name in response.json().items()}
+
+
+class ScripMaster:
+    """Locally persisted BSE scrip list, refreshed by applying only what changed since the last download"""
+
+    COLUMNS = ["scrip_code", "name", "listed_at", "delisted_at", "updated_at"]
+
+    # a download listing fewer than this share of the known scrips is taken as broken, not as delistings
+    MIN_LIST_RATIO = 0.5
+
+    def __init__(self, path="data/scrip_master.db", max_age=24 * 60 * 60, fetch=download_scrip_codes, log=False):
+        """Open (or create) the scrip master; it counts as stale `max_age` seconds after its last refresh,
+        `fetch()` returns the current {scrip code: name} listing"""
+        self.path = path
+        self.max_age = max_age
+        self.fetch = fetch
+        self.log = log
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS scrips ("
+            "scrip_code TEXT PRIMARY KEY, name TEXT, listed_at REAL, delisted_at REAL, updated_at REAL)"
+        )
+        # what each version changed, so a consumer can catch up from the version it last saw
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS changes (version INTEGER, scrip_code TEXT, change TEXT, name TEXT, at REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS changes_version ON changes (version)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+        self.db.commit()
+        self.active = None
+
+    def _meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else default
+
+    @property
+    def version(self):
+        """Bumped by every refresh that changed something, 0 before the first one"""
+        with self.lock:
+            return int(self._meta("version", 0))
+
+    @property
+    def refreshed_at(self):
+        """Unix time of the last successful refresh, None before the first one"""
+        with self.lock:
+            return self._meta("refreshed_at")
+
+    def is_stale(self):
+        """True when the list was never downloaded or is older than max_age"""
+        refreshed_at = self.refreshed_at
+        return refreshed_at is None or time.time() - refreshed_at >= self.max_age
+
+    def scrip_codes(self):
+        """{scrip code: company name} of the listed scrips, read from disk once"""
+        with self.lock:
+            if self.active is None:
+                self.active = dict(self.db.execute("SELECT scrip_code, name FROM scrips WHERE delisted_at IS NULL ORDER BY rowid"))
+            return dict(self.active)
+
+    def __len__(self):
+        return len(self.scrip_codes())
+
+    def diff(self, listing):
+        """(added, renamed, delisted) of a downloaded {scrip code: name} listing against the stored one"""
+        active = self.scrip_codes()
+        added = {code: name for code, name in listing.items() if code not in active}
+        renamed = {code: name for code, name in listing.items() if code in active and active[code] != name}
+        delisted = {code: name for code, name in active.items() if code not in listing}
+        return added, renamed, delisted
+
+    def apply(self, listing):
+        """Write the difference to a downloaded listing as one new version, returns the change counts"""
+        listing = {str(code): str(name) for code, name in listing.items()}
+        active = self.scrip_codes()
+        if active and len(listing) < len(active) * self.MIN_LIST_RATIO:
+            raise ValueError(f"scrip list came back with {len(listing)} of {len(active)} scrips")
+        added, renamed, delisted = self.diff(listing)
+
+        now = time.time()
+        with self.lock:
+            version = int(self._meta("version", 0))
+            if added or renamed or delisted:
+                version += 1
+                # re-listed scrips come back with their listing date reset
+                self.db.executemany(
+                    "INSERT INTO scrips (scrip_code, name, listed_at, delisted_at, updated_at) VALUES (?, ?, ?, NULL, ?) "
+                    "ON CONFLICT (scrip_code) DO UPDATE SET name = excluded.name, listed_at = excluded.listed_at, "
+                    "delisted_at = NULL, updated_at = excluded.updated_at",
+                    [(code, name, now, now) for code, name in added.items()]
+                )
+                self.db.executemany("UPDATE scrips SET name = ?, updated_at = ? WHERE scrip_code = ?",
+                                    [(name, now, code) for code, name in renamed.items()])
+                self.db.executemany("UPDATE scrips SET delisted_at = ?, updated_at = ? WHERE scrip_code = ?",
+                                    [(now, now, code) for code in delisted])
+                self.db.executemany(
+                    "INSERT INTO changes (version, scrip_code, change, name, at) VALUES (?, ?, ?, ?, ?)",
+                    [(version, code, change, name, now) for change, changes in
+                     [("added", added), ("renamed", renamed), ("delisted", delisted)] for code, name in changes.items()]
+                )
+            self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                [("version", version), ("refreshed_at", now)])
+            self.db.commit()
+            self.active = None
+        counts = {"version": version, "added": len(added), "renamed": len(renamed), "delisted": len(delisted)}
+        if self.log:
+            print(f"✓ Scrip master v{version}: {counts['added']} added, {counts['renamed']} renamed, {counts['delisted']} delisted")
+        return counts
+
+    def refresh(self, force=False):
+        """Download the listing and apply it when stale (or forced), returns the change counts or None"""
+        if not force and not self.is_stale():
+            return None
+        return self.apply(self.fetch())
+
+    def changes(self, since_version=0):
+        """Changes after `since_version` as (version, scrip_code, change, name) tuples, oldest first"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT version, scrip_code, change, name FROM changes WHERE version > ? ORDER BY version, rowid", (since_version,)
+            ).fetchall()
+
+    def delisted(self):
+        """{scrip code: company name} of the scrips that dropped off the listing"""
+        with self.lock:
+            return dict(self.db.execute("SELECT scrip_code, name FROM scrips WHERE delisted_at IS NOT NULL"))
+
+    def close(self):
+        self.db.close()
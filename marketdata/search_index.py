@@ -0,0 +1,227 @@
+import json
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+
+STOP_WORDS = {"ltd", "limited", "the", "pvt", "private", "inc", "plc"}
+
+
+def normalize_name(name):
+    """Lowercase name tokens without punctuation and legal suffixes"""
+    name = name.lower().replace("&", " and ")
+    tokens = re.sub(r"[^a-z0-9]+", " ", name).split()
+    return [token for token in tokens if token not in STOP_WORDS] or tokens
+
+
+@lru_cache(maxsize=65536)
+def token_trigrams(token):
+    """Trigrams of a token padded at the start so prefixes weigh more"""
+    padded = "  " + token + " "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def is_abbreviation(short, word):
+    """True when `short` is `word` with letters dropped, e.g. bnk for bank"""
+    if len(short) < 2 or short[0] != word[0]:
+        return False
+    letters = iter(word)
+    return all(char in letters for char in short)
+
+
+def entry_keys(entry):
+    """Name tokens of an entry and every key it can be found by (tokens, aliases, initials)"""
+    tokens = normalize_name(entry["name"])
+    keys = list(tokens)
+    for alias in entry.get("aliases", []):
+        keys.extend(normalize_name(alias))
+    if len(tokens) >= 2:
+        # initials, so "tcs" finds Tata Consultancy Services
+        keys.append("".join(token[0] for token in tokens))
+    return tokens, keys
+
+
+@lru_cache(maxsize=65536)
+def token_similarity(query_token, doc_token):
+    """How well one query token matches one name token (0-1)"""
+    if query_token == doc_token:
+        return 1.0
+    if len(query_token) >= 2 and doc_token.startswith(query_token):
+        return 0.9
+    if is_abbreviation(query_token, doc_token):
+        return 0.75
+    query_grams = token_trigrams(query_token)
+    doc_grams = token_trigrams(doc_token)
+    return 0.7 * 2 * len(query_grams & doc_grams) / (len(query_grams) + len(doc_grams))
+
+
+class NameSearchIndex:
+    """Trigram index over company names with typo and abbreviation tolerant ranking"""
+
+    CANDIDATES = 24
+
+    def __init__(self, entries=None, cache_size=1024):
+        """Build the index over entries, dicts with a 'name' and optional 'aliases' (tickers etc.)"""
+        self.entries = []
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._build(list(entries or []))
+
+    @staticmethod
+    def bse_entries(scrip_codes):
+        """Entries for a {scrip code: company name} dict, as from bse.getScripCodes()"""
+        return [{"name": name, "scrip_code": str(code), "source": "bse"} for code, name in scrip_codes.items()]
+
+    @staticmethod
+    def tickertape_entries(company_list):
+        """Entries for the tickertape names list (name, type, subdirectory)"""
+        entries = []
+        for company in company_list:
+            ticker = company["subdirectory"].rsplit("-", 1)[-1]
+            entries.append({"name": company["name"], "ticker": ticker, "subdirectory": company["subdirectory"],
+                            "type": company["type"], "source": "tickertape", "aliases": [ticker]})
+        return entries
+
+    def _build(self, entries):
+        """(Re)build tokens and trigram postings for all entries"""
+        self.entries = entries
+        self.cache.clear()
+        self.tokens = []
+        postings = {}
+        sizes = []
+        for doc_id, entry in enumerate(entries):
+            tokens, keys = entry_keys(entry)
+            self.tokens.append((tokens, keys))
+
+            grams = set()
+            for key in keys:
+                grams |= token_trigrams(key)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc_id)
+            sizes.append(len(grams))
+
+        # postings in CSR form: the ids of trigram i are ids[offsets[i]:offsets[i + 1]]
+        self.grams = {gram: i for i, gram in enumerate(postings)}
+        lengths = [len(ids) for ids in postings.values()]
+        self.offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.ids = np.fromiter((doc_id for ids in postings.values() for doc_id in ids), dtype=np.int32, count=int(self.offsets[-1]))
+        self.sizes = np.array(sizes, dtype=np.float32)
+        self._index_keys()
+
+    def _index_keys(self):
+        """Sources per entry and the entries by exact key, for short queries like tickers and initials"""
+        self.sources = np.array([entry.get("source", "") for entry in self.entries])
+        self.exact = {}
+        for doc_id, (tokens, keys) in enumerate(self.tokens):
+            for key in set(keys):
+                self.exact.setdefault(key, []).append(doc_id)
+
+    def add(self, entries):
+        """Add entries and rebuild the postings"""
+        self._build(self.entries + list(entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _score(self, query_tokens, doc_id):
+        """Token level score of a candidate: query coverage and how much of the name is matched"""
+        tokens, keys = self.tokens[doc_id]
+        coverage = 0.0
+        for query_token in query_tokens:
+            best = 0.0
+            for key in keys:
+                similarity = token_similarity(query_token, key)
+                if similarity > best:
+                    best = similarity
+                    if best == 1.0:
+                        break
+            coverage += best
+        matched = 0
+        for token in tokens:
+            for query_token in query_tokens:
+                if token_similarity(query_token, token) >= 0.75:
+                    matched += 1
+                    break
+        return coverage / len(query_tokens), matched / len(tokens)
+
+    def search(self, query, k=10, source=None):
+        """Top k (score, entry) matches for a query, optionally from one source only ('bse' / 'tickertape');
+        the entries are copies, so changing them leaves the index and its cache alone"""
+        cache_key = (query, k, source)
+        if cache_key in self.cache:
+            self.cache.move_to_end(cache_key)
+            return [(score, dict(entry)) for score, entry in self.cache[cache_key]]
+
+        query_tokens = normalize_name(query)
+        grams = set()
+        for token in query_tokens:
+            grams |= token_trigrams(token)
+        rows = [self.grams[gram] for gram in grams if gram in self.grams]
+        if not rows or not self.entries:
+            return []
+
+        # count shared trigrams per name and rank by the dice coefficient
+        hits = np.bincount(np.concatenate([self.ids[self.offsets[row]:self.offsets[row + 1]] for row in rows]),
+                           minlength=len(self.entries)).astype(np.float32)
+        dice = 2 * hits / (len(grams) + self.sizes)
+        if source is not None:
+            dice[self.sources != source] = 0
+        count = min(self.CANDIDATES, len(dice))
+        candidates = np.argpartition(-dice, count - 1)[:count]
+        cutoff = dice[candidates].max() * 0.5
+
+        # names carrying a query token as a whole word, ticker or initials stay in the running
+        exact = set()
+        for token in query_tokens:
+            doc_ids = self.exact.get(token, [])
+            if len(doc_ids) <= self.CANDIDATES:
+                exact.update(doc_ids)
+        candidates = set(candidates.tolist()) | exact
+
+        # rerank the close candidates on whole tokens, which catches abbreviations like "bnk"
+        ranked = []
+        for doc_id in candidates:
+            if dice[doc_id] <= 0 or (dice[doc_id] < cutoff and doc_id not in exact):
+                continue
+            coverage, matched = self._score(query_tokens, doc_id)
+            score = 0.35 * float(dice[doc_id]) + 0.55 * coverage + 0.10 * matched
+            if self.entries[doc_id].get("ticker", "").lower() == "".join(query_tokens):
+                score += 0.1
+            ranked.append((round(score, 4), -len(self.entries[doc_id]["name"]), int(doc_id)))
+        ranked.sort(reverse=True)
+        results = [(score, self.entries[doc_id]) for score, _, doc_id in ranked[:k]]
+
+        self.cache[cache_key] = results
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return [(score, dict(entry)) for score, entry in results]
+
+    def save(self, path):
+        """Persist the index (entries and postings) to a .npz file"""
+        np.savez_compressed(
+            path,
+            entries=np.array(json.dumps(self.entries)),
+            grams=np.array(json.dumps(list(self.grams))),
+            offsets=self.offsets,
+            ids=self.ids,
+            sizes=self.sizes
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save() without rebuilding the postings"""
+        index = cls.__new__(cls)
+        index.cache_size = 1024
+        index.cache = OrderedDict()
+        with np.load(path, allow_pickle=False) as data:
+            index.entries = json.loads(str(data["entries"]))
+            index.grams = {gram: i for i, gram in enumerate(json.loads(str(data["grams"])))}
+            index.offsets = data["offsets"]
+            index.ids = data["ids"]
+            index.sizes = data["sizes"]
+        index.tokens = [entry_keys(entry) for entry in index.entries]
+        index._index_keys()
+        return index
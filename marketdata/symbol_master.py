@@ -0,0 +1,337 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .search_index import NameSearchIndex, normalize_name
+
+
+class SymbolMaster:
+    """One row per company joining its BSE scrip code, tickertape slug / id, NSE symbol and Yahoo tickers"""
+
+    # sid is tickertape's own id (the end of the slug, e.g. RELI), nse_symbol the exchange
+    # ticker shown on its stock page (RELIANCE), which is what Yahoo's .NS tickers use
+    COLUMNS = ["id", "name", "scrip_code", "bse_name", "slug", "sid", "nse_symbol", "type", "matched_by", "updated_at"]
+
+    # a fuzzy name join has to score this well and clearly beat the runner-up
+    MATCH_SCORE = 0.9
+    MATCH_MARGIN = 0.05
+
+    def __init__(self, path="data/symbol_master.db", log=False):
+        """Open (or create) the symbol master and load it into the lookup dicts"""
+        self.path = path
+        self.log = log
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS symbols ("
+            "id INTEGER PRIMARY KEY, name TEXT, scrip_code TEXT UNIQUE, bse_name TEXT, slug TEXT UNIQUE, sid TEXT, "
+            "nse_symbol TEXT, type TEXT, matched_by TEXT, updated_at REAL)"
+        )
+        self.db.commit()
+
+        self.symbols = {}
+        self.by_scrip_code = {}
+        self.by_slug_key = {}
+        self.by_sid_key = {}
+        self.by_nse_key = {}
+        for row in self.db.execute("SELECT * FROM symbols"):
+            self._index(dict(zip(self.COLUMNS, row)))
+        self.next_id = max(self.symbols, default=0) + 1
+
+    @staticmethod
+    def name_key(name):
+        """Join key of a company name: 'HDFC BANK LTD.' and 'HDFC Bank Ltd' both give 'hdfc bank'"""
+        return " ".join(normalize_name(name or ""))
+
+    @staticmethod
+    def yahoo_tickers(symbol):
+        """Yahoo Finance tickers of a symbol, NSE first"""
+        tickers = []
+        if symbol.get("nse_symbol"):
+            tickers.append(symbol["nse_symbol"] + ".NS")
+        if symbol.get("scrip_code"):
+            tickers.append(symbol["scrip_code"] + ".BO")
+        return tickers
+
+    def _index(self, symbol):
+        """Put a symbol in the lookup dicts"""
+        self.symbols[symbol["id"]] = symbol
+        if symbol["scrip_code"]:
+            self.by_scrip_code[symbol["scrip_code"]] = symbol
+        if symbol["slug"]:
+            self.by_slug_key[symbol["slug"].casefold()] = symbol
+        if symbol["sid"]:
+            self.by_sid_key[symbol["sid"].casefold()] = symbol
+        if symbol["nse_symbol"]:
+            self.by_nse_key[symbol["nse_symbol"].casefold()] = symbol
+
+    def _write(self, symbols):
+        """Persist new or changed symbols in one transaction"""
+        if not symbols:
+            return
+        now = time.time()
+        for symbol in symbols:
+            symbol["updated_at"] = now
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO symbols (" + ", ".join(self.COLUMNS) + ") VALUES (" + ", ".join("?" * len(self.COLUMNS)) + ")",
+                [tuple(symbol[column] for column in self.COLUMNS) for symbol in symbols]
+            )
+            self.db.commit()
+
+    def _new_symbol(self, **fields):
+        """An unsaved symbol with the next free id"""
+        symbol = dict.fromkeys(self.COLUMNS)
+        symbol["id"] = self.next_id
+        self.next_id += 1
+        symbol.update(fields)
+        self.symbols[symbol["id"]] = symbol
+        return symbol
+
+    def add_tickertape(self, names_list):
+        """Add or update symbols from the TickerNames list (name, type, subdirectory), returns how many changed"""
+        changed = []
+        for company in names_list:
+            slug = company["subdirectory"]
+            sid = slug.rsplit("-", 1)[-1]
+            symbol = self.by_slug_key.get(slug.casefold())
+            if symbol is None:
+                symbol = self._new_symbol(name=company["name"], slug=slug, sid=sid, type=company["type"])
+            elif (symbol["name"], symbol["sid"], symbol["type"]) == (company["name"], sid, company["type"]):
+                continue
+            else:
+                symbol.update(name=company["name"], sid=sid, type=company["type"])
+            self._index(symbol)
+            changed.append(symbol)
+        changed = self._merge_changed(changed, self._join(changed))
+        self._write(changed)
+        if self.log:
+            print(f"✓ Symbol master: {len(changed)} symbols added or updated from tickertape")
+        return len(changed)
+
+    def add_pages(self, records):
+        """Fill in NSE symbols from scraped stock / etf page records (ticker, url), returns how many changed"""
+        changed = []
+        for record in records:
+            if not record or not record.get("ticker") or not record.get("url"):
+                continue
+            symbol = self.by_slug_key.get(record["url"].rstrip("/").rsplit("/", 1)[-1].casefold())
+            if symbol is None or symbol["nse_symbol"] == record["ticker"]:
+                continue
+            symbol["nse_symbol"] = record["ticker"]
+            self._index(symbol)
+            changed.append(symbol)
+        self._write(changed)
+        if self.log:
+            print(f"✓ Symbol master: {len(changed)} NSE symbols added or updated from tickertape pages")
+        return len(changed)
+
+    def add_bse(self, scrip_codes):
+        """Add or update symbols from a {scrip code: company name} dict, as from bse.getScripCodes(), returns how many changed"""
+        changed = []
+        for scrip_code, name in scrip_codes.items():
+            scrip_code = str(scrip_code)
+            symbol = self.by_scrip_code.get(scrip_code)
+            if symbol is None:
+                symbol = self._new_symbol(name=name, scrip_code=scrip_code, bse_name=name)
+            elif symbol["bse_name"] == name:
+                continue
+            else:
+                symbol["bse_name"] = name
+            self._index(symbol)
+            changed.append(symbol)
+        changed = self._merge_changed(changed, self._join(changed))
+        self._write(changed)
+        if self.log:
+            print(f"✓ Symbol master: {len(changed)} symbols added or updated from BSE")
+        return len(changed)
+
+    def _join(self, changed):
+        """Merge BSE-only symbols into tickertape-only ones with the same company name, returns the merged symbols"""
+        bse_only = [symbol for symbol in self.symbols.values() if symbol["scrip_code"] and not symbol["slug"]]
+        tickertape_only = [symbol for symbol in self.symbols.values() if symbol["slug"] and not symbol["scrip_code"]]
+        # unless new tickertape symbols came in, only the BSE symbols just added can find a new match
+        if not any(symbol["slug"] and not symbol["scrip_code"] for symbol in changed):
+            changed_ids = {symbol["id"] for symbol in changed}
+            bse_only = [symbol for symbol in bse_only if symbol["id"] in changed_ids]
+        if not bse_only or not tickertape_only:
+            return []
+
+        # exact name keys first, a ticker spelled out as the BSE name next, then one fuzzy search per leftover
+        by_name = {}
+        for symbol in tickertape_only:
+            by_name.setdefault(self.name_key(symbol["name"]), []).append(symbol)
+        by_ticker = {}
+        for symbol in tickertape_only:
+            for ticker in {symbol["sid"], symbol["nse_symbol"]} - {None}:
+                by_ticker.setdefault(ticker.casefold(), []).append(symbol)
+
+        pairs = []
+        leftover = []
+        for symbol in bse_only:
+            key = self.name_key(symbol["bse_name"])
+            candidates = by_name.get(key) or by_ticker.get(key.replace(" ", ""), [])
+            if len(candidates) == 1:
+                pairs.append((symbol, candidates[0], "name"))
+            else:
+                leftover.append(symbol)
+
+        if leftover:
+            index = NameSearchIndex([{"name": symbol["name"], "aliases": [symbol["sid"]], "id": symbol["id"]}
+                                     for symbol in tickertape_only])
+            for symbol in leftover:
+                results = index.search(symbol["bse_name"], k=2)
+                if not results or results[0][0] < self.MATCH_SCORE:
+                    continue
+                if len(results) > 1 and results[0][0] - results[1][0] < self.MATCH_MARGIN:
+                    continue
+                pairs.append((symbol, self.symbols[results[0][1]["id"]], "fuzzy"))
+
+        # a tickertape symbol takes at most one scrip code
+        merged = []
+        removed = []
+        taken = set()
+        for bse_symbol, symbol, matched_by in pairs:
+            if symbol["id"] in taken:
+                continue
+            taken.add(symbol["id"])
+            symbol.update(scrip_code=bse_symbol["scrip_code"], bse_name=bse_symbol["bse_name"], matched_by=matched_by)
+            del self.symbols[bse_symbol["id"]]
+            self._index(symbol)
+            merged.append(symbol)
+            removed.append(bse_symbol["id"])
+
+        if removed:
+            with self.lock:
+                self.db.executemany("DELETE FROM symbols WHERE id = ?", [(symbol_id,) for symbol_id in removed])
+                self.db.commit()
+        return merged
+
+    def _merge_changed(self, changed, merged):
+        """Changed symbols after a join, without the BSE ones merged away"""
+        symbols = {symbol["id"]: symbol for symbol in changed + merged if symbol["id"] in self.symbols}
+        return list(symbols.values())
+
+    def link(self, scrip_code, slug):
+        """Join a scrip code to a tickertape slug by hand, for names too different to match"""
+        bse_symbol = self.by_scrip_code.get(str(scrip_code))
+        symbol = self.by_slug_key.get(slug.casefold())
+        if bse_symbol is None or symbol is None:
+            raise KeyError(f"unknown scrip code {scrip_code} or slug {slug}")
+        if bse_symbol is symbol:
+            return symbol
+        bse_name = bse_symbol["bse_name"]
+
+        # take the scrip code off its current symbol first, the scrip_code column is unique
+        if bse_symbol["slug"]:
+            bse_symbol.update(scrip_code=None, bse_name=None, matched_by=None)
+            self._write([bse_symbol])
+        else:
+            del self.symbols[bse_symbol["id"]]
+            with self.lock:
+                self.db.execute("DELETE FROM symbols WHERE id = ?", (bse_symbol["id"],))
+                self.db.commit()
+
+        # a scrip code the slug was joined to before goes back to being BSE only
+        previous = (symbol["scrip_code"], symbol["bse_name"])
+        symbol.update(scrip_code=str(scrip_code), bse_name=bse_name, matched_by="manual")
+        self._index(symbol)
+        self._write([symbol])
+        if previous[0]:
+            unlinked = self._new_symbol(name=previous[1], scrip_code=previous[0], bse_name=previous[1])
+            self._index(unlinked)
+            self._write([unlinked])
+        return symbol
+
+    def by_scrip(self, scrip_code):
+        """Symbol of a BSE scrip code, or None"""
+        return self.by_scrip_code.get(str(scrip_code))
+
+    def by_slug(self, slug):
+        """Symbol of a tickertape subdirectory (e.g. 'tata-consultancy-services-TCS'), or None"""
+        return self.by_slug_key.get(slug.casefold())
+
+    def by_ticker(self, ticker):
+        """Symbol of an NSE symbol (e.g. 'RELIANCE') or else a tickertape id (e.g. 'RELI'), or None"""
+        return self.by_nse_key.get(ticker.casefold()) or self.by_sid_key.get(ticker.casefold())
+
+    def by_yahoo(self, yahoo_ticker):
+        """Symbol of a Yahoo Finance ticker ('RELIANCE.NS', '500325.BO' or 'RELIANCE.BO'), or None"""
+        base, _, suffix = yahoo_ticker.rpartition(".")
+        if suffix.upper() == "BO" and base.isdigit():
+            return self.by_scrip(base)
+        if suffix.upper() in ("NS", "BO"):
+            return self.by_nse_key.get(base.casefold())
+        return None
+
+    def resolve(self, key):
+        """Symbol of any identifier: scrip code, Yahoo ticker, tickertape slug, NSE symbol or tickertape id"""
+        key = str(key).strip()
+        return self.by_scrip(key) or self.by_yahoo(key) or self.by_slug(key) or self.by_ticker(key)
+
+    def yahoo(self, key):
+        """Yahoo Finance ticker of any identifier, None when it isn't known"""
+        symbol = self.resolve(key)
+        tickers = self.yahoo_tickers(symbol) if symbol is not None else []
+        return tickers[0] if tickers else None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def stats(self):
+        """Counts of joined and single-source symbols"""
+        joined = [symbol for symbol in self.symbols.values() if symbol["scrip_code"] and symbol["slug"]]
+        return {
+            "symbols": len(self.symbols),
+            "joined": len(joined),
+            "joined_by_name": sum(1 for symbol in joined if symbol["matched_by"] == "name"),
+            "joined_fuzzy": sum(1 for symbol in joined if symbol["matched_by"] == "fuzzy"),
+            "bse_only": sum(1 for symbol in self.symbols.values() if symbol["scrip_code"] and not symbol["slug"]),
+            "tickertape_only": sum(1 for symbol in self.symbols.values() if symbol["slug"] and not symbol["scrip_code"])
+        }
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.db.close()
+
+
+def read_records(path):
+    """Records of a saved json or ndjson list / snapshot file"""
+    with open(path, "r") as readfile:
+        if path.endswith(".ndjson"):
+            return [json.loads(line) for line in readfile if line.strip()]
+        return json.load(readfile)
+
+
+def main():
+    """Build or refresh the symbol master from saved scraper output"""
+    parser = argparse.ArgumentParser(description="Build or refresh the symbol master from saved scraper output")
+    parser.add_argument("--db", default="data/symbol_master.db")
+    parser.add_argument("--bse", help="bse_companies.csv written by main/bsecompanies.py")
+    parser.add_argument("--tickertape", nargs="*", default=[], help="tickertape names lists (json / ndjson)")
+    parser.add_argument("--pages", nargs="*", default=[], help="tickertape stock / etf snapshots, for NSE symbols")
+    args = parser.parse_args()
+
+    symbols = SymbolMaster(args.db, log=True)
+    for path in args.tickertape:
+        symbols.add_tickertape(read_records(path))
+    if args.bse:
+        with open(args.bse, "r", newline="") as readfile:
+            symbols.add_bse({row["Scrip_Code"]: row["Company_Name"] for row in csv.DictReader(readfile)})
+    for path in args.pages:
+        symbols.add_pages(read_records(path))
+    print(symbols.stats())
+    symbols.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+# one tick, 32 bytes: unix time in ms, numeric BSE scrip code, last price, traded
+# quantity (shares), percent change; little endian and packed so a segment file
+# is nothing but records and maps straight onto a NumPy array
+TICK_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("scrip", "<u4"),
+    ("price", "<f8"),
+    ("volume", "<i8"),
+    ("change", "<f4"),
+])
+
+# the same record for struct, to write single ticks without building an array
+TICK_STRUCT = struct.Struct("<qIdqf")
+
+# multipliers of the units bsedata appends to its numbers
+UNITS = {"lakh": 1e5, "cr": 1e7, "cr.": 1e7, "crore": 1e7}
+
+
+def quote_number(value):
+    """Float of a bsedata quote field ("2,456.70", "1.23", "2.53 Lakh"), NaN when it has no number"""
+    if value is None:
+        return float("nan")
+    if isinstance(value, (int, float)):
+        return float(value)
+    parts = str(value).replace(",", "").split()
+    try:
+        number = float(parts[0])
+    except (IndexError, ValueError):
+        return float("nan")
+    return number * UNITS.get(parts[1].lower(), 1) if len(parts) > 1 else number
+
+
+class TickStore:
+    """Append-only store of quote ticks, one file of fixed-width records per day, read through memory maps"""
+
+    SEGMENT = re.compile(r"^ticks-(\d{8})\.bin$")
+
+    def __init__(self, dir_path="data/ticks"):
+        """Open (or create) the store in `dir_path`; a segment is named after the local date of its ticks"""
+        self.dir_path = dir_path
+        os.makedirs(dir_path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.day = None
+        # [start, end) in ms of the open segment's day
+        self.day_range = (0, 0)
+        self.file = None
+        self.last_ts = None
+        self.appended = 0
+
+    def segment_path(self, day):
+        return os.path.join(self.dir_path, f"ticks-{day}.bin")
+
+    @staticmethod
+    def day_of(ts):
+        """YYYYMMDD of a tick time in ms"""
+        return datetime.fromtimestamp(ts / 1000).strftime("%Y%m%d")
+
+    @staticmethod
+    def next_day_start(day):
+        """Time in ms of the local midnight that ends a day (YYYYMMDD)"""
+        date = datetime.strptime(day, "%Y%m%d")
+        return int(datetime.fromordinal(date.toordinal() + 1).timestamp() * 1000)
+
+    def days(self):
+        """Days that have a segment, oldest first"""
+        return sorted(match.group(1) for match in map(self.SEGMENT.match, os.listdir(self.dir_path)) if match)
+
+    def _writer(self, day):
+        """Append handle of a day's segment, switching segments at the day boundary (call with the lock held)"""
+        if day != self.day:
+            if self.file is not None:
+                self.file.close()
+            path = self.segment_path(day)
+            self.file = open(path, "ab")
+            # a torn record from a crash mid-write is cut off so the records stay aligned
+            size = self.file.tell()
+            if size % TICK_DTYPE.itemsize:
+                self.file.truncate(size - size % TICK_DTYPE.itemsize)
+                self.file.seek(0, os.SEEK_END)
+            self.day = day
+            self.day_range = (self.next_day_start(day) - 24 * 60 * 60 * 1000, self.next_day_start(day))
+            self.last_ts = None
+            if self.file.tell():
+                self.last_ts = int(self._read_segment(day)[-1]["ts"])
+        return self.file
+
+    def append(self, scrip_code, price, volume, change, ts=None):
+        """Write one tick (`ts` in ms, default now); ticks of a day must come in time order"""
+        with self.lock:
+            if ts is None:
+                # the wall clock can step back, a default time never goes before the last tick
+                ts = int(time.time() * 1000)
+                if self.last_ts is not None and self.day_range[0] <= ts < self.day_range[1]:
+                    ts = max(ts, self.last_ts)
+            # the day is only worked out again when the tick leaves the open segment's day
+            if not self.day_range[0] <= ts < self.day_range[1]:
+                self._writer(self.day_of(ts))
+            if self.last_ts is not None and ts < self.last_ts:
+                raise ValueError(f"ticks must be appended in time order, got {ts} after {self.last_ts}")
+            self.file.write(TICK_STRUCT.pack(ts, int(scrip_code), price, volume, change))
+            self.last_ts = ts
+            self.appended += 1
+
+    def append_many(self, records):
+        """Write a structured array of TICK_DTYPE records (or a list of tuples) in time order"""
+        records = np.asarray(records, dtype=TICK_DTYPE)
+        if not len(records):
+            return
+        with self.lock:
+            # records are in time order, so each day's ticks are one slice
+            while len(records):
+                day = self.day_of(int(records["ts"][0]))
+                count = np.searchsorted(records["ts"], self.next_day_start(day), side="left")
+                self._write(records[:count])
+                records = records[count:]
+
+    def _write(self, records):
+        """Append records of one day (call with the lock held)"""
+        file = self._writer(self.day_of(int(records["ts"][0])))
+        first_ts = int(records["ts"][0])
+        if (self.last_ts is not None and first_ts < self.last_ts) or np.any(np.diff(records["ts"]) < 0):
+            raise ValueError(f"ticks must be appended in time order, got {first_ts} after {self.last_ts}")
+        file.write(records.tobytes())
+        self.last_ts = int(records["ts"][-1])
+        self.appended += len(records)
+
+    def append_quote(self, quote, ts=None):
+        """Write the tick of a bsedata getQuote result"""
+        volume = quote_number(quote.get("totalTradedQuantity"))
+        self.append(
+            quote["scripCode"],
+            quote_number(quote.get("currentValue")),
+            round(volume) if volume == volume else 0,
+            quote_number(quote.get("pChange")),
+            ts=ts,
+        )
+
+    def flush(self):
+        """Hand the buffered ticks to the OS, so readers (in any process) see them"""
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def _read_segment(self, day):
+        """Read-only memory map of a day's whole records, empty when there are none"""
+        path = self.segment_path(day)
+        count = os.path.getsize(path) // TICK_DTYPE.itemsize if os.path.exists(path) else 0
+        if not count:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(path, dtype=TICK_DTYPE, mode="r", shape=(count,))
+
+    def segment(self, day):
+        """All ticks of a day (YYYYMMDD) as a read-only array backed by the segment file"""
+        self.flush()
+        return self._read_segment(day)
+
+    def scan(self, start=None, end=None, scrip_code=None):
+        """Yield the ticks with start <= ts < end (ms, either open) per segment, oldest first; without a
+        scrip filter each array is a view of the memory map, with one it is a copy of the matching ticks"""
+        self.flush()
+        first = self.day_of(start) if start is not None else None
+        last = self.day_of(end - 1) if end is not None else None
+        for day in self.days():
+            if (first is not None and day < first) or (last is not None and day > last):
+                continue
+            ticks = self._read_segment(day)
+            # ticks are in time order, so a time range is a slice
+            low = np.searchsorted(ticks["ts"], start, side="left") if start is not None else 0
+            high = np.searchsorted(ticks["ts"], end, side="left") if end is not None else len(ticks)
+            ticks = ticks[low:high]
+            if scrip_code is not None:
+                ticks = ticks[ticks["scrip"] == int(scrip_code)]
+            if len(ticks):
+                yield ticks
+
+    def read(self, start=None, end=None, scrip_code=None):
+        """The ticks of scan() as one array (a copy when they span several segments)"""
+        parts = list(self.scan(start, end, scrip_code))
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=TICK_DTYPE)
+
+    def stats(self):
+        """Segments, ticks and bytes on disk; a million ticks take TICK_DTYPE.itemsize MB"""
+        self.flush()
+        sizes = {day: os.path.getsize(self.segment_path(day)) for day in self.days()}
+        total = sum(sizes.values())
+        return {
+            "segments": len(sizes),
+            "ticks": total // TICK_DTYPE.itemsize,
+            "bytes": total,
+            "bytesPerTick": TICK_DTYPE.itemsize,
+            "appended": self.appended,
+        }
+
+    def close(self):
+        """Close the open segment; a later append opens its day's segment again"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                self.day = None
+                self.day_range = (0, 0)
+                self.last_ts = None
@@ -2,18 +2,23 @@ import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 
-def get_stock_price_history(ticker, plot=True):
+def get_stock_price_history(ticker, plot=True, symbols=None):
     """
     Get complete stock price history for Indian stocks.
     
     Parameters:
     ticker (str): Stock ticker (e.g., 'TCS.NS', 'RELIANCE.NS')
     plot (bool): Whether to plot the price history
+    symbols (SymbolMaster): Optional symbol master, lets ticker be a BSE scrip code or tickertape slug too
     
     Returns:
     pandas.DataFrame: Stock price history with OHLCV data
     """
     
+    # Map scrip codes / tickertape slugs to their Yahoo ticker
+    if symbols is not None:
+        ticker = symbols.yahoo(ticker) or ticker
+    
     # Add .NS suffix if not present
     if not ticker.endswith('.NS') and not ticker.endswith('.BO'):
         ticker = ticker + '.NS'